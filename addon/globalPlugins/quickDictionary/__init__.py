@@ -4,7 +4,7 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Optional, Callable, List
+from typing import Optional, Callable, List, Dict, Deque
 import os.path
 import sys
 import addonHandler
@@ -14,7 +14,11 @@ import api
 import ui
 import gui
 import wx
-from threading import Thread
+from threading import Thread, Lock
+from collections import deque
+from time import monotonic
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from globalVars import appArgs
 from scriptHandler import script
 from queueHandler import queueFunction, eventQueue
@@ -41,10 +45,16 @@ addonName: str = _curAddon.manifest['name']
 addonSummary: str = _curAddon.manifest['summary']
 
 from .locator import services  # noqa E402
-from .shared import getSelectedText, translateWithCaching, hashForCache, waitingFor, messageWithLangDetection, finally_, htmlTemplate  # noqa E402
+from .shared import getSelectedText, getTextAroundCaret, translateWithCaching, hashForCache, waitingFor, messageWithLangDetection, finally_, htmlTemplate, Generation, cacheKey  # noqa E402
 from .synthesizers import profiles  # noqa E402
 from .settings import QDSettingsPanel, SynthesizersDialog, ServicesDialog, EditableInputDialog  # noqa E402
 from .service import Translator  # noqa E402
+from .caching import Cache, cache  # noqa E402
+from .connections import pool, asyncPool  # noqa E402
+from .eventloop import eventLoop  # noqa E402
+from .prefetch import prefetcher  # noqa E402
+from .vocabulary import vocabulary  # noqa E402
+from .batch import BatchLookup, Glossary, batchItems  # noqa E402
 
 
 class GlobalPlugin(globalPluginHandler.GlobalPlugin):
@@ -73,6 +83,16 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		self._gate: int = config.conf[addonName]['active'] + 1
 		# storing information about the state of the cache
 		self._cacheInfo: str = ''
+		# the lookup of the word list that is currently performed
+		self._batch: Optional[BatchLookup] = None
+		# the text for prefetching is retrieved only when the caret has stopped in this object for a while
+		self._prefetchTimer: Optional[wx.CallLater] = None
+		self._prefetchObj = None
+		# time in seconds from the start of the lookup to the announcement of its first words
+		self._firstWordTimes: Deque[float] = deque(maxlen=100)
+		# generation of the latest user's lookup, the new lookup supersedes the previous one
+		self._generation: Generation = Generation()
+		self._generationLock = Lock()
 		# Sequence of messages
 		self._messages: List[str] = []
 		self.createSubMenu()
@@ -163,6 +183,14 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		"""
 		return config.conf[addonName][services[config.conf[addonName]['active']].name]['autoswap']
 
+	@property
+	def isSpeculative(self) -> bool:
+		"""Property indicating whether to look up both language directions simultaneously when auto-swap is enabled.
+		@return: value stored in the add-on configuration
+		@rtype: bool
+		"""
+		return config.conf[addonName][services[config.conf[addonName]['active']].name]['speculative']
+
 	@property
 	def isSwitchSynth(self) -> bool:
 		"""Property indicate whether to switch the synthesizer when sounding the dictionary entry.
@@ -182,6 +210,66 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			self.menu.Remove(self.mainItem)
 		except (RuntimeError, AttributeError):
 			log.warning("Can't remove %s submenu from NVDA menu", addonSummary)
+		if self._prefetchTimer is not None:
+			self._prefetchTimer.Stop()
+		prefetcher.cancel()
+		if self._batch:
+			self._batch.cancel()
+		self._generation.cancel()
+		vocabulary.close()
+		Cache.closeAll()
+		pool.close()
+		eventLoop.callSoon(asyncPool.close)
+		eventLoop.stop()
+
+	def event_gainFocus(self, obj, nextHandler: Callable) -> None:
+		"""Cancel prefetching of the previous text and queue the words of the newly focused text.
+		@param obj: the object that received the focus
+		@type obj: NVDAObjects.NVDAObject
+		@param nextHandler: the next handler in the chain of event handlers
+		@type nextHandler: Callable
+		"""
+		nextHandler()
+		prefetcher.cancel()
+		self.prefetch(obj)
+
+	def event_caret(self, obj, nextHandler: Callable) -> None:
+		"""Queue the words of the text at the new caret position for prefetching.
+		@param obj: the object in which the caret has moved
+		@type obj: NVDAObjects.NVDAObject
+		@param nextHandler: the next handler in the chain of event handlers
+		@type nextHandler: Callable
+		"""
+		nextHandler()
+		self.prefetch(obj)
+
+	def prefetch(self, obj) -> None:
+		"""Restart waiting for the caret to stop if prefetching is enabled for the active service.
+		The text is not retrieved on every event, but only when the caret has not moved for the prefetch delay.
+		@param obj: the object containing the text
+		@type obj: NVDAObjects.NVDAObject
+		"""
+		try:
+			if not prefetcher.enabled:
+				return
+			self._prefetchObj = obj
+			if self._prefetchTimer is None:
+				self._prefetchTimer = wx.CallLater(int(prefetcher.delay * 1000), self.prefetchText)
+			else:
+				self._prefetchTimer.Start(int(prefetcher.delay * 1000))
+		except Exception as e:
+			log.debug("Unable to schedule prefetching: %s", str(e))
+
+	def prefetchText(self) -> None:
+		"""Pass the text around the caret to the prefetcher.
+		Called in the main thread when the caret has stopped.
+		"""
+		obj, self._prefetchObj = self._prefetchObj, None
+		try:
+			if obj is not None and prefetcher.enabled:
+				prefetcher.schedule(getTextAroundCaret(obj))
+		except Exception as e:
+			log.debug("Unable to schedule prefetching: %s", str(e))
 
 	def getScript(self, gesture: InputGesture) -> Callable:
 		"""Retrieve the script bound to a given gesture.
@@ -251,6 +339,44 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			return
 		Thread(target=self.translate, args=[text, True]).start()
 
+	# Translators: Method description included in the add-on help message and NVDA input gestures dialog
+	@script(description="L - %s" % _("look up all words of the selected text and show them as a glossary"))
+	def script_glossary(self, gesture: InputGesture) -> None:
+		"""Look up all words of the selected text or lines of the word list from the clipboard.
+		While the lookup is in progress, the glossary of the entries received so far is shown.
+		@param gesture: gesture assigned to this method
+		@type gesture: InputGesture
+		"""
+		if self._batch and self._batch.is_alive():
+			# Translators: Progress of the word list lookup
+			ui.message(_("{done} of {total}").format(done=self._batch.glossary.done, total=self._batch.glossary.total))
+			self.showGlossary(self._batch.glossary)
+			return
+		text = getSelectedText()
+		items: List[str] = batchItems(text) if text else []
+		if not items:
+			return
+		active: int = config.conf[addonName]['active']
+		self._batch = BatchLookup(
+			items, self.source, self.target, hashForCache(active),
+			workers=config.conf[addonName][services[active].name].get('workers', 4),
+			onProgress=lambda glossary: beep(300 + 600 * glossary.done // glossary.total, 10),
+			onComplete=lambda glossary: queueFunction(eventQueue, self.showGlossary, glossary))
+		self._batch.start()
+
+	def showGlossary(self, glossary: Glossary) -> None:
+		"""Display the glossary in a browseable window.
+		@param glossary: dictionary entries of the looked up words
+		@type glossary: Glossary
+		"""
+		langs = services[config.conf[addonName]['active']].langs
+		ui.browseableMessage(
+			message=htmlTemplate.format(body=glossary.to_html()),
+			# Translators: The title of the window with the glossary of the looked up words
+			title="%s: %s-%s" % (_("Glossary"), langs[self.source].name, langs[self.target].name),
+			isHtml=True
+		)
+
 	# Translators: Method description included in the add-on help message and NVDA input gestures dialog
 	@script(description="E - %s" % _("edit text before sending"))
 	def script_editText(self, gesture: InputGesture) -> None:
@@ -399,9 +525,22 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 			# Translators: Information about the online service
 			ui.message(_("the limit will be reset in {hours} hours {minutes} minutes").format(
 				hours=hours, minutes=minutes))
+		for circuit in service.stat.get('endpoints', {}).values():
+			if circuit.message:
+				ui.message(circuit.message)
+		for rateLimiter in service.stat.get('limits', {}).values():
+			if rateLimiter.message:
+				ui.message(rateLimiter.message)
 		if self._cacheInfo:
 			# Translators: Information about the cache state
 			ui.message("%s: %s" % (_("state of cache"), self._cacheInfo))
+		if self._firstWordTimes:
+			# Translators: Information about the time from the start of the lookup to the announcement of the entry
+			ui.message(_("first words of the entry are usually announced in {time} ms").format(
+				time=round(sorted(self._firstWordTimes)[len(self._firstWordTimes) // 2] * 1000)))
+		if config.conf[addonName][service.name].get('vocabulary'):
+			# Translators: Information about the personal offline dictionary
+			ui.message(_("{count} entries in the personal dictionary").format(count=len(vocabulary)))
 
 	# Translators: Method description included in the add-on help message and NVDA input gestures dialog
 	@script(description="J - %s" % _("show the response from the remote server"))
@@ -454,6 +593,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		for method in [
 			self.script_dictionaryAnnounce.__doc__,
 			self.script_dictionaryBox.__doc__,
+			self.script_glossary.__doc__,
 			self.script_swapLanguages.__doc__,
 			self.script_announceLanguages.__doc__,
 			self.script_copyLastResult.__doc__,
@@ -649,19 +789,82 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		if self.isAutoSwap:
 			if langs.isAvailable(self.target, self.source):
 				pairs.append((self.target, self.source))
-		for lFrom, lInto in pairs:
-			translator = translateWithCaching(lFrom, lInto, text, hashForCache(active))
-			if translator.error:
-				translateWithCaching.cache_clear()  # reset cache when HTTP errors occur
-			self._cacheInfo = str(translateWithCaching.cache_info())  # - to check the current status of queries cache
-			if translator.plaintext:
-				break
-		else:
-			if not translator.plaintext:
-				# Translators: Notification of missing dictionary entry for current request
-				ui.message(_("No results"))
+		# the previous lookup is cancelled, so its slow response will not delay or interrupt this one
+		with self._generationLock:
+			generation = self._generation = self._generation.next(
+				keep=[cacheKey(lFrom, lInto, text, hashForCache(active)) for lFrom, lInto in pairs])
+		started: float = monotonic()
+		# parts of the entry that have been announced before the whole entry was received
+		streamed: List[str] = []
+		announced: List[str] = []
+
+		def spoken() -> None:
+			"""Measure the time until the synthesizer starts speaking the first words of the entry."""
+			self._firstWordTimes.append(monotonic() - started)
+
+		def announce(msg: Dict[str, str], first: bool = True, last: bool = True) -> None:
+			"""Announce the dictionary entry unless a newer lookup has been started in the meantime.
+			@param msg: language code, text to be spoken in the specified language and its braille form
+			@type msg: Dict[str, str] -> {'lang': str, 'text': str, 'braille': str}
+			@param first: the message is the first part of the entry
+			@type first: bool
+			@param last: the message is the last part of the entry
+			@type last: bool
+			"""
+			if generation.cancelled:
+				if not (last and announced):
+					return
+				# the announcement of the superseded entry is finished, so the synthesizer is restored
+				msg = dict(msg, text='', braille='')
+			onStart: Optional[Callable[[], None]] = None if announced else spoken
+			announced.append(msg['text'])
+			messageWithLangDetection(msg, first, last, onStart)
+
+		def onPart(part: str, braille: str) -> None:
+			"""Announce the part of the entry as soon as it is received, the next parts are queued after it.
+			@param part: part of the entry in plaintext format
+			@type part: str
+			@param braille: the short form of the part for the braille display
+			@type braille: str
+			"""
+			if not streamed:
+				self._messages.append('%s - %s' % (langs[pairs[0][0]].name, langs[pairs[0][1]].name))
+				part = '...'.join(self._messages + [part])
+				braille = '...'.join(self._messages + [braille])
 				self._messages.clear()
-				return
+			queueFunction(
+				eventQueue, announce, {'text': part, 'braille': braille, 'lang': pairs[0][1]}, not streamed, False)
+			streamed.append(part)
+
+		# the reverse direction is requested at the same time and is stored in the cache even if it is not used
+		speculative: bool = len(pairs) > 1 and self.isSpeculative
+		lookups: List[Callable[[], Translator]] = [
+			partial(
+				translateWithCaching, lFrom, lInto, text, hashForCache(active),
+				quiet=speculative and i > 0, generation=generation, onPart=None if isHtml or i > 0 else onPart)
+			for i, (lFrom, lInto) in enumerate(pairs)]
+		if speculative:
+			executor = ThreadPoolExecutor(max_workers=len(pairs))
+			lookups = [executor.submit(lookup).result for lookup in lookups]
+			executor.shutdown(wait=False)
+		try:
+			for lookup in lookups:
+				translator = lookup()
+				if generation.cancelled:
+					return
+				self._cacheInfo = cache.info()  # - to check the current status of queries cache
+				if not translator.empty:
+					break
+			else:
+				if translator.empty:
+					# Translators: Notification of missing dictionary entry for current request
+					ui.message(_("No results"))
+					self._messages.clear()
+					return
+		finally:
+			if streamed:
+				# the synthesizer switched for the first part is restored once after all parts of the entry
+				queueFunction(eventQueue, announce, {'text': '', 'braille': '', 'lang': pairs[0][1]}, False, True)
 		self._lastTranslator = translator
 		setattr(self._lastTranslator, 'id', active)
 		if isHtml:
@@ -670,16 +873,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 				title='%s-%s' % (langs[translator.langFrom].name, langs[translator.langTo].name),
 				isHtml=isHtml
 			)
-		else:
+		elif not streamed:
 			self._messages.append('%s - %s' % (langs[translator.langFrom].name, langs[translator.langTo].name))
-			self._messages.append(translator.plaintext)
-			message = '...'.join(self._messages)
+			message = '...'.join(self._messages + [translator.plaintext])
+			braille = '...'.join(self._messages + [translator.braille])
 			self._messages.clear()
-			queueFunction(
-				eventQueue,
-				messageWithLangDetection,
-				{'text': message, 'lang': translator.langTo}
-			)
+			queueFunction(eventQueue, announce, {'text': message, 'braille': braille, 'lang': translator.langTo})
 		if self.isCopyToClipboard:
 			api.copyToClip(translator.plaintext, notify=True)
 
@@ -688,6 +887,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
 		"kb:NVDA+y": "dictionaryAnnounce",
 		"kb:d": "dictionaryAnnounce",
 		"kb:w": "dictionaryBox",
+		"kb:l": "glossary",
 		"kb:e": "editText",
 		"kb:a": "announceLanguages",
 		"kb:s": "swapLanguages",
@@ -0,0 +1,231 @@
+# batch.py
+# Looking up lists of words and collecting the dictionary entries into a glossary
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Optional, Callable, List, Dict
+import re
+from html import escape
+from threading import Thread, Event, RLock
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import addonHandler
+import config
+from logHandler import log
+from . import addonName
+from .service import Translator
+from .caching import cache
+from .locator import services
+from .shared import translateWithCaching, cacheKey, clearText, waitForQuota
+from .wordindex import normalize
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+
+def batchItems(text: str, limit: int = 100) -> List[str]:
+	"""Split the text into the words or phrases to look up.
+	A multi-line text is treated as a word list with one word or phrase per line,
+	otherwise each word of the text is looked up. Repeated items are skipped.
+	@param text: selected text or text from the clipboard
+	@type text: str
+	@param limit: maximum number of items
+	@type limit: int
+	@return: words or phrases in the order of their appearance in the text
+	@rtype: List[str]
+	"""
+	lines: List[str] = [clearText(line) for line in text.splitlines()]
+	lines = [line for line in lines if line]
+	candidates: List[str] = lines if len(lines) > 1 else re.findall(r"[^\W\d_]+(?:['\-][^\W\d_]+)*", text)
+	items: Dict[str, str] = {}
+	for item in candidates:
+		items.setdefault(normalize(item), item)
+	return list(items.values())[:limit]
+
+
+class Glossary(object):
+	"""Dictionary entries of the looked up words, arranged in the order of the word list."""
+
+	def __init__(self, items: List[str]) -> None:
+		"""Initialization of the empty glossary.
+		@param items: words or phrases to look up
+		@type items: List[str]
+		"""
+		self._items: List[str] = items
+		self._entries: Dict[str, Translator] = {}
+		self._skipped: List[str] = []
+		self._lock = RLock()
+
+	@property
+	def total(self) -> int:
+		"""Number of words in the list.
+		@return: number of words
+		@rtype: int
+		"""
+		return len(self._items)
+
+	@property
+	def done(self) -> int:
+		"""Number of words for which the lookup is completed.
+		@return: number of words
+		@rtype: int
+		"""
+		return len(self._entries) + len(self._skipped)
+
+	def skip(self, item: str) -> None:
+		"""Mark the word that was not looked up because the request limit of the service is reached.
+		@param item: word or phrase
+		@type item: str
+		"""
+		with self._lock:
+			self._skipped.append(item)
+
+	def add(self, item: str, translator: Translator) -> None:
+		"""Add the received dictionary entry.
+		@param item: looked up word or phrase
+		@type item: str
+		@param translator: object containing the prepared response
+		@type translator: Translator
+		"""
+		with self._lock:
+			self._entries[item] = translator
+
+	def to_html(self) -> str:
+		"""Glossary in HTML format, containing the entries received so far.
+		@return: contents of the glossary without the page template
+		@rtype: str
+		"""
+		body: List[str] = []
+		missing: List[str] = []
+		with self._lock:
+			entries: Dict[str, Translator] = dict(self._entries)
+			skipped: List[str] = list(self._skipped)
+		for item in self._items:
+			translator: Optional[Translator] = entries.get(item)
+			if translator is None:
+				continue
+			if not translator.empty:
+				match = re.search(r"<body>(.*)</body>", translator.html, re.DOTALL)
+				body.append(match.group(1) if match else translator.html)
+			else:
+				missing.append(escape(item))
+		if missing:
+			# Translators: Title of the list of words without dictionary entries in the glossary
+			body.append("<h2>%s</h2>\n<p>%s</p>" % (_("No results"), ', '.join(missing)))
+		if skipped:
+			body.append("<h2>%s</h2>\n<p>%s</p>" % (
+				# Translators: Title of the list of words that were not looked up in the glossary
+				_("Not looked up because the request limit of the service is reached"),
+				', '.join(escape(item) for item in self._items if item in skipped)))
+		return '\n'.join(body)
+
+
+class BatchLookup(Thread):
+	"""Looks up a list of words in a separate thread.
+	Entries that are already in the cache are taken immediately,
+	the rest are requested over a bounded pool of workers and added to the glossary as they arrive.
+	The requests give way to the user's lookups, and the words that remain when the daily quota
+	of the service is running out are skipped.
+	"""
+
+	def __init__(
+		self,
+		items: List[str],
+		langFrom: str,
+		langInto: str,
+		hashForCache: str,
+		workers: int = 4,
+		reserve: int = 20,
+		onProgress: Optional[Callable[[Glossary], None]] = None,
+		onComplete: Optional[Callable[[Glossary], None]] = None
+	) -> None:
+		"""Parameters of the batch lookup.
+		@param items: words or phrases to look up
+		@type items: List[str]
+		@param langFrom: source language
+		@type langFrom: str
+		@param langInto: target language
+		@type langInto: str
+		@param hashForCache: hash of all parameters that must be considered when caching
+		@type hashForCache: str
+		@param workers: maximum number of simultaneous requests to the remote service
+		@type workers: int
+		@param reserve: number of remaining requests of the daily quota that is left for the user's lookups
+		@type reserve: int
+		@param onProgress: called in the worker thread after each received entry
+		@type onProgress: Optional[Callable[[Glossary], None]]
+		@param onComplete: called in the worker thread when all entries are received, but not after cancellation
+		@type onComplete: Optional[Callable[[Glossary], None]]
+		"""
+		super(BatchLookup, self).__init__(daemon=True)
+		self.glossary = Glossary(items)
+		self._items = items
+		self._langFrom = langFrom
+		self._langInto = langInto
+		self._hashForCache = hashForCache
+		self._workers = workers
+		self._reserve = reserve
+		self._onProgress = onProgress
+		self._onComplete = onComplete
+		self._cancelled = Event()
+
+	def cancel(self) -> None:
+		"""Stop the lookup, the requests that have already been sent are completed."""
+		self._cancelled.set()
+
+	def _add(self, item: str, translator: Translator) -> None:
+		"""Add the received entry to the glossary and report the progress.
+		@param item: looked up word or phrase
+		@type item: str
+		@param translator: object containing the prepared response
+		@type translator: Translator
+		"""
+		self.glossary.add(item, translator)
+		if self._onProgress:
+			self._onProgress(self.glossary)
+
+	def _lookup(self, item: str) -> Optional[Translator]:
+		"""Look up the word as soon as the request does not compete with the user's lookups.
+		@param item: word or phrase to look up
+		@type item: str
+		@return: object containing the prepared response, or None if the word is skipped
+		@rtype: Optional[Translator]
+		"""
+		if not waitForQuota(services[config.conf[addonName]['active']], self._reserve, cancelled=self._cancelled):
+			return None
+		return translateWithCaching(
+			self._langFrom, self._langInto, item, self._hashForCache, quiet=True, background=True)
+
+	def run(self) -> None:
+		"""Look up all words of the list."""
+		pending: List[str] = []
+		for item in self._items:
+			if cacheKey(self._langFrom, self._langInto, item, self._hashForCache) in cache:
+				self._add(item, translateWithCaching(
+					self._langFrom, self._langInto, item, self._hashForCache, quiet=True, background=True))
+			else:
+				pending.append(item)
+		with ThreadPoolExecutor(max_workers=self._workers) as executor:
+			futures = {executor.submit(self._lookup, item): item for item in pending}
+			for future in as_completed(futures):
+				if self._cancelled.is_set():
+					for waiting in futures:
+						waiting.cancel()
+					break
+				try:
+					translator: Optional[Translator] = future.result()
+				except Exception as e:
+					log.error("Unable to look up %s: %s", futures[future], str(e))
+					continue
+				if translator is None:
+					self.glossary.skip(futures[future])
+					if self._onProgress:
+						self._onProgress(self.glossary)
+				else:
+					self._add(futures[future], translator)
+		if self._onComplete and not self._cancelled.is_set():
+			self._onComplete(self.glossary)
@@ -0,0 +1,232 @@
+# caching.py
+# Persistent storage of the dictionary entries received from the online services
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from __future__ import annotations
+from typing import Any, Optional, List, Dict
+import os.path
+import json
+import zlib
+import sqlite3
+import hashlib
+from time import time
+from threading import RLock
+import config
+from logHandler import log
+from . import addonName
+
+
+class Cache(object):
+	"""Persistent key-value storage based on SQLite database.
+	Each record has its own lifetime, and the least recently used records are removed
+	when the number of records or the total size of the stored data exceeds the specified limits.
+	"""
+	# all created storages, to close their connections when the add-on is terminated
+	_instances: List[Cache] = []
+	# version of the table layout, the tables of other versions are recreated because the records are disposable
+	schemaVersion: int = 2
+
+	def __init__(
+		self,
+		path: str,
+		ttl: int = 30 * 24 * 3600,
+		negativeTtl: int = 10 * 60,
+		maxsize: int = 5000,
+		maxbytes: int = 32 * 1024 * 1024
+	) -> None:
+		"""Initialization of the storage parameters, the database file is opened on the first request.
+		@param path: full path to the database file
+		@type path: str
+		@param ttl: default lifetime of the records in seconds
+		@type ttl: int
+		@param negativeTtl: lifetime of the records which indicate the absence of the dictionary entry
+		@type negativeTtl: int
+		@param maxsize: maximum number of the stored records
+		@type maxsize: int
+		@param maxbytes: maximum total size of the stored data in bytes
+		@type maxbytes: int
+		"""
+		self._path: str = path
+		self.ttl: int = ttl
+		self.negativeTtl: int = negativeTtl
+		self.maxsize: int = maxsize
+		self.maxbytes: int = maxbytes
+		self._db: Optional[sqlite3.Connection] = None
+		self._lock = RLock()
+		self._hits: int = 0
+		self._misses: int = 0
+		Cache._instances.append(self)
+
+	@property
+	def db(self) -> sqlite3.Connection:
+		"""Connection to the database, the database file and the table are created if necessary.
+		The table of the previous layout is dropped together with its records.
+		@return: connection to the SQLite database
+		@rtype: sqlite3.Connection
+		"""
+		if self._db is None:
+			self._db = sqlite3.connect(self._path, timeout=5, check_same_thread=False)
+			version: int = self._db.execute("PRAGMA user_version").fetchone()[0]
+			if version != self.schemaVersion:
+				# the database created by the previous version of the add-on has the different columns
+				self._db.execute("DROP TABLE IF EXISTS entries")
+				self._db.execute("PRAGMA user_version=%d" % self.schemaVersion)
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS entries ("
+				"key TEXT PRIMARY KEY, "
+				"data BLOB NOT NULL, "
+				"size INTEGER NOT NULL, "
+				"expires REAL NOT NULL, "
+				"accessed REAL NOT NULL)")
+			self._db.execute("CREATE INDEX IF NOT EXISTS accessedIndex ON entries (accessed)")
+			self._db.commit()
+		return self._db
+
+	@staticmethod
+	def key(*args: Any) -> str:
+		"""Build a stable key of the record from the given values.
+		Unlike the built-in hash() function, the result does not change between NVDA sessions.
+		@param args: any JSON-serializable values that uniquely identify the record
+		@type args: Any
+		@return: hexadecimal digest of the given values
+		@rtype: str
+		"""
+		return hashlib.sha1(json.dumps(args, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+	def get(self, key: str, expired: bool = False) -> Optional[Dict]:
+		"""Return the stored record if it exists and has not expired.
+		@param key: key of the record
+		@type key: str
+		@param expired: return the record even if its lifetime has expired but it has not been removed yet
+		@type expired: bool
+		@return: deserialized record or None
+		@rtype: Optional[Dict]
+		"""
+		with self._lock:
+			try:
+				row = self.db.execute("SELECT data, expires FROM entries WHERE key=?", (key,)).fetchone()
+				if row and (expired or time() <= row[1]):
+					self.db.execute("UPDATE entries SET accessed=? WHERE key=?", (time(), key))
+					self.db.commit()
+					self._hits += 1
+					return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+			except Exception as e:
+				log.error("Unable to read record from the cache %s: %s", self._path, str(e))
+			self._misses += 1
+		return None
+
+	def __contains__(self, key: str) -> bool:
+		"""Check the presence of the record which has not expired, without affecting the usage statistics.
+		@param key: key of the record
+		@type key: str
+		@return: whether the record is present in the storage
+		@rtype: bool
+		"""
+		with self._lock:
+			try:
+				return self.db.execute(
+					"SELECT 1 FROM entries WHERE key=? AND expires>=?", (key, time())).fetchone() is not None
+			except Exception:
+				return False
+
+	def put(self, key: str, value: Dict, ttl: Optional[int] = None) -> bool:
+		"""Save the record and remove the outdated ones if the storage limits are exceeded.
+		@param key: key of the record
+		@type key: str
+		@param value: JSON-serializable record
+		@type value: Dict
+		@param ttl: lifetime of the record in seconds, if not specified - the default value is used
+		@type ttl: Optional[int]
+		@return: a sign of the success of saving the record
+		@rtype: bool
+		"""
+		data: bytes = zlib.compress(json.dumps(value, skipkeys=True, ensure_ascii=False).encode('utf-8'))
+		now: float = time()
+		with self._lock:
+			try:
+				self.db.execute(
+					"INSERT OR REPLACE INTO entries (key, data, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+					(key, data, len(data), now + (self.ttl if ttl is None else ttl), now))
+				self.evict()
+				self.db.commit()
+			except Exception as e:
+				log.error("Unable to save record to the cache %s: %s", self._path, str(e))
+				return False
+		return True
+
+	def remove(self, key: str) -> None:
+		"""Remove the record with the specified key.
+		@param key: key of the record
+		@type key: str
+		"""
+		with self._lock:
+			try:
+				self.db.execute("DELETE FROM entries WHERE key=?", (key,))
+				self.db.commit()
+			except Exception as e:
+				log.error("Unable to remove record from the cache %s: %s", self._path, str(e))
+
+	def evict(self) -> None:
+		"""Remove the least recently used records that exceed the storage limits.
+		Expired records are kept for a while to be used when the online service is unavailable.
+		"""
+		with self._lock:
+			self.db.execute("DELETE FROM entries WHERE expires<?", (time() - self.ttl,))
+			count, size = self.db.execute("SELECT COUNT(*), TOTAL(size) FROM entries").fetchone()
+			if count <= self.maxsize and size <= self.maxbytes:
+				return
+			rows = self.db.execute("SELECT key, size FROM entries ORDER BY accessed DESC").fetchall()
+			keep, total = 0, 0
+			for key, length in rows:
+				if keep >= self.maxsize or total + length > self.maxbytes:
+					break
+				keep += 1
+				total += length
+			self.db.executemany("DELETE FROM entries WHERE key=?", ((key,) for key, length in rows[keep:]))
+
+	def clear(self) -> None:
+		"""Remove all stored records."""
+		with self._lock:
+			try:
+				self.db.execute("DELETE FROM entries")
+				self.db.commit()
+			except Exception as e:
+				log.error("Unable to clear the cache %s: %s", self._path, str(e))
+
+	def __len__(self) -> int:
+		"""The number of records in the storage.
+		@return: the number of stored records
+		@rtype: int
+		"""
+		with self._lock:
+			try:
+				return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+			except Exception:
+				return 0
+
+	def info(self) -> str:
+		"""Information about the state of the storage.
+		@return: number of hits, misses and stored records
+		@rtype: str
+		"""
+		return "hits=%d, misses=%d, currsize=%d, maxsize=%d" % (self._hits, self._misses, len(self), self.maxsize)
+
+	def close(self) -> None:
+		"""Close the connection to the database, it will be reopened on the next request."""
+		with self._lock:
+			if self._db is not None:
+				self._db.close()
+				self._db = None
+
+	@classmethod
+	def closeAll(cls) -> None:
+		"""Close connections of all created storages."""
+		for instance in cls._instances:
+			instance.close()
+
+
+# An instance of the dictionary entries cache for use in the add-on
+cache = Cache(os.path.join(config.getUserDefaultConfigPath(), "%s.sqlite" % addonName))
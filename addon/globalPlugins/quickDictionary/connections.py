@@ -0,0 +1,914 @@
+# connections.py
+# Pool of persistent HTTP connections shared by all online dictionary services
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from __future__ import annotations
+from typing import Any, Callable, Optional, List, Dict, Deque, Tuple
+from collections import deque
+from io import BytesIO
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, HTTPMessage, parse_headers
+from urllib.parse import urlsplit, urljoin
+from threading import Lock, BoundedSemaphore, Condition, Event
+from time import monotonic
+import asyncio
+import ssl
+import addonHandler
+from logHandler import log
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+# Exceptions indicating that the server has closed the persistent connection
+staleErrors: Tuple = (HTTPException, ConnectionResetError, ConnectionAbortedError, BrokenPipeError)
+asyncStaleErrors: Tuple = staleErrors + (asyncio.IncompleteReadError,)
+
+
+class PoolExhaustedError(TimeoutError):
+	"""Raised when all allowed connections to the host are busy for too long."""
+	pass
+
+
+class CircuitOpenError(ConnectionError):
+	"""Raised without connecting to the server while its circuit breaker is open."""
+	pass
+
+
+class RateLimitError(ConnectionError):
+	"""Raised without connecting to the server while the request limit of the service is reached."""
+	pass
+
+
+class CircuitBreaker(object):
+	"""Circuit breaker and latency statistics of one service endpoint.
+	After several failures in a row the circuit is opened and requests fail immediately.
+	When the recovery time has passed, one trial request is allowed (half-open state):
+	its success closes the circuit, and its failure opens it again for twice as long.
+	The request timeout is derived from the observed latency of the endpoint.
+	"""
+	CLOSED: str = "closed"
+	OPEN: str = "open"
+	HALF_OPEN: str = "half-open"
+
+	def __init__(
+		self,
+		name: str,
+		threshold: int = 3,
+		recoveryTime: float = 30.0,
+		maxRecoveryTime: float = 600.0,
+		minTimeout: float = 3.0,
+		maxTimeout: float = 8.0
+	) -> None:
+		"""Parameters of the circuit breaker.
+		@param name: name of the endpoint, usually the host name
+		@type name: str
+		@param threshold: number of failures in a row after which the circuit is opened
+		@type threshold: int
+		@param recoveryTime: initial time in seconds during which the circuit stays open
+		@type recoveryTime: float
+		@param maxRecoveryTime: maximum time in seconds during which the circuit stays open
+		@type maxRecoveryTime: float
+		@param minTimeout: lower limit of the adaptive request timeout in seconds
+		@type minTimeout: float
+		@param maxTimeout: upper limit of the adaptive request timeout in seconds
+		@type maxTimeout: float
+		"""
+		self.name = name
+		self._threshold = threshold
+		self._initialRecoveryTime = recoveryTime
+		self._recoveryTime = recoveryTime
+		self._maxRecoveryTime = maxRecoveryTime
+		self._minTimeout = minTimeout
+		self._maxTimeout = maxTimeout
+		self._lock = Lock()
+		self._state: str = self.CLOSED
+		self._openedAt: float = 0.0
+		self._trial: bool = False
+		self.failures: int = 0
+		self.latencies: Deque[float] = deque(maxlen=50)
+
+	@property
+	def state(self) -> str:
+		"""Current state of the circuit, the open circuit becomes half-open after the recovery time.
+		@return: one of the values CLOSED, OPEN or HALF_OPEN
+		@rtype: str
+		"""
+		if self._state == self.OPEN and self.retryAfter <= 0:
+			self._state = self.HALF_OPEN
+		return self._state
+
+	@property
+	def available(self) -> bool:
+		"""Whether the endpoint is worth querying now.
+		@return: False while the circuit is open
+		@rtype: bool
+		"""
+		return self.state != self.OPEN
+
+	@property
+	def retryAfter(self) -> float:
+		"""Time remaining until the next attempt to connect to the endpoint.
+		@return: number of seconds, zero or negative if the attempt is already allowed
+		@rtype: float
+		"""
+		return self._openedAt + self._recoveryTime - monotonic()
+
+	@property
+	def timeout(self) -> float:
+		"""Request timeout derived from the 95th percentile of the observed latency.
+		@return: timeout in seconds
+		@rtype: float
+		"""
+		if len(self.latencies) < 10:
+			return self._maxTimeout
+		latencies: List[float] = sorted(self.latencies)
+		p95: float = latencies[int(len(latencies) * 0.95) - 1]
+		return max(self._minTimeout, min(self._maxTimeout, p95 * 3))
+
+	def allow(self) -> bool:
+		"""Check whether the request may be sent to the endpoint.
+		In the half-open state only one trial request is allowed at a time.
+		@return: permission to send the request
+		@rtype: bool
+		"""
+		with self._lock:
+			state: str = self.state
+			if state == self.CLOSED:
+				return True
+			if state == self.HALF_OPEN and not self._trial:
+				self._trial = True
+				return True
+			return False
+
+	def succeed(self, latency: float) -> None:
+		"""Take into account the successful request.
+		@param latency: duration of the request in seconds
+		@type latency: float
+		"""
+		with self._lock:
+			self.latencies.append(latency)
+			self.failures = 0
+			self._trial = False
+			self._state = self.CLOSED
+			self._recoveryTime = self._initialRecoveryTime
+
+	def release(self) -> None:
+		"""Forget the request that was interrupted without a result, so that the trial request can be repeated."""
+		with self._lock:
+			self._trial = False
+
+	def fail(self) -> None:
+		"""Take into account the failed request."""
+		with self._lock:
+			self.failures += 1
+			if self._state == self.HALF_OPEN or self._trial:
+				self._recoveryTime = min(self._recoveryTime * 2, self._maxRecoveryTime)
+			if self._trial or self.failures >= self._threshold:
+				self._state = self.OPEN
+				self._openedAt = monotonic()
+			self._trial = False
+
+	@property
+	def message(self) -> str:
+		"""Description of the endpoint state that can be announced to the user.
+		@return: text message or an empty string if the circuit is closed
+		@rtype: str
+		"""
+		state: str = self.state
+		if state == self.HALF_OPEN:
+			# Translators: Message when the request is not sent while the availability of the online service is checked
+			return _("server {name} is not responding, checking its availability").format(name=self.name)
+		if state != self.OPEN:
+			return ''
+		# Translators: Message when the online service is not responding and requests are temporarily not sent
+		return _("server {name} is not responding, next attempt in {seconds} seconds").format(
+			name=self.name,
+			seconds=max(1, round(self.retryAfter)))
+
+
+def breaker(stat: Dict[str, Any], name: str) -> CircuitBreaker:
+	"""Circuit breaker of the endpoint stored in the statistics of the service.
+	@param stat: statistics of the service
+	@type stat: Dict[str, Any]
+	@param name: name of the endpoint, usually the host name
+	@type name: str
+	@return: circuit breaker of the endpoint
+	@rtype: CircuitBreaker
+	"""
+	endpoints: Dict[str, CircuitBreaker] = stat.setdefault('endpoints', {})
+	if name not in endpoints:
+		endpoints[name] = CircuitBreaker(name)
+	return endpoints[name]
+
+
+class RateLimiter(object):
+	"""Token bucket limiting the rate of requests to one service endpoint.
+	Until the service reports its quota, the requests are not limited.
+	Then the bucket is refilled at a rate that spreads the remaining daily quota
+	over the time left until its reset, this rate only paces the background requests, which are admitted
+	when nobody is waiting and the bucket keeps enough tokens for a burst of the user's lookups.
+	Requests of the user are not paced, they take a token if there is one
+	and are stopped only when the quota is exhausted or the service responds with 429 Too Many Requests.
+	"""
+
+	def __init__(
+		self,
+		name: str,
+		capacity: float = 5.0,
+		minRate: float = 0.01,
+		maxRate: float = 5.0,
+		headroom: float = 0.5
+	) -> None:
+		"""Parameters of the token bucket.
+		@param name: name of the endpoint, usually the host name
+		@type name: str
+		@param capacity: maximum number of tokens, which is the size of the allowed burst of requests
+		@type capacity: float
+		@param minRate: lower limit of the refill rate in tokens per second
+		@type minRate: float
+		@param maxRate: upper limit of the refill rate in tokens per second
+		@type maxRate: float
+		@param headroom: share of the capacity that must remain in the bucket to admit background requests
+		@type headroom: float
+		"""
+		self.name = name
+		self._maxCapacity = capacity
+		self._minRate = minRate
+		self._maxRate = maxRate
+		self._headroom = headroom
+		self._cond = Condition()
+		self._capacity: float = capacity
+		self._tokens: float = capacity
+		self._rate: Optional[float] = None
+		self._updated: float = monotonic()
+		self._blockedUntil: float = 0.0
+		self._waiting: int = 0
+
+	def _refill(self) -> None:
+		"""Add the tokens accumulated since the last update, must be called with the lock held."""
+		now: float = monotonic()
+		if self._blockedUntil and now >= self._blockedUntil:
+			# one trial request is allowed when the blocking time has passed
+			self._blockedUntil = 0.0
+			self._tokens = max(self._tokens, 1.0)
+		elif self._rate is not None and not self._blockedUntil:
+			self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+		self._updated = now
+
+	@property
+	def retryAfter(self) -> float:
+		"""Time remaining until the user's request can be sent.
+		@return: number of seconds, zero if the request is already allowed
+		@rtype: float
+		"""
+		with self._cond:
+			self._refill()
+			if self._blockedUntil:
+				return self._blockedUntil - monotonic()
+			return 0.0
+
+	@property
+	def spare(self) -> bool:
+		"""Whether background requests are allowed now.
+		@return: True if the bucket has enough tokens and nobody is waiting for them
+		@rtype: bool
+		"""
+		with self._cond:
+			self._refill()
+			return self._isSpare()
+
+	def _isSpare(self) -> bool:
+		"""Check the admission of the background requests, must be called with the lock held.
+		@return: True if the bucket has enough tokens and nobody is waiting for them
+		@rtype: bool
+		"""
+		if self._blockedUntil:
+			return False
+		if self._rate is None:
+			return True
+		return self._waiting == 0 and self._tokens >= max(1.0, self._capacity * self._headroom)
+
+	def seed(self, remaining: int, resetIn: float) -> None:
+		"""Adjust the bucket to the quota reported by the service.
+		@param remaining: number of requests remaining in the daily quota
+		@type remaining: int
+		@param resetIn: number of seconds until the daily quota is reset
+		@type resetIn: float
+		"""
+		with self._cond:
+			self._refill()
+			resetIn = max(resetIn, 1.0)
+			if remaining <= 0:
+				self._tokens = 0.0
+				self._blockedUntil = monotonic() + resetIn
+				return
+			self._rate = max(self._minRate, min(self._maxRate, remaining / resetIn))
+			self._capacity = max(1.0, min(self._maxCapacity, float(remaining)))
+			self._tokens = min(self._tokens, self._capacity, float(remaining))
+			self._cond.notify_all()
+
+	def block(self, seconds: float) -> None:
+		"""Stop sending requests for the specified time, for example after the response 429 Too Many Requests.
+		@param seconds: blocking time in seconds
+		@type seconds: float
+		"""
+		with self._cond:
+			self._tokens = 0.0
+			self._blockedUntil = monotonic() + max(seconds, 1.0)
+
+	def acquire(self, timeout: float = 2.0) -> bool:
+		"""Take a token for the user's request, waiting only while the requests are blocked.
+		@param timeout: maximum waiting time in seconds
+		@type timeout: float
+		@return: whether the token has been received
+		@rtype: bool
+		"""
+		deadline: float = monotonic() + timeout
+		with self._cond:
+			self._waiting += 1
+			try:
+				while True:
+					wait: float = self._take()
+					if wait <= 0:
+						return True
+					if monotonic() + wait > deadline:
+						return False
+					self._cond.wait(wait)
+			finally:
+				self._waiting -= 1
+				self._cond.notify_all()
+
+	async def acquireAsync(self, timeout: float = 2.0) -> bool:
+		"""Take a token for the user's request in the coroutine, waiting without blocking the event loop.
+		@param timeout: maximum waiting time in seconds
+		@type timeout: float
+		@return: whether the token has been received
+		@rtype: bool
+		"""
+		deadline: float = monotonic() + timeout
+		with self._cond:
+			self._waiting += 1
+		try:
+			while True:
+				with self._cond:
+					wait: float = self._take()
+				if wait <= 0:
+					return True
+				if monotonic() + wait > deadline:
+					return False
+				await asyncio.sleep(wait)
+		finally:
+			with self._cond:
+				self._waiting -= 1
+				self._cond.notify_all()
+
+	def _take(self) -> float:
+		"""Take a token unless the requests are blocked, must be called with the lock held.
+		The user's request is sent even if the bucket is empty, it only delays the background requests.
+		@return: zero if the request is allowed, otherwise the time in seconds until the end of the blocking
+		@rtype: float
+		"""
+		self._refill()
+		if self._blockedUntil:
+			return max(self._blockedUntil - monotonic(), 0.001)
+		self._tokens = max(0.0, self._tokens - 1)
+		return 0.0
+
+	def admit(self, timeout: float = 60.0, cancelled: Optional[Event] = None) -> bool:
+		"""Wait until the background request can be sent without delaying the user's requests.
+		The token is not taken here, the request itself takes it when it is sent.
+		@param timeout: maximum waiting time in seconds
+		@type timeout: float
+		@param cancelled: event that interrupts the waiting
+		@type cancelled: Optional[Event]
+		@return: whether the background request is admitted
+		@rtype: bool
+		"""
+		deadline: float = monotonic() + timeout
+		with self._cond:
+			while True:
+				self._refill()
+				if self._isSpare():
+					return True
+				if cancelled is not None and cancelled.is_set() or monotonic() >= deadline:
+					return False
+				self._cond.wait(min(1.0, deadline - monotonic()))
+
+	@property
+	def message(self) -> str:
+		"""Description of the limiter state that can be announced to the user.
+		@return: text message or an empty string if the requests are allowed
+		@rtype: str
+		"""
+		retryAfter: float = self.retryAfter
+		if retryAfter <= 0:
+			return ''
+		# Translators: Message when the request limit of the online service is reached
+		return _("request limit of {name} is reached, next attempt in {seconds} seconds").format(
+			name=self.name,
+			seconds=max(1, round(retryAfter)))
+
+
+def limiter(stat: Dict[str, Any], name: str) -> RateLimiter:
+	"""Rate limiter of the endpoint stored in the statistics of the service.
+	@param stat: statistics of the service
+	@type stat: Dict[str, Any]
+	@param name: name of the endpoint, usually the host name
+	@type name: str
+	@return: rate limiter of the endpoint
+	@rtype: RateLimiter
+	"""
+	limits: Dict[str, RateLimiter] = stat.setdefault('limits', {})
+	if name not in limits:
+		limits[name] = RateLimiter(name)
+	return limits[name]
+
+
+class Response(object):
+	"""Completely read response from the server.
+	Provides the same methods as http.client.HTTPResponse used by the services.
+	"""
+
+	def __init__(self, url: str, status: int, headers: HTTPMessage, body: bytes) -> None:
+		"""Received response data.
+		@param url: the final URL of the request
+		@type url: str
+		@param status: HTTP status code
+		@type status: int
+		@param headers: response headers
+		@type headers: HTTPMessage
+		@param body: response body
+		@type body: bytes
+		"""
+		self.url = url
+		self.status = status
+		self.headers = headers
+		self._body = body
+
+	def getcode(self) -> int:
+		"""HTTP status code of the response.
+		@return: status code
+		@rtype: int
+		"""
+		return self.status
+
+	def getheader(self, name: str, default: Any = None) -> Any:
+		"""Value of the specified response header, as in http.client.HTTPResponse.getheader().
+		@param name: header name
+		@type name: str
+		@param default: value returned if the header is absent
+		@type default: Any
+		@return: header value or the default value
+		@rtype: Any
+		"""
+		return self.headers.get(name, default)
+
+	def read(self) -> bytes:
+		"""Body of the response.
+		@return: response body
+		@rtype: bytes
+		"""
+		return self._body
+
+
+class ConnectionPool(object):
+	"""Thread-safe pool of persistent HTTP(S) connections.
+	Connections to each host are reused between requests,
+	so the TCP and TLS handshakes are performed only once per connection.
+	"""
+
+	def __init__(self, maxPerHost: int = 8, idleTimeout: float = 60.0, maxRedirects: int = 3) -> None:
+		"""Pool parameters.
+		@param maxPerHost: maximum number of simultaneous connections to one host
+		@type maxPerHost: int
+		@param idleTimeout: time in seconds after which an unused connection is closed
+		@type idleTimeout: float
+		@param maxRedirects: maximum number of redirects followed in one request
+		@type maxRedirects: int
+		"""
+		self.maxPerHost = maxPerHost
+		self.idleTimeout = idleTimeout
+		self.maxRedirects = maxRedirects
+		self._lock = Lock()
+		self._idle: Dict[Tuple[str, str, int], List[Tuple[HTTPConnection, float]]] = {}
+		self._limits: Dict[Tuple[str, str, int], BoundedSemaphore] = {}
+
+	def _acquire(self, host: Tuple[str, str, int], timeout: float) -> Tuple[HTTPConnection, bool]:
+		"""Take an idle connection to the host from the pool or create a new one.
+		@param host: scheme, host name and port
+		@type host: Tuple[str, str, int]
+		@param timeout: connection timeout in seconds
+		@type timeout: float
+		@return: connection and a sign that it has already been used
+		@rtype: Tuple[HTTPConnection, bool]
+		"""
+		with self._lock:
+			limit = self._limits.setdefault(host, BoundedSemaphore(self.maxPerHost))
+		if not limit.acquire(timeout=timeout):
+			raise PoolExhaustedError("Too many simultaneous connections to %s" % host[1])
+		conn: Optional[HTTPConnection] = None
+		with self._lock:
+			idle = self._idle.get(host, [])
+			while idle:
+				candidate, lastUsed = idle.pop()
+				if monotonic() - lastUsed < self.idleTimeout:
+					conn = candidate
+					break
+				candidate.close()
+		if conn is not None:
+			conn.timeout = timeout
+			if conn.sock is not None:
+				conn.sock.settimeout(timeout)
+			return conn, True
+		scheme, hostname, port = host
+		if scheme == 'https':
+			return HTTPSConnection(hostname, port, timeout=timeout), False
+		return HTTPConnection(hostname, port, timeout=timeout), False
+
+	def _release(self, host: Tuple[str, str, int], conn: HTTPConnection, reusable: bool) -> None:
+		"""Return the connection to the pool or close it.
+		@param host: scheme, host name and port
+		@type host: Tuple[str, str, int]
+		@param conn: connection used for the request
+		@type conn: HTTPConnection
+		@param reusable: whether the connection can be used for the next requests
+		@type reusable: bool
+		"""
+		if reusable:
+			with self._lock:
+				self._idle.setdefault(host, []).append((conn, monotonic()))
+		else:
+			conn.close()
+		self._limits[host].release()
+
+	def _request(self, url: str, headers: Dict[str, str], method: str, timeout: float) -> Response:
+		"""Perform a single request without following redirects.
+		A stale persistent connection is replaced by a new one and the request is repeated once.
+		@param url: full URL of the request
+		@type url: str
+		@param headers: request headers
+		@type headers: Dict[str, str]
+		@param method: HTTP method
+		@type method: str
+		@param timeout: timeout in seconds
+		@type timeout: float
+		@return: completely read response
+		@rtype: Response
+		"""
+		parts = urlsplit(url)
+		scheme: str = parts.scheme or 'https'
+		host = (scheme, parts.hostname or '', parts.port or (443 if scheme == 'https' else 80))
+		path: str = parts.path or '/'
+		if parts.query:
+			path += '?' + parts.query
+		while True:
+			conn, reused = self._acquire(host, timeout)
+			try:
+				conn.request(method, path, headers=headers)
+				resp = conn.getresponse()
+				body: bytes = resp.read()
+			except staleErrors:
+				self._release(host, conn, False)
+				if reused:
+					continue
+				raise
+			except BaseException:
+				self._release(host, conn, False)
+				raise
+			self._release(host, conn, not resp.will_close)
+			return Response(url, resp.status, resp.headers, body)
+
+	def request(
+		self,
+		url: str,
+		headers: Dict[str, str] = {},
+		method: str = 'GET',
+		timeout: Optional[float] = None,
+		circuit: Optional[CircuitBreaker] = None,
+		rateLimiter: Optional[RateLimiter] = None
+	) -> Response:
+		"""Perform a request using a persistent connection to the host.
+		If the circuit breaker of the endpoint is specified, the request fails immediately while it is open,
+		and the result of the request is taken into account in its state.
+		If the rate limiter is specified, the request fails immediately while the request limit
+		of the service is reached, unless the limit is lifted in a couple of seconds.
+		@param url: full URL of the request
+		@type url: str
+		@param headers: request headers
+		@type headers: Dict[str, str]
+		@param method: HTTP method
+		@type method: str
+		@param timeout: timeout in seconds, by default it is determined by the circuit breaker
+		@type timeout: Optional[float]
+		@param circuit: circuit breaker of the endpoint
+		@type circuit: Optional[CircuitBreaker]
+		@param rateLimiter: rate limiter of the endpoint
+		@type rateLimiter: Optional[RateLimiter]
+		@return: completely read response
+		@rtype: Response
+		"""
+		if rateLimiter is not None and not rateLimiter.acquire():
+			raise RateLimitError(rateLimiter.message)
+		if circuit is not None:
+			if not circuit.allow():
+				raise CircuitOpenError(circuit.message)
+			timeout = timeout or circuit.timeout
+		started: float = monotonic()
+		try:
+			for i in range(self.maxRedirects + 1):
+				resp = self._request(url, headers, method, timeout or 8)
+				location: Optional[str] = resp.getheader('Location')
+				if resp.status not in (301, 302, 303, 307, 308) or not location:
+					break
+				url = urljoin(url, location)
+		except PoolExhaustedError:
+			# the request has not reached the server, so the trial request of the half-open circuit is not used up
+			if circuit is not None:
+				circuit.release()
+			raise
+		except BaseException:
+			if circuit is not None:
+				circuit.fail()
+			raise
+		if rateLimiter is not None and resp.status == 429:
+			retryAfter: str = resp.getheader('Retry-After') or ''
+			rateLimiter.block(float(retryAfter) if retryAfter.isdigit() else 60.0)
+		if circuit is not None:
+			if resp.status >= 500:
+				circuit.fail()
+			else:
+				circuit.succeed(monotonic() - started)
+		return resp
+
+	def close(self) -> None:
+		"""Close all idle connections."""
+		with self._lock:
+			for idle in self._idle.values():
+				for conn, lastUsed in idle:
+					conn.close()
+			self._idle.clear()
+
+
+class AsyncConnectionPool(object):
+	"""Pool of persistent HTTP(S) connections used by the coroutines running on the event loop of the add-on.
+	It has the same behaviour as ConnectionPool, but waiting for the server does not block a thread,
+	and a cancelled request closes its connection immediately.
+	All methods must be called in the thread of the event loop.
+	"""
+
+	def __init__(self, maxPerHost: int = 8, idleTimeout: float = 60.0, maxRedirects: int = 3) -> None:
+		"""Pool parameters.
+		@param maxPerHost: maximum number of simultaneous connections to one host
+		@type maxPerHost: int
+		@param idleTimeout: time in seconds after which an unused connection is closed
+		@type idleTimeout: float
+		@param maxRedirects: maximum number of redirects followed in one request
+		@type maxRedirects: int
+		"""
+		self.maxPerHost = maxPerHost
+		self.idleTimeout = idleTimeout
+		self.maxRedirects = maxRedirects
+		self._idle: Dict[Tuple[str, str, int], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter, float]]] = {}
+		self._limits: Dict[Tuple[str, str, int], asyncio.Semaphore] = {}
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+	async def _acquire(
+		self,
+		host: Tuple[str, str, int],
+		timeout: float
+	) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+		"""Take an idle connection to the host from the pool or open a new one.
+		@param host: scheme, host name and port
+		@type host: Tuple[str, str, int]
+		@param timeout: connection timeout in seconds
+		@type timeout: float
+		@return: connection streams and a sign that the connection has already been used
+		@rtype: Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]
+		"""
+		loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+		if loop is not self._loop:
+			# connections and semaphores are bound to the event loop that created them
+			self._loop, self._idle, self._limits = loop, {}, {}
+		limit: asyncio.Semaphore = self._limits.setdefault(host, asyncio.Semaphore(self.maxPerHost))
+		try:
+			await asyncio.wait_for(limit.acquire(), timeout)
+		except asyncio.TimeoutError:
+			raise PoolExhaustedError("Too many simultaneous connections to %s" % host[1])
+		idle = self._idle.get(host, [])
+		while idle:
+			reader, writer, lastUsed = idle.pop()
+			if monotonic() - lastUsed < self.idleTimeout and not reader.at_eof():
+				return reader, writer, True
+			writer.close()
+		scheme, hostname, port = host
+		try:
+			reader, writer = await asyncio.wait_for(asyncio.open_connection(
+				hostname,
+				port,
+				# the same context as for the synchronous connections
+				ssl=ssl._create_default_https_context() if scheme == 'https' else None),
+				timeout)
+		except BaseException:
+			limit.release()
+			raise
+		return reader, writer, False
+
+	def _release(
+		self,
+		host: Tuple[str, str, int],
+		reader: asyncio.StreamReader,
+		writer: asyncio.StreamWriter,
+		reusable: bool
+	) -> None:
+		"""Return the connection to the pool or close it.
+		@param host: scheme, host name and port
+		@type host: Tuple[str, str, int]
+		@param reader: input stream of the connection
+		@type reader: asyncio.StreamReader
+		@param writer: output stream of the connection
+		@type writer: asyncio.StreamWriter
+		@param reusable: whether the connection can be used for the next requests
+		@type reusable: bool
+		"""
+		if reusable:
+			self._idle.setdefault(host, []).append((reader, writer, monotonic()))
+		else:
+			writer.close()
+		limit: Optional[asyncio.Semaphore] = self._limits.get(host)
+		if limit is not None:
+			limit.release()
+
+	async def _exchange(
+		self,
+		reader: asyncio.StreamReader,
+		writer: asyncio.StreamWriter,
+		request: bytes,
+		method: str
+	) -> Tuple[int, HTTPMessage, bytes, bool]:
+		"""Send the request and read the complete response.
+		@param reader: input stream of the connection
+		@type reader: asyncio.StreamReader
+		@param writer: output stream of the connection
+		@type writer: asyncio.StreamWriter
+		@param request: serialized request
+		@type request: bytes
+		@param method: HTTP method
+		@type method: str
+		@return: status code, headers, body and a sign that the connection can be reused
+		@rtype: Tuple[int, HTTPMessage, bytes, bool]
+		"""
+		writer.write(request)
+		await writer.drain()
+		head: bytes = await reader.readuntil(b"\r\n\r\n")
+		statusLine, _sep, rest = head.partition(b"\r\n")
+		parts: List[bytes] = statusLine.split(None, 2)
+		if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+			raise HTTPException("Incorrect status line: %r" % statusLine)
+		status: int = int(parts[1])
+		headers: HTTPMessage = parse_headers(BytesIO(rest))
+		reusable: bool = parts[0] != b"HTTP/1.0" and headers.get('Connection', '').lower() != 'close'
+		body: bytes = b''
+		if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+			pass
+		elif headers.get('Transfer-Encoding', '').lower() == 'chunked':
+			chunks: List[bytes] = []
+			while True:
+				size: int = int((await reader.readuntil(b"\r\n")).split(b';')[0].strip(), 16)
+				if size == 0:
+					# skip the trailer headers
+					while (await reader.readuntil(b"\r\n")) != b"\r\n":
+						pass
+					break
+				chunks.append(await reader.readexactly(size))
+				await reader.readexactly(2)
+			body = b''.join(chunks)
+		elif headers.get('Content-Length', '').isdigit():
+			body = await reader.readexactly(int(headers['Content-Length']))
+		else:
+			body = await reader.read()
+			reusable = False
+		return status, headers, body, reusable
+
+	async def _request(self, url: str, headers: Dict[str, str], method: str, timeout: float) -> Response:
+		"""Perform a single request without following redirects.
+		A stale persistent connection is replaced by a new one and the request is repeated once.
+		@param url: full URL of the request
+		@type url: str
+		@param headers: request headers
+		@type headers: Dict[str, str]
+		@param method: HTTP method
+		@type method: str
+		@param timeout: timeout in seconds
+		@type timeout: float
+		@return: completely read response
+		@rtype: Response
+		"""
+		parts = urlsplit(url)
+		scheme: str = parts.scheme or 'https'
+		defaultPort: int = 443 if scheme == 'https' else 80
+		host = (scheme, parts.hostname or '', parts.port or defaultPort)
+		path: str = parts.path or '/'
+		if parts.query:
+			path += '?' + parts.query
+		lines: List[str] = ["%s %s HTTP/1.1" % (method, path)]
+		lines.append("Host: %s" % (host[1] if host[2] == defaultPort else "%s:%d" % host[1:]))
+		lines.extend("%s: %s" % (name, value) for name, value in headers.items())
+		lines.append("Accept-Encoding: identity")
+		request: bytes = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+		while True:
+			reader, writer, reused = await self._acquire(host, timeout)
+			try:
+				status, respHeaders, body, reusable = await asyncio.wait_for(
+					self._exchange(reader, writer, request, method), timeout)
+			except asyncStaleErrors:
+				self._release(host, reader, writer, False)
+				if reused:
+					continue
+				raise
+			except BaseException:
+				self._release(host, reader, writer, False)
+				raise
+			self._release(host, reader, writer, reusable)
+			return Response(url, status, respHeaders, body)
+
+	async def request(
+		self,
+		url: str,
+		headers: Dict[str, str] = {},
+		method: str = 'GET',
+		timeout: Optional[float] = None,
+		circuit: Optional[CircuitBreaker] = None,
+		rateLimiter: Optional[RateLimiter] = None
+	) -> Response:
+		"""Perform a request using a persistent connection to the host.
+		The circuit breaker and the rate limiter of the endpoint are used in the same way as in ConnectionPool.
+		@param url: full URL of the request
+		@type url: str
+		@param headers: request headers
+		@type headers: Dict[str, str]
+		@param method: HTTP method
+		@type method: str
+		@param timeout: timeout in seconds, by default it is determined by the circuit breaker
+		@type timeout: Optional[float]
+		@param circuit: circuit breaker of the endpoint
+		@type circuit: Optional[CircuitBreaker]
+		@param rateLimiter: rate limiter of the endpoint
+		@type rateLimiter: Optional[RateLimiter]
+		@return: completely read response
+		@rtype: Response
+		"""
+		if rateLimiter is not None and not await rateLimiter.acquireAsync():
+			raise RateLimitError(rateLimiter.message)
+		if circuit is not None:
+			if not circuit.allow():
+				raise CircuitOpenError(circuit.message)
+			timeout = timeout or circuit.timeout
+		started: float = monotonic()
+		try:
+			for i in range(self.maxRedirects + 1):
+				resp = await self._request(url, headers, method, timeout or 8)
+				location: Optional[str] = resp.getheader('Location')
+				if resp.status not in (301, 302, 303, 307, 308) or not location:
+					break
+				url = urljoin(url, location)
+		except PoolExhaustedError:
+			# the request has not reached the server, so the trial request of the half-open circuit is not used up
+			if circuit is not None:
+				circuit.release()
+			raise
+		except asyncio.CancelledError:
+			# the request was cancelled by the add-on, the server is not to blame
+			if circuit is not None:
+				circuit.release()
+			raise
+		except BaseException:
+			if circuit is not None:
+				circuit.fail()
+			raise
+		if rateLimiter is not None and resp.status == 429:
+			retryAfter: str = resp.getheader('Retry-After') or ''
+			rateLimiter.block(float(retryAfter) if retryAfter.isdigit() else 60.0)
+		if circuit is not None:
+			if resp.status >= 500:
+				circuit.fail()
+			else:
+				circuit.succeed(monotonic() - started)
+		return resp
+
+	def close(self) -> None:
+		"""Close all idle connections."""
+		for idle in self._idle.values():
+			for reader, writer, lastUsed in idle:
+				writer.close()
+		self._idle.clear()
+
+
+# An instance of the connection pool shared by all services
+pool = ConnectionPool()
+# An instance of the connection pool shared by all coroutines of the services
+asyncPool = AsyncConnectionPool()
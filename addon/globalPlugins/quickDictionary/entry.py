@@ -0,0 +1,675 @@
+# entry.py
+# Structured model of the dictionary entry and its renderers for speech, braille and the browseable window
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from __future__ import annotations
+from typing import Callable, Optional, Union, List, Dict, Sequence, Tuple
+from html import escape
+import addonHandler
+from logHandler import log
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+
+class Term(object):
+	"""Word or phrase with its grammatical attributes.
+	Headwords, translations, synonyms and examples are represented by terms.
+	"""
+	__slots__ = ('text', 'attrs', 'translations')
+
+	def __init__(
+		self,
+		text: str,
+		attrs: Tuple[Tuple[str, str], ...] = (),
+		translations: Sequence[Term] = ()
+	) -> None:
+		"""Fields of the term.
+		Most of the terms have neither attributes nor translations, they share the empty tuples.
+		@param text: word or phrase
+		@type text: str
+		@param attrs: grammatical attributes as pairs of the field name and value, the name may be empty;
+		the same attributes are repeated in many terms, so they are stored in the hashable form
+		@type attrs: Tuple[Tuple[str, str], ...]
+		@param translations: translations of the term, for example of the usage example
+		@type translations: Sequence[Term]
+		"""
+		self.text: str = text
+		self.attrs: Tuple[Tuple[str, str], ...] = attrs
+		self.translations: Sequence[Term] = translations
+
+	def toDict(self) -> Dict:
+		"""Convert the term to a dict type for storing it in the cache, the empty members are omitted.
+		@return: dict, which contains the text, attributes and translations of the term
+		@rtype: Dict
+		"""
+		rec: Dict = {'text': self.text}
+		if self.attrs:
+			rec['attrs'] = self.attrs
+		if self.translations:
+			rec['translations'] = [term.toDict() for term in self.translations]
+		return rec
+
+	@classmethod
+	def fromDict(cls, rec: Dict) -> Term:
+		"""Restore the term stored in the cache.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: restored term
+		@rtype: Term
+		"""
+		return cls(
+			rec['text'],
+			tuple([(name, value) for name, value in rec.get('attrs', [])]),
+			[Term.fromDict(term) for term in rec.get('translations', [])])
+
+
+class Field(object):
+	"""Named list of additional values, such as synonyms, examples or the register of the sense."""
+	__slots__ = ('name', 'values', 'sep')
+
+	def __init__(self, name: str, values: List[Union[Term, Sense]], sep: str = ', ') -> None:
+		"""Fields of the named list.
+		@param name: translated name of the field
+		@type name: str
+		@param values: terms or nested senses (for example compositional phrases)
+		@type values: List[Union[Term, Sense]]
+		@param sep: separator between the terms
+		@type sep: str
+		"""
+		self.name: str = name
+		self.values: List[Union[Term, Sense]] = values
+		self.sep: str = sep
+
+	def toDict(self) -> Dict:
+		"""Convert the field to a dict type for storing it in the cache.
+		@return: dict, which contains the name, values and separator of the field
+		@rtype: Dict
+		"""
+		rec: Dict = {'name': self.name, 'values': [value.toDict() for value in self.values]}
+		if self.sep != ', ':
+			rec['sep'] = self.sep
+		return rec
+
+	@classmethod
+	def fromDict(cls, rec: Dict) -> Field:
+		"""Restore the field stored in the cache, the terms are distinguished from the senses by their text.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: restored field
+		@rtype: Field
+		"""
+		return cls(
+			rec['name'],
+			[Term.fromDict(value) if 'text' in value else Sense.fromDict(value) for value in rec['values']],
+			rec.get('sep', ', '))
+
+
+class Sense(object):
+	"""One meaning of the headword: its definition, translations and additional fields."""
+	__slots__ = ('term', 'definition', 'translations', 'fields', 'senses')
+
+	def __init__(
+		self,
+		term: Optional[Term] = None,
+		definition: str = '',
+		translations: Optional[List[Tuple[str, List[Term]]]] = None,
+		fields: Optional[List[Field]] = None,
+		senses: Optional[List[Sense]] = None
+	) -> None:
+		"""Fields of the sense.
+		@param term: phrase described by the sense, for example the compositional phrase
+		@type term: Optional[Term]
+		@param definition: definition of the sense in the source language
+		@type definition: str
+		@param translations: pairs of the language name and translations into this language,
+		the language name is empty for the target language
+		@type translations: Optional[List[Tuple[str, List[Term]]]]
+		@param fields: additional named fields of the sense
+		@type fields: Optional[List[Field]]
+		@param senses: nested senses
+		@type senses: Optional[List[Sense]]
+		"""
+		self.term: Optional[Term] = term
+		self.definition: str = definition
+		self.translations: List[Tuple[str, List[Term]]] = translations or []
+		self.fields: List[Field] = fields or []
+		self.senses: List[Sense] = senses or []
+
+	def toDict(self) -> Dict:
+		"""Convert the sense to a dict type for storing it in the cache, the empty members are omitted.
+		@return: dict, which contains the members of the sense
+		@rtype: Dict
+		"""
+		rec: Dict = {}
+		if self.term:
+			rec['term'] = self.term.toDict()
+		if self.definition:
+			rec['definition'] = self.definition
+		if self.translations:
+			rec['translations'] = [[lang, [term.toDict() for term in terms]] for lang, terms in self.translations]
+		if self.fields:
+			rec['fields'] = [field.toDict() for field in self.fields]
+		if self.senses:
+			rec['senses'] = [sense.toDict() for sense in self.senses]
+		return rec
+
+	@classmethod
+	def fromDict(cls, rec: Dict) -> Sense:
+		"""Restore the sense stored in the cache.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: restored sense
+		@rtype: Sense
+		"""
+		return cls(
+			Term.fromDict(rec['term']) if 'term' in rec else None,
+			rec.get('definition', ''),
+			[(lang, [Term.fromDict(term) for term in terms]) for lang, terms in rec.get('translations', [])],
+			[Field.fromDict(field) for field in rec.get('fields', [])],
+			[Sense.fromDict(sense) for sense in rec.get('senses', [])])
+
+
+class Headword(object):
+	"""Headword of the entry with the list of its senses."""
+	__slots__ = ('term', 'fields', 'senses')
+
+	def __init__(
+		self,
+		term: Term,
+		fields: Optional[List[Field]] = None,
+		senses: Optional[List[Sense]] = None
+	) -> None:
+		"""Fields of the headword.
+		@param term: the headword and its part of speech
+		@type term: Term
+		@param fields: additional named fields of the headword, such as inflections
+		@type fields: Optional[List[Field]]
+		@param senses: meanings of the headword
+		@type senses: Optional[List[Sense]]
+		"""
+		self.term: Term = term
+		self.fields: List[Field] = fields or []
+		self.senses: List[Sense] = senses or []
+
+	def toDict(self) -> Dict:
+		"""Convert the headword to a dict type for storing it in the cache, the empty members are omitted.
+		@return: dict, which contains the headword, its fields and senses
+		@rtype: Dict
+		"""
+		rec: Dict = {'term': self.term.toDict()}
+		if self.fields:
+			rec['fields'] = [field.toDict() for field in self.fields]
+		if self.senses:
+			rec['senses'] = [sense.toDict() for sense in self.senses]
+		return rec
+
+	@classmethod
+	def fromDict(cls, rec: Dict) -> Headword:
+		"""Restore the headword stored in the cache.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: restored headword
+		@rtype: Headword
+		"""
+		return cls(
+			Term.fromDict(rec['term']),
+			[Field.fromDict(field) for field in rec.get('fields', [])],
+			[Sense.fromDict(sense) for sense in rec.get('senses', [])])
+
+
+class Entry(object):
+	"""Dictionary entry independent of the output format.
+	It is built by the service parser once and rendered directly into any of the formats.
+	"""
+	__slots__ = ('headwords', 'error')
+
+	def __init__(self, headwords: Optional[List[Headword]] = None, error: str = '') -> None:
+		"""Fields of the entry.
+		@param headwords: all found headwords (homographs) in the order of the response
+		@type headwords: Optional[List[Headword]]
+		@param error: error message received instead of the entry
+		@type error: str
+		"""
+		self.headwords: List[Headword] = headwords or []
+		self.error: str = error
+
+	def __bool__(self) -> bool:
+		"""Whether the entry contains anything to show.
+		@return: True if there are headwords or the error message
+		@rtype: bool
+		"""
+		return bool(self.headwords or self.error)
+
+	def toDict(self) -> Dict:
+		"""Convert the entry to a compact dict type for storing it in the cache instead of the rendered formats.
+		@return: dict, which contains the headwords or the error message, it is empty for the empty entry
+		@rtype: Dict
+		"""
+		rec: Dict = {}
+		if self.headwords:
+			rec['headwords'] = [headword.toDict() for headword in self.headwords]
+		if self.error:
+			rec['error'] = self.error
+		return rec
+
+	@classmethod
+	def fromDict(cls, rec: Dict) -> Entry:
+		"""Restore the entry stored in the cache.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: restored entry
+		@rtype: Entry
+		"""
+		return cls([Headword.fromDict(headword) for headword in rec.get('headwords', [])], rec.get('error', ''))
+
+
+class Renderer(object):
+	"""Converts the entry into the output format.
+	All elements of the entry are written one after another into a single buffer, which is joined at the end.
+	The child class defines the markup of each element of the entry.
+	"""
+	# separator of the lines within the field or the list of translations into several languages
+	lineBreak: str = '\r\n'
+	# whether the definition of the sense is preceded by the name of the field
+	labelDefinitions: bool = True
+	# markup of the field name followed by its value
+	labelFormat: str = "%s: "
+	# markup of the translations of the headword
+	highlight: Tuple[str, str] = ('', '')
+
+	def __init__(self) -> None:
+		"""The labels are translated once for each renderer."""
+		# Translators: Field name in a dictionary entry
+		self._mean: str = _("mean").capitalize()
+		self._out: List[str] = []
+		# markup of the field names and the attributes, which is prepared on the first use
+		self._labels: Dict[str, str] = {}
+		self._attrs: Dict[Tuple[Tuple[str, str], ...], str] = {}
+
+	def render(self, entry: Entry) -> str:
+		"""Convert the whole entry.
+		@param entry: structured dictionary entry
+		@type entry: Entry
+		@return: the entry in the output format
+		@rtype: str
+		"""
+		self._out = []
+		self.write(entry)
+		result: str = ''.join(self._out)
+		self._out = []
+		return result
+
+	def write(self, entry: Entry) -> None:
+		"""Write the whole entry into the buffer.
+		@param entry: structured dictionary entry
+		@type entry: Entry
+		"""
+		raise NotImplementedError("This method must be overridden in the child class!")
+
+	def escape(self, text: str) -> str:
+		"""Prepare the text of the response for the output format.
+		@param text: text of the response
+		@type text: str
+		@return: text ready to be inserted in the output
+		@rtype: str
+		"""
+		return text
+
+	def label(self, name: str) -> str:
+		"""Markup of the name of the field followed by its value.
+		@param name: translated name of the field
+		@type name: str
+		@return: the name of the field in the output format
+		@rtype: str
+		"""
+		markup: Optional[str] = self._labels.get(name)
+		if markup is None:
+			markup = self._labels[name] = self.labelFormat % self.escape(name)
+		return markup
+
+	def term(self, term: Term) -> None:
+		"""Write the term with its attributes and translations as a single line.
+		@param term: word or phrase with its grammatical attributes
+		@type term: Term
+		"""
+		if term.attrs or term.translations:
+			self._out.append(self.escape(term.text) + self.attributes(term))
+		else:
+			self._out.append(self.escape(term.text))
+
+	def attributes(self, term: Term) -> str:
+		"""Markup of the attributes in parentheses and the translations, which follow the term itself.
+		@param term: word or phrase with its grammatical attributes
+		@type term: Term
+		@return: the attributes and the translations in the output format
+		@rtype: str
+		"""
+		markup: str = ''
+		if term.attrs:
+			cached: Optional[str] = self._attrs.get(term.attrs)
+			if cached is None:
+				escape: Callable[[str], str] = self.escape
+				cached = self._attrs[term.attrs] = " (%s)" % ', '.join([
+					self.label(name) + escape(value) if name else escape(value) for name, value in term.attrs])
+			markup = cached
+		translations: Sequence[Term] = term.translations
+		if not translations:
+			return markup
+		if len(translations) == 1 and not (translations[0].attrs or translations[0].translations):
+			# the usage example usually has the single translation
+			return markup + ' - ' + self.escape(translations[0].text)
+		return markup + ' - ' + self.join(translations, ', ')
+
+	def join(self, terms: Sequence[Term], sep: str, highlight: bool = False) -> str:
+		"""Markup of the list of terms, the terms are converted by the list comprehensions
+		to avoid the calls of the methods for the most of terms, which have neither attributes nor translations.
+		@param terms: words or phrases
+		@type terms: Sequence[Term]
+		@param sep: separator between the terms
+		@type sep: str
+		@param highlight: whether the terms are translations of the headword, which are highlighted
+		in the formats that support it
+		@type highlight: bool
+		@return: the terms in the output format
+		@rtype: str
+		"""
+		escape: Callable[[str], str] = self.escape
+		attributes: Callable[[Term], str] = self.attributes
+		if highlight and self.highlight[0]:
+			before, after = self.highlight
+			return sep.join([
+				before + escape(term.text) + after + attributes(term) if term.attrs or term.translations
+				else before + escape(term.text) + after
+				for term in terms])
+		# markup of the attributes, which is already prepared for the most of the repeated combinations
+		cached: Dict[Tuple[Tuple[str, str], ...], str] = self._attrs
+		return sep.join([
+			escape(term.text) if not (term.attrs or term.translations)
+			else escape(term.text) + cached[term.attrs] if not term.translations and term.attrs in cached
+			else escape(term.text) + attributes(term)
+			for term in terms])
+
+	def terms(self, terms: List[Term], sep: str, highlight: bool = False) -> None:
+		"""Write the list of terms.
+		@param terms: words or phrases
+		@type terms: List[Term]
+		@param sep: separator between the terms
+		@type sep: str
+		@param highlight: whether the terms are translations of the headword, which are highlighted
+		in the formats that support it
+		@type highlight: bool
+		"""
+		self._out.append(self.join(terms, sep, highlight))
+
+	def inline(self, sense: Sense) -> List[Term]:
+		"""Translations into the target language, which are shown in the heading line of the sense.
+		@param sense: one meaning of the headword
+		@type sense: Sense
+		@return: translations or an empty list if the translations into several languages are shown
+		@rtype: List[Term]
+		"""
+		if len(sense.translations) == 1 and not sense.translations[0][0]:
+			return sense.translations[0][1]
+		return []
+
+	def sense(self, sense: Sense, translations: List[Term]) -> bool:
+		"""Write the heading line of the sense: the described phrase, definition and translations.
+		@param sense: one meaning of the headword
+		@type sense: Sense
+		@param translations: translations shown in the heading line, obtained by the inline() method
+		@type translations: List[Term]
+		@return: whether the sense has the heading line
+		@rtype: bool
+		"""
+		out: List[str] = self._out
+		started: bool = False
+		if sense.term:
+			self.term(sense.term)
+			started = True
+		if sense.definition:
+			if started:
+				out.append(' - ')
+			elif self.labelDefinitions:
+				out.append(self.label(self._mean))
+			out.append(self.escape(sense.definition))
+			started = True
+		if translations:
+			if started:
+				out.append(' - ')
+			self.terms(translations, ', ', highlight=True)
+			started = True
+		return started
+
+	def languages(self, sense: Sense, sep: str) -> None:
+		"""Write the translations into several languages, one language per line.
+		@param sense: the sense which translations are shown for all available languages
+		@type sense: Sense
+		@param sep: separator between the languages
+		@type sep: str
+		"""
+		out: List[str] = self._out
+		for i, (lang, translations) in enumerate(sense.translations):
+			if i:
+				out.append(sep)
+			out.append(self.escape(lang))
+			out.append(' - ')
+			self.terms(translations, ', ', highlight=True)
+
+	def field(self, field: Field) -> None:
+		"""Write the named field, the senses used as its values occupy separate lines.
+		@param field: named list of values
+		@type field: Field
+		"""
+		terms: List[Term] = [value for value in field.values if isinstance(value, Term)]
+		self._out.append(self.label(field.name) + self.join(terms, field.sep))
+		if len(terms) == len(field.values):
+			return
+		started: bool = bool(terms)
+		for value in field.values:
+			if isinstance(value, Sense):
+				if started:
+					self._out.append(self.lineBreak)
+				self.senseLines(value)
+				started = True
+
+	def senseLines(self, sense: Sense) -> None:
+		"""Write the sense used as the value of the field, including its fields and nested senses.
+		@param sense: the sense, for example the compositional phrase
+		@type sense: Sense
+		"""
+		out: List[str] = self._out
+		translations: List[Term] = self.inline(sense)
+		started: bool = self.sense(sense, translations)
+		if sense.translations and not translations:
+			if started:
+				out.append(self.lineBreak)
+			self.languages(sense, self.lineBreak)
+			started = True
+		for field in sense.fields:
+			if started:
+				out.append(self.lineBreak)
+			self.field(field)
+			started = True
+		for nested in sense.senses:
+			if started:
+				out.append(self.lineBreak)
+			self.senseLines(nested)
+			started = True
+
+
+class TextRenderer(Renderer):
+	"""Plain text of the entry for announcing it by the speech synthesizer.
+	Each element of the entry occupies a separate line.
+	"""
+	# marker of the headword line
+	headword: str = "- "
+	# marker of the sense line
+	bullet: str = "• "
+
+	def write(self, entry: Entry) -> None:
+		"""Write the whole entry as plain text.
+		@param entry: structured dictionary entry
+		@type entry: Entry
+		"""
+		out: List[str] = self._out
+		if entry.error:
+			out.append(self.headword)
+			out.append(entry.error)
+			return
+		for headword in entry.headwords:
+			if out:
+				out.append(self.lineBreak)
+			out.append(self.headword)
+			self.term(headword.term)
+			for field in headword.fields:
+				out.append(self.lineBreak)
+				self.field(field)
+			self.senses(headword.senses)
+
+	def senses(self, senses: List[Sense]) -> None:
+		"""Write the senses and their nested senses, each of them begins with a new bulleted line.
+		@param senses: meanings of the headword
+		@type senses: List[Sense]
+		"""
+		out: List[str] = self._out
+		for sense in senses:
+			out.append(self.lineBreak)
+			out.append(self.bullet)
+			translations: List[Term] = self.inline(sense)
+			started: bool = self.sense(sense, translations)
+			if sense.translations and not translations:
+				if started:
+					out.append(self.lineBreak)
+				self.languages(sense, self.lineBreak)
+				started = True
+			for field in sense.fields:
+				if started:
+					out.append(self.lineBreak)
+				self.field(field)
+				started = True
+			self.senses(sense.senses)
+
+
+class BrailleRenderer(Renderer):
+	"""Short single-line form of the entry for the braille display.
+	Only the headwords with their senses are shown, additional fields are available in the full entry.
+	"""
+	labelDefinitions: bool = False
+
+	def write(self, entry: Entry) -> None:
+		"""Write the entry as a single line.
+		@param entry: structured dictionary entry
+		@type entry: Entry
+		"""
+		out: List[str] = self._out
+		if entry.error:
+			out.append(entry.error)
+			return
+		for i, headword in enumerate(entry.headwords):
+			if i:
+				out.append(' | ')
+			self.term(headword.term)
+			if headword.senses:
+				out.append(': ')
+				self.senses(headword.senses, True)
+
+	def senses(self, senses: List[Sense], first: bool) -> bool:
+		"""Write the heading lines of the senses and their nested senses separated by semicolons.
+		@param senses: meanings of the headword
+		@type senses: List[Sense]
+		@param first: whether nothing has been written after the headword yet
+		@type first: bool
+		@return: whether nothing has been written after the headword yet
+		@rtype: bool
+		"""
+		for sense in senses:
+			translations: List[Term] = self.inline(sense)
+			if sense.term or sense.definition or translations:
+				if not first:
+					self._out.append('; ')
+				self.sense(sense, translations)
+				first = False
+			elif sense.translations:
+				if not first:
+					self._out.append('; ')
+				self.languages(sense, '; ')
+				first = False
+			first = self.senses(sense.senses, first)
+		return first
+
+
+class HtmlRenderer(Renderer):
+	"""Hypertext of the entry for the browseable window."""
+	lineBreak: str = "<br>\n"
+	labelFormat: str = "<i>%s</i>: "
+	highlight: Tuple[str, str] = ("<b>", "</b>")
+
+	def write(self, entry: Entry) -> None:
+		"""Write the whole entry as HTML.
+		@param entry: structured dictionary entry
+		@type entry: Entry
+		"""
+		out: List[str] = self._out
+		if entry.error:
+			out.append("<h1>%s</h1>" % escape(entry.error))
+			return
+		for headword in entry.headwords:
+			if out:
+				out.append('\n')
+			out.append("<h1>")
+			self.term(headword.term)
+			out.append("</h1>")
+			for field in headword.fields:
+				out.append("\n<p>")
+				self.field(field)
+				out.append("</p>")
+			if headword.senses:
+				out.append('\n')
+				self.senses(headword.senses)
+
+	def senses(self, senses: List[Sense]) -> None:
+		"""Write the bulleted list of the senses and their nested senses.
+		@param senses: meanings of the headword
+		@type senses: List[Sense]
+		"""
+		out: List[str] = self._out
+		out.append("<ul>\n")
+		for sense in senses:
+			out.append("<li>")
+			translations: List[Term] = self.inline(sense)
+			started: bool = self.sense(sense, translations)
+			if sense.translations and not translations:
+				out.append("\n<p>" if started else "<p>")
+				self.languages(sense, ";<br>\n")
+				out.append("</p>")
+				started = True
+			for field in sense.fields:
+				out.append("\n<p>" if started else "<p>")
+				self.field(field)
+				out.append("</p>")
+				started = True
+			if sense.senses:
+				if started:
+					out.append('\n')
+				self.senses(sense.senses)
+			out.append("</li>\n")
+		out.append("</ul>")
+
+	def escape(self, text: str) -> str:
+		"""Escape the characters of the response that have a special meaning in HTML.
+		Most of the strings do not contain such characters, so they are returned without copying.
+		@param text: text of the response
+		@type text: str
+		@return: text ready to be inserted in the output
+		@rtype: str
+		"""
+		if '<' in text or '&' in text or '>' in text:
+			return escape(text, quote=False)
+		return text
@@ -0,0 +1,117 @@
+# eventloop.py
+# Background asyncio event loop shared by all requests of the add-on
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Any, Callable, Optional, Coroutine
+import asyncio
+from concurrent.futures import Future
+from threading import Thread, Lock, get_ident
+from logHandler import log
+
+
+class EventLoop(object):
+	"""The asyncio event loop running in a single background thread.
+	Requests to the online services are performed on this loop as coroutines,
+	so waiting for the responses does not require a separate thread for each request.
+	Coroutines are submitted from any thread and their results are available through thread-safe futures.
+	"""
+
+	def __init__(self) -> None:
+		"""The loop and its thread are created when the first coroutine is submitted."""
+		self._lock = Lock()
+		self._loop: Optional[asyncio.AbstractEventLoop] = None
+		self._thread: Optional[Thread] = None
+
+	@property
+	def loop(self) -> asyncio.AbstractEventLoop:
+		"""Running event loop, it is started if necessary.
+		@return: the event loop of the add-on
+		@rtype: asyncio.AbstractEventLoop
+		"""
+		with self._lock:
+			if self._loop is None or self._loop.is_closed():
+				self._loop = asyncio.new_event_loop()
+				self._thread = Thread(target=self._run, args=(self._loop,), name="quickDictionaryLoop", daemon=True)
+				self._thread.start()
+			return self._loop
+
+	def _run(self, loop: asyncio.AbstractEventLoop) -> None:
+		"""Run the event loop until it is stopped.
+		@param loop: the event loop of the add-on
+		@type loop: asyncio.AbstractEventLoop
+		"""
+		asyncio.set_event_loop(loop)
+		try:
+			loop.run_forever()
+		finally:
+			try:
+				tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+				for task in tasks:
+					task.cancel()
+				loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+				loop.run_until_complete(loop.shutdown_asyncgens())
+			except Exception as e:
+				log.error("Unable to complete the tasks of the event loop: %s", str(e))
+			loop.close()
+
+	@property
+	def inLoop(self) -> bool:
+		"""Whether the current code is executed in the thread of the event loop.
+		@return: True if called from the event loop thread
+		@rtype: bool
+		"""
+		return self._thread is not None and self._thread.ident == get_ident()
+
+	def submit(self, coro: Coroutine) -> Future:
+		"""Schedule the coroutine on the event loop.
+		Cancelling the returned future also cancels the coroutine.
+		@param coro: coroutine to be executed
+		@type coro: Coroutine
+		@return: thread-safe future with the result of the coroutine
+		@rtype: concurrent.futures.Future
+		"""
+		return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+	def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+		"""Execute the coroutine on the event loop and wait for its result.
+		Must not be called from the event loop thread, because the loop would wait for itself.
+		@param coro: coroutine to be executed
+		@type coro: Coroutine
+		@param timeout: maximum waiting time in seconds
+		@type timeout: Optional[float]
+		@return: result of the coroutine
+		@rtype: Any
+		"""
+		if self.inLoop:
+			coro.close()
+			raise RuntimeError("Blocking call from the thread of the event loop")
+		future: Future = self.submit(coro)
+		try:
+			return future.result(timeout)
+		except BaseException:
+			future.cancel()
+			raise
+
+	def callSoon(self, callback: Callable, *args) -> None:
+		"""Call the function in the thread of the event loop if the loop is running.
+		@param callback: function to be called
+		@type callback: Callable
+		"""
+		with self._lock:
+			loop: Optional[asyncio.AbstractEventLoop] = self._loop
+		if loop is not None and not loop.is_closed():
+			loop.call_soon_threadsafe(callback, *args)
+
+	def stop(self) -> None:
+		"""Cancel all unfinished coroutines and stop the event loop."""
+		with self._lock:
+			loop, self._loop = self._loop, None
+		if loop is not None and not loop.is_closed():
+			loop.call_soon_threadsafe(loop.stop)
+
+
+# An instance of the event loop for use in the add-on
+eventLoop = EventLoop()
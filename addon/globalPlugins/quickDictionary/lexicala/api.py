@@ -8,19 +8,26 @@
 from typing import Any, Dict, List, Optional
 import os.path
 import ssl
+import asyncio
 import base64
-from urllib.request import Request, urlopen
-from urllib.parse import quote as urlencode
-from http.client import HTTPResponse
+from urllib.parse import quote as urlencode, urlsplit
 from json import loads
 from datetime import datetime, timedelta
 import config
 from .. import addonName
 from ..service import secrets
+from ..connections import pool, asyncPool, breaker, limiter, Response, CircuitOpenError, RateLimitError
+from ..caching import Cache
 
 ssl._create_default_https_context = ssl._create_unverified_context
 serviceName: str = os.path.basename(os.path.dirname(__file__))
 stat: Dict[str, Any] = {}  # Object for store statistics
+# Dictionary entries and senses do not change for a long time, so they are cached by their identifiers
+entriesCache = Cache(
+	os.path.join(config.getUserDefaultConfigPath(), "%s-%s.sqlite" % (addonName, serviceName)),
+	ttl=90 * 24 * 3600,
+	maxsize=20000,
+	maxbytes=64 * 1024 * 1024)
 
 
 class Lapi(object):
@@ -111,22 +118,75 @@ class Lapi(object):
 		@rtype: Dict
 		"""
 		response: Dict = {}
-		resp: Optional[HTTPResponse] = None
-		url: str = self._url + query
-		rq = Request(url)
-		for name, value in self._headers.items():
-			rq.add_header(name, value)
-		rq.add_header("X-RapidAPI-Key", secrets[serviceName].decode(config.conf[addonName][serviceName]['password']))
+		resp: Optional[Response] = None
 		try:
-			resp = urlopen(rq, timeout=8)
+			resp = pool.request(
+				self._url + query,
+				headers=self.headers,
+				circuit=breaker(stat, self.host),
+				rateLimiter=limiter(stat, self.host))
+		except (CircuitOpenError, RateLimitError) as e:
+			response['error'] = str(e)
+			return response
 		except Exception as e:
 			# e.getcode()==429 -> "To date, the number of allowed queries to the dictionary is exhausted!"
 			response['error'] = "HTTP error: %s" % str(e)
 			return response
+		return self.decode(resp)
+
+	async def aget(self, query: str) -> Dict:
+		"""Request to the Lexicala online dictionary performed by the event loop.
+		@param query: generated query URL not including domain name
+		@type query: str
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		try:
+			resp: Response = await asyncPool.request(
+				self._url + query,
+				headers=self.headers,
+				circuit=breaker(stat, self.host),
+				rateLimiter=limiter(stat, self.host))
+		except (CircuitOpenError, RateLimitError) as e:
+			return {'error': str(e)}
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			return {'error': "HTTP error: %s" % (str(e) or type(e).__name__)}
+		return self.decode(resp)
+
+	@property
+	def host(self) -> str:
+		"""Host name of the Lexicala API server.
+		@return: host name used to identify the endpoint in the statistics
+		@rtype: str
+		"""
+		return urlsplit(self._url).hostname or self._url
+
+	@property
+	def headers(self) -> Dict[str, str]:
+		"""Request headers including the access key.
+		@return: HTTP headers
+		@rtype: Dict[str, str]
+		"""
+		headers: Dict[str, str] = dict(self._headers)
+		headers["X-RapidAPI-Key"] = secrets[serviceName].decode(config.conf[addonName][serviceName]['password'])
+		return headers
+
+	def decode(self, resp: Optional[Response]) -> Dict:
+		"""Deserialize the response of the server and update the statistics of the daily quota.
+		@param resp: response from the server
+		@type resp: Optional[Response]
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		response: Dict = {}
 		if resp:
 			stat['remain'] = resp.getheader("X-RateLimit-requests-Remaining", 0)
 			stat['count'] = int(resp.getheader("X-RateLimit-requests-Limit", 0)) - int(stat['remain'])
 			stat['delta'] = datetime.now() - self.parseDate(resp.getheader('date', ''))
+			if resp.getheader("X-RateLimit-requests-Remaining") is not None:
+				limiter(stat, self.host).seed(int(stat['remain']), self.resetIn(resp))
 			if resp.getcode() == 200:
 				text: str = resp.read().decode(encoding='utf-8', errors='ignore')
 				try:
@@ -137,19 +197,63 @@ class Lapi(object):
 				response['error'] = "Response code: %d" % resp.getcode()
 		return response
 
-	def search(self) -> Dict:
-		"""Request a word search in the online dictionary.
-		@return: deserialized response from the server
+	def cached(self, query: str) -> Dict:
+		"""Request to the online dictionary, the response of which is taken from the cache if possible.
+		Only successful responses are stored in the cache.
+		@param query: generated query URL not including domain name
+		@type query: str
+		@return: deserialized response from the cache or from the online dictionary
+		@rtype: Dict
+		"""
+		response: Optional[Dict] = entriesCache.get(query)
+		if response is None:
+			response = self.get(query)
+			if response and not response.get('error'):
+				entriesCache.put(query, response)
+		return response
+
+	async def acached(self, query: str) -> Dict:
+		"""Request to the online dictionary performed by the event loop.
+		The response is taken from the cache if possible.
+		@param query: generated query URL not including domain name
+		@type query: str
+		@return: deserialized response from the cache or from the online dictionary
 		@rtype: Dict
 		"""
-		query: str = "search?source={dict}&language={lang}&text={text}&morph={morph}&analyzed={analyzed}".format(
+		response: Optional[Dict] = entriesCache.get(query)
+		if response is None:
+			response = await self.aget(query)
+			if response and not response.get('error'):
+				entriesCache.put(query, response)
+		return response
+
+	@property
+	def searchQuery(self) -> str:
+		"""Query of the word search according to the specified parameters.
+		@return: generated query URL not including domain name
+		@rtype: str
+		"""
+		return "search?source={dict}&language={lang}&text={text}&morph={morph}&analyzed={analyzed}".format(
 			dict=self.source,
 			lang=self.language,
 			text=urlencode(self.text),
 			morph=str(self.morph).lower(),
 			analyzed=str(self.analyzed).lower()
 		)
-		return self.get(query)
+
+	def search(self) -> Dict:
+		"""Request a word search in the online dictionary.
+		@return: deserialized response from the server
+		@rtype: Dict
+		"""
+		return self.get(self.searchQuery)
+
+	async def asearch(self) -> Dict:
+		"""Request a word search in the online dictionary using the event loop.
+		@return: deserialized response from the server
+		@rtype: Dict
+		"""
+		return await self.aget(self.searchQuery)
 
 	def entries(self, id: str) -> Dict:
 		"""Request on a dictionary entry by its ID.
@@ -161,7 +265,19 @@ class Lapi(object):
 		query: str = "entries/{entry_id}".format(
 			entry_id=id
 		)
-		return self.get(query)
+		return self.cached(query)
+
+	async def aentries(self, id: str) -> Dict:
+		"""Request on a dictionary entry by its ID using the event loop.
+		@param id: identifier of a specific dictionary entry
+		@type id: str
+		@return: deserialized response from the server
+		@rtype: Dict
+		"""
+		query: str = "entries/{entry_id}".format(
+			entry_id=id
+		)
+		return await self.acached(query)
 
 	def senses(self, id: str) -> Dict:
 		"""Request on a dictionary entry for the specific sense of word by its ID.
@@ -173,7 +289,7 @@ class Lapi(object):
 		query: str = "senses/{sense_id}".format(
 			sense_id=id
 		)
-		return self.get(query)
+		return self.cached(query)
 
 	def languages(self) -> Dict:
 		"""Request for lists of all languages available in the online dictionary.
@@ -191,6 +307,22 @@ class Lapi(object):
 		"""
 		return self.get('test')
 
+	def resetIn(self, resp: Response) -> float:
+		"""Time remaining until the daily quota of requests is reset.
+		The value reported by the service is used if possible, otherwise the time until the next midnight
+		is calculated by the server clock, taking into account the difference with the local clock.
+		@param resp: response from the online dictionary
+		@type resp: Response
+		@return: number of seconds
+		@rtype: float
+		"""
+		reset: str = resp.getheader("X-RateLimit-requests-Reset", '') or ''
+		if reset.isdigit():
+			return float(reset)
+		tomorrow = datetime.now() + timedelta(days=1)
+		middle = datetime(tomorrow.year, tomorrow.month, tomorrow.day)
+		return float((middle + stat['delta'] - datetime.now()).seconds)
+
 	def parseDate(self, datestr: str) -> datetime:
 		"""Analyze a date string and convert it to a datetime object.
 		@param datestr: the date as a text string
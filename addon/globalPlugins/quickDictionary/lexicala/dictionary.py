@@ -6,13 +6,15 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Any, Callable, List, Dict, Union
+from typing import Any, Callable, Optional, List, Dict, Tuple, Type, Union
+from functools import lru_cache
+import asyncio
 import addonHandler
 import config
 from logHandler import log
 from .. import addonName
-from ..service import Translator, Parser, secrets
-from ..shared import htmlTemplate
+from ..service import Translator, EntryParser, secrets
+from ..entry import Entry, Headword, Sense, Field, Term, TextRenderer, BrailleRenderer
 from .languages import langs
 from .api import Lapi, serviceName
 
@@ -31,12 +33,16 @@ confspec: Dict[str, str] = {
 	"from": "string(default=%s)" % langs.defaultFrom.code,
 	"into": "string(default=%s)" % langs.defaultInto.code,
 	"autoswap": "boolean(default=false)",
+	"speculative": "boolean(default=false)",  # Look up both directions simultaneously when auto-swapping
 	"copytoclip": "boolean(default=false)",
+	"prefetch": "boolean(default=false)",  # Load entries for words around the caret in the background
+	"vocabulary": "boolean(default=true)",  # Keep received entries in the personal offline dictionary
 	"username": 'string(default=%s)' % secrets[serviceName]._username,
 	"password": "string(default=%s)" % secrets[serviceName]._password,
 	"morph": "boolean(default=false)",  # Strip words to their stem
 	"analyzed": "boolean(default=false)",  # Searching both headwords and inflections
 	"all": "boolean(default=false)",  # Show all available translations
+	"workers": "integer(default=4,min=1,max=8)",  # Number of simultaneous requests of dictionary entries
 	"switchsynth": "boolean(default=false)"
 }
 
@@ -44,7 +50,7 @@ confspec: Dict[str, str] = {
 class ServiceTranslator(Translator):
 	"""Provides interaction with the online dictionary service."""
 
-	def __init__(self, langFrom: str, langTo: str, text: str, *args, **kwargs) -> None:
+	def __init__(self, langFrom: str, langTo: str, text: str) -> None:
 		"""Initialization of the source and target language, as well as word or phrase to search in the dictionary.
 		@param langFrom: source language
 		@type langFrom: str
@@ -53,7 +59,7 @@ class ServiceTranslator(Translator):
 		@param text: a word or phrase to look up in a dictionary
 		@type text: str
 		"""
-		super(ServiceTranslator, self).__init__(langFrom, langTo, text, *args, **kwargs)
+		super(ServiceTranslator, self).__init__(langFrom, langTo, text)
 
 	@property
 	def source(self) -> str:
@@ -79,85 +85,158 @@ class ServiceTranslator(Translator):
 		"""
 		return config.conf[addonName][serviceName]['analyzed']
 
-	def run(self) -> None:
+	async def lookup(self) -> None:
 		"""Query the remote dictionary and save the processed response.
-		Should run in a separate thread to avoid blocking.
+		Runs as a coroutine on the event loop of the add-on,
+		the dictionary entries of all found homographs are requested simultaneously.
 		"""
-		self._resp = Lapi(
+		self._resp = await Lapi(
 			text=self.text,
 			lang=self.langFrom,
 			source=self.source,
 			morph=self.morph,
 			analyzed=self.analyzed
-		).search()
+		).asearch()
 		if self._resp.get('error'):
 			self._error = True
-		parser = ServiceParser(response=self._resp, target=self.langTo)
-		html: str = parser.to_html()
-		self._html = htmlTemplate.format(body=html) if html else html
-		self._plaintext = parser.to_text()
-
-
-class ServiceParser(Parser):
-	"""Parse the deserialized response from the server and returns it in HTML and text formats."""
-
-	def __init__(self, response: Dict, target: str) -> None:
+		results: List[Dict] = self._resp.get('results') or []
+		tasks: List[asyncio.Future] = self.entries(results)
+		entries: List[Dict] = []
+		headwords: List[Headword] = []
+		partParser = ServiceParser(response=self._resp, target=self.langTo)
+		try:
+			# entries are received in parallel, but passed to the listener in the order of the search results
+			for result, task in zip(results, tasks):
+				entries.append(await task)
+				if self.onPart is not None:
+					part: List[Headword] = partParser.result(result, entries[-1])
+					headwords.extend(part)
+					self.emit(TextRenderer().render(Entry(part)), BrailleRenderer().render(Entry(part)))
+		finally:
+			for task in tasks:
+				task.cancel()
+		failed: List[str] = [entry['error'] for entry in entries if entry.get('error')]
+		if failed:
+			# the search headwords are shown instead of the missing entries, but such an incomplete entry
+			# must not be cached or stored in the personal dictionary
+			log.warning("Unable to receive %d of %d Lexicala entries: %s", len(failed), len(entries), failed[0])
+			self._error = True
+		# the formats are rendered from the entry only when they are requested
+		if self.onPart is not None and results:
+			# the parts passed to the listener are already parsed, so the entry is assembled from them
+			self._entry = Entry(headwords)
+		else:
+			self._entry = ServiceParser(response=self._resp, target=self.langTo, entries=entries).entry
+
+	def entries(self, results: List[Dict]) -> List[asyncio.Future]:
+		"""Start requests of dictionary entries for all search results simultaneously.
+		The number of simultaneous requests is limited by the service settings.
+		@param results: list of search results
+		@type results: List[Dict]
+		@return: tasks resulting in deserialized dictionary entries, in the same order as the search results
+		@rtype: List[asyncio.Future]
+		"""
+		limit = asyncio.Semaphore(config.conf[addonName][serviceName]['workers'])
+
+		async def entry(result: Dict) -> Dict:
+			async with limit:
+				return await Lapi().aentries(result.get('id', ''))
+		return [asyncio.ensure_future(entry(result)) for result in results]
+
+
+class ServiceParser(EntryParser):
+	"""Parse the deserialized response from the server and build the structured dictionary entry."""
+
+	# keys of the response processed by the analyzers of the same name, in the order of the fields in the entry
+	analyzers: Tuple[str, ...] = (
+		# "pronunciation",  # currently not used
+		"subcategorization",
+		"case",
+		"mood",
+		"register",
+		"geographical_usage",
+		"tense",
+		"homograph_number",
+		"inflections",
+		"collocate",
+		"semantic_category",
+		"semantic_subcategory",
+		"range_of_application",
+		"sentiment",
+		"synonyms",
+		"antonyms",
+		"aspect",
+		"compositional_phrases",
+		"examples",
+		"see",
+		"see_also",
+	)
+
+	def __init__(self, response: Dict, target: str, entries: Optional[List[Dict]] = None) -> None:
 		"""Input data for further analysis and conversion to other formats.
 		@param response: deserialized response from the online dictionary
 		@type response: Dict
 		@param target: target language to search in the list of translations
 		@type target: str
+		@param entries: dictionary entries of the search results received by the translator,
+			the search results without the entry are represented by their headwords
+		@type entries: Optional[List[Dict]]
 		"""
 		super(ServiceParser, self).__init__(response)
 		self._langFrom: str = ''
 		self._langInto: str = target
+		self._entries: List[Dict] = entries or []
 
-	def results(self) -> str:
-		"""Analysis of the list of results.
-		@return: all available results in HTML format
-		@rtype: str
+	def parse(self) -> Entry:
+		"""Build the structured entry from the search results and their dictionary entries.
+		@return: dictionary entry independent of the output format
+		@rtype: Entry
 		"""
 		if not self.resp.get('results') or len(self.resp['results']) == 0:
-			return self.error(self.resp)
-		results: List[str] = []
-		for result in self.resp['results']:
-			self._langFrom = self.language(result)
-			transResp: Dict = Lapi().entries(self.id(result))
-			results.append(self.headwords(transResp))
-			results.append(self.senses(transResp))
-		return self.filledOnly(results)
-
-	def headwords(self, resp: Dict) -> str:
+			return Entry(error=self.error(self.resp))
+		headwords: List[Headword] = []
+		for i, result in enumerate(self.resp['results']):
+			headwords.extend(self.result(result, self._entries[i] if i < len(self._entries) else {}))
+		return Entry(headwords)
+
+	def result(self, result: Dict, entry: Dict) -> List[Headword]:
+		"""Analysis of one search result and its dictionary entry.
+		@param result: item of the list of search results
+		@type result: Dict
+		@param entry: deserialized dictionary entry of the search result
+		@type entry: Dict
+		@return: headwords of the entry, the senses of the entry belong to the last of them
+		@rtype: List[Headword]
+		"""
+		self._langFrom = self.language(result)
+		headwords: List[Headword] = self.headwords(entry) or self.headwords(result)
+		if headwords:
+			headwords[-1].senses.extend(self.senses(entry))
+		return headwords
+
+	def headwords(self, resp: Dict) -> List[Headword]:
 		"""Analysis of the "headword" object.
 		Doc: "headword": object or list of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: found headwords
+		@rtype: List[Headword]
 		"""
 		rsp: Union[List[Dict], Dict] = resp.get('headword', {})
-		if isinstance(rsp, list):
-			hws: List[str] = [self.headword(r) for r in rsp]
-			return self.filledOnly(hws)
-		return self.headword(rsp)
+		hws: List[Optional[Headword]] = [self.headword(r) for r in self.listOf(rsp)]
+		return [hw for hw in hws if hw]
 
-	def headword(self, resp: Dict) -> str:
+	def headword(self, resp: Dict) -> Optional[Headword]:
 		"""Analysis of the "headword" list item.
 		Doc: "headword": object (within the headwords array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the headword or None if the branch is empty
+		@rtype: Optional[Headword]
 		"""
-		if not resp or len(resp) == 0:
-			return ''
-		hw: str = "<h1>%s</h1>" % (self.text(resp) + self.inParentheses(
-			self.pos(resp),
-			self.gender(resp),
-			self.number(resp)))
-		hwl: List[str] = [hw]
-		hwl.extend(self.filter(resp))
-		return self.filledOnly(hwl)
+		if not resp or not isinstance(resp, dict):
+			return None
+		return Headword(Term(self.text(resp), tuple(self.attrs(resp))), self.filter(resp), self.senses(resp))
 
 	def senseIDs(self, resp: Dict) -> List[str]:
 		"""Return a list of identifiers associated with the key "senses".
@@ -172,293 +251,258 @@ class ServiceParser(Parser):
 			ids = [r['id'] for r in rsp if r.get('id')]
 		return ids
 
-	def senses(self, resp: Dict) -> str:
+	def senses(self, resp: Dict) -> List[Sense]:
 		"""Analysis of the "senses" object.
 		Doc: "senses": array of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: found senses
+		@rtype: List[Sense]
 		"""
 		rsp: Union[List[Dict], Dict] = resp.get('senses', {})
-		sns: str = ''
-		if isinstance(rsp, list):
-			sns = self.filledOnly(
-				[self.withPrefix("<li>{value}</li>", '', self.sense(r)) for r in rsp])
-		else:
-			sns = self.withPrefix("<li>{value}</li>", '', self.sense(rsp))
-		return self.withPrefix('<ul type="disc">\n{value}\n</ul>', '', sns)
+		sns: List[Optional[Sense]] = [self.sense(r) for r in self.listOf(rsp)]
+		return [sense for sense in sns if sense]
 
-	def sense(self, resp: Dict) -> str:
+	def sense(self, resp: Dict) -> Optional[Sense]:
 		"""Analysis of the "sense" object.
 		Doc: "sense": object (within the senses array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the sense or None if the branch is empty
+		@rtype: Optional[Sense]
 		"""
 		if not resp or not isinstance(resp, dict):
-			return ''
-		sns: List[str] = []
+			return None
 		# self.id(resp)  # currently not used
-		sns.append(self.definition(resp) + self.translations(resp))
-		sns.extend(self.filter(resp))
-		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<i>{name}</i>: {value}", _("mean"), self.filledOnly(sns))
-
-	def compositional_phrases(self, resp: Dict) -> str:
+		sense = Sense(
+			definition=self.definition(resp),
+			translations=self.translations(resp),
+			fields=self.filter(resp),
+			senses=self.senses(resp))
+		return sense if sense.definition or sense.translations or sense.fields or sense.senses else None
+
+	def compositional_phrases(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "compositional_phrases" object.
 		Doc: "compositional_phrases": array of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		rsp: Union[List[Dict], Dict] = resp.get('compositional_phrases', {})
-		cp: str = ''
-		if isinstance(rsp, list):
-			cp = self.filledOnly(
-				[self.withPrefix("<span>{value}</span>", '', self.compositional_phrase(r)) for r in rsp]
-			)
-		else:
-			cp = self.withPrefix("<span>{value}</span>", '', self.compositional_phrase(rsp))
+		cps: List[Optional[Sense]] = [self.compositional_phrase(r) for r in self.listOf(rsp)]
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("compositional phrases"), cp)
+		return self.field(_("compositional phrases"), [cp for cp in cps if cp])
 
-	def compositional_phrase(self, resp: Dict) -> str:
+	def compositional_phrase(self, resp: Dict) -> Optional[Sense]:
 		"""Analysis of the "compositional_phrase" object.
 		Doc: "compositional_phrase": object (within the compositional_phrases array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the phrase with its definition or None if the branch is empty
+		@rtype: Optional[Sense]
 		"""
 		if not resp or not isinstance(resp, dict):
-			return ''
-		cp: str = self.text(resp) + self.inParentheses(self.pos(resp))
-		cp += self.withPrefix(" - {value}", '', self.definition(resp))
-		cpl: List[str] = [cp]
-		cpl.extend(self.filter(resp))
-		return self.filledOnly(cpl)
-
-	def examples(self, resp: Dict) -> str:
+			return None
+		return Sense(
+			term=Term(self.text(resp), tuple([('', pos) for pos in self.strList(resp.get('pos'))])),
+			definition=self.definition(resp),
+			fields=self.filter(resp),
+			senses=self.senses(resp))
+
+	def examples(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "examples" array.
 		Doc: "examples": array of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		rsp: Union[List[Dict], Dict] = resp.get('examples', {})
-		exs: str = ''
-		if isinstance(rsp, list):
-			exs = self.filledOnly(
-				[self.withPrefix("<span>{value}</span>", '', self.example(r)) for r in rsp])
-		else:
-			exs = self.withPrefix("<span>{value}</span>", '', self.example(rsp))
+		exs: List[Optional[Term]] = [self.example(r) for r in self.listOf(rsp)]
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("examples"), exs)
+		return self.field(_("examples"), [ex for ex in exs if ex], sep='; ')
 
-	def example(self, resp: Dict) -> str:
+	def example(self, resp: Dict) -> Optional[Term]:
 		"""Analysis of the "example" object.
 		Doc: "example": object (within the examples array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the example or None if the branch is empty
+		@rtype: Optional[Term]
 		"""
-		if not resp or not isinstance(resp, dict):
-			return ''
-		example: List[str] = [
-			self.text(resp),
-			self.alternative_scripts(resp)
-		]
-		return self.filledOnly(example)
-
-	def inflections(self, resp: Dict) -> str:
+		if not resp or not isinstance(resp, dict) or not self.text(resp):
+			return None
+		return Term(self.text(resp), tuple(self.alternative_scripts(resp)))
+
+	def inflections(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "inflections" object.
 		Doc: "inflections": array of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		rsp: Union[List[Dict], Dict] = resp.get('inflections', {})
-		ifs: str = ''
-		if isinstance(rsp, list):
-			ifs = self.filledOnly(
-				[self.withPrefix("<span>{value}</span>", '', self.inflection(r)) for r in rsp]
-			)
-		else:
-			ifs = self.withPrefix("<span>{value}</span>", '', self.inflection(rsp))
+		ifs: List[Term] = [self.inflection(r) for r in self.listOf(rsp)]
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("inflections"), ifs)
+		return self.field(_("inflections"), [inf for inf in ifs if inf.text])
 
-	def inflection(self, resp: Dict) -> str:
+	def inflection(self, resp: Dict) -> Term:
 		"""Analysis of the "inflection" object.
 		Doc: "inflection": object (within the inflections array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the inflected form with its attributes, such as tense
+		@rtype: Term
 		"""
-		if not resp or not isinstance(resp, dict):
-			return ''
-		inf: List[str] = [
-			resp.get('text', '') + self.inParentheses(
-				self.pos(resp),
-				self.gender(resp),
-				self.number(resp))]
-		inf.extend(self.filter(resp))
-		return self.filledOnly(inf)
-
-	def pronunciation(self, resp: Dict) -> str:
+		return self.term(resp)
+
+	def pronunciation(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "pronunciation" object.
 		Doc: "pronunciation": object
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		if not resp or not isinstance(resp, dict):
-			return ''
 		rsp: Dict = resp.get('pronunciation', {})
-		pron: List[str] = [
-			rsp.get('value', ''),
-			self.geographical_usage(rsp)
-		]
+		if not rsp or not isinstance(rsp, dict) or not rsp.get('value'):
+			return None
+		usage: Tuple[Tuple[str, str], ...] = tuple([
+			('', value) for value in self.strList(rsp.get('geographical_usage'))])
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i> {value}</p>", _("pronunciation"), self.filledOnly(pron, sep=', '))
+		return self.field(_("pronunciation"), [Term(rsp['value'], usage)])
 
-	def translations(self, resp: Dict) -> str:
+	def translations(self, resp: Dict) -> List[Tuple[str, List[Term]]]:
 		"""Analysis of the "translations" object.
 		Doc: "translations": object or array of objects
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: pairs of the language name and translations into this language,
+		the language name is empty if only the translations into the target language are shown
+		@rtype: List[Tuple[str, List[Term]]]
 		"""
 		rsp: Dict = resp.get('translations', {})
 		if not rsp:
-			return ''
+			return []
 		if config.conf[addonName][serviceName]['all']:
-			trs: List[str] = []
-			trsl: str = ''
-			for lng, cnt in rsp.items():
-				lng = langs[lng].name
-				if isinstance(cnt, list):
-					tr: str = self.filledOnly(
-						[self.withPrefix("{value}", '', self.translation(r)) for r in cnt],
-						sep=', ')
-				else:
-					tr = self.withPrefix("{value}", '', self.translation(cnt))
-				trs.append(self.withPrefix("{name} - <b>{value}</b>", lng, tr))
-			trsl = ';<br>\n'.join(sorted(trs, key=lambda k: k.lower()))
-			return self.withPrefix("\n<p>{value}.</p>", '', trsl)
-		if not rsp.get(self._langInto) or len(rsp.get(self._langInto, {})) == 0:
-			return ''
-		rs: Dict = rsp.get(self._langInto, {})
-		trsl = ''
-		if isinstance(rsp, list):
-			trsl = self.filledOnly(
-				[self.withPrefix("{value}", '', self.translation(r)) for r in rs],
-				sep=', ')
-		else:
-			trsl = self.withPrefix("{value}", '', self.translation(rs))
-		return self.withPrefix(" - {value}", '', trsl)
-
-	def translation(self, resp: Dict) -> str:
+			return sorted(
+				((langs[lng].name.capitalize(), self.translationList(cnt)) for lng, cnt in rsp.items()),
+				key=lambda k: k[0].lower())
+		trs: List[Term] = self.translationList(rsp.get(self._langInto))
+		return [('', trs)] if trs else []
+
+	def translationList(self, resp: Union[List[Dict], Dict, None]) -> List[Term]:
+		"""Analysis of the translations into one language.
+		Doc: object or array of objects
+		@param resp: branch of the deserialized response from the server
+		@type resp: Union[List[Dict], Dict, None]
+		@return: found translations
+		@rtype: List[Term]
+		"""
+		if not resp:
+			return []
+		trs: List[Term] = [self.translation(r) for r in self.listOf(resp)]
+		return [tr for tr in trs if tr.text]
+
+	def translation(self, resp: Dict) -> Term:
 		"""Analysis of the "translations" list item object.
 		Doc: "translation": object (within the translations array)
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the translation with its attributes
+		@rtype: Term
 		"""
-		trs: List[str] = []
-		trs.append(resp.get('text', '') + self.inParentheses(
-			self.pos(resp),
-			self.gender(resp),
-			self.number(resp))
-		)
-		trs.extend(self.filter(resp))
-		return self.filledOnly(trs)
-
-	def inParentheses(self, *args: str) -> str:
-		"""List of values displayed in parentheses next to the word.
-		@param args: strings to display
-		@type args: sequence of str
-		@return: if the input parameters are not empty - they are returned in parentheses
-		@rtype: str
+		return self.term(resp)
+
+	def term(self, resp: Dict) -> Term:
+		"""Word with its attributes, the additional fields of the word, such as geographical usage,
+		are shown together with its grammatical attributes.
+		@param resp: branch of the deserialized response from the server
+		@type resp: Dict
+		@return: the word with its attributes
+		@rtype: Term
 		"""
-		fields: List[str] = []
-		for arg in args:
-			if arg and arg.strip() != '':
-				fields.append(str(arg))
-		return self.withPrefix(" <i>({value})</i>", '', self.filledOnly(fields, sep=', '))
+		if not resp or not isinstance(resp, dict):
+			return Term('')
+		attrs: List[Tuple[str, str]] = self.attrs(resp)
+		for field in self.filter(resp):
+			attrs.append((field.name, ', '.join(value.text for value in field.values if isinstance(value, Term))))
+		return Term(self.text(resp), tuple([(name, value) for name, value in attrs if value]))
 
-	def strList(self, resp: Union[Any, List[str]]) -> str:
-		"""Convert an input str or list of strs to a single line.
+	def attrs(self, resp: Dict) -> List[Tuple[str, str]]:
+		"""Grammatical attributes displayed in parentheses next to the word:
+		part of speech, gender and number.
+		@param resp: branch of the deserialized response from the server
+		@type resp: Dict
+		@return: pairs of the empty field name and the value
+		@rtype: List[Tuple[str, str]]
+		"""
+		return [('', value) for key in ('pos', 'gender', 'number') for value in self.strList(resp.get(key))]
+
+	def listOf(self, resp: Union[List[Dict], Dict]) -> List[Dict]:
+		"""Branches of the response, which can contain either an object or an array of objects.
+		@param resp: object or array of objects
+		@type resp: Union[List[Dict], Dict]
+		@return: array of objects
+		@rtype: List[Dict]
+		"""
+		return resp if isinstance(resp, list) else [resp]
+
+	def strList(self, resp: Union[Any, List[Any]]) -> List[str]:
+		"""Convert an input value or list of values to a list of non-empty strings.
 		An argument can be either a string or a list of simple types.
 		@param resp: incoming string or list of strings
-		@type resp: Union[Any, List[str]]
-		@return: line in which all input data are combined
-		@rtype: str
+		@type resp: Union[Any, List[Any]]
+		@return: list of all non-empty input values
+		@rtype: List[str]
 		"""
-		if isinstance(resp, list):
-			return self.filledOnly(resp)
-		elif resp and resp != '':
-			return str(resp)
-		return ''
-
-	def filledOnly(self, lines: List[str], sep: str = '\n') -> str:
-		"""Combine only non-empty strings from the entered list,
-		by default a newline character '\n' is inserted between all lines.
-		@param lines: a list of strings that may be empty
-		@type lines: List[str]
-		@param sep: separator, which will be inserted when merging strings
+		values: List[Any] = resp if isinstance(resp, list) else [resp]
+		return [str(value).replace('\u02c8', '') for value in values if value is not None and value != '']
+
+	def field(self, name: str, values: List[Union[Term, Sense]], sep: str = ', ') -> Optional[Field]:
+		"""Named field of the entry, if it contains any values.
+		@param name: translated name of the field
+		@type name: str
+		@param values: terms or nested senses
+		@type values: List[Union[Term, Sense]]
+		@param sep: separator between the terms
 		@type sep: str
-		@return: a line consisting only of non-empty strings in the list
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return sep.join(filter(lambda line: line and line != '', lines))
-
-	def withPrefix(self, template: str, name: str, value: str) -> str:
-		"""Display the field value after the specified prefix.
-		Return an empty string if the last argument contains an empty value.
-		The template must contain a {value} field and an optional {name} field.
-		@param template: template string
-		@type template: str
-		@param name: title to be inserted in place of {name}
-		@type: str
-		@param value: string to be inserted in place of {value}
-		@type value: str
-		@return: combined in a str fields name and value according to the specified template
-		@rtype: str
+		if not values:
+			return None
+		return Field(name.capitalize(), values, sep)
+
+	def simple(self, name: str, resp: Union[Any, List[Any]]) -> Optional[Field]:
+		"""Named field of the entry consisting of strings.
+		@param name: translated name of the field
+		@type name: str
+		@param resp: string or list of strings
+		@type resp: Union[Any, List[Any]]
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		if value and value != '':
-			if '{name}' not in template:
-				template += '{name}'
-				name = ''
-			return template.format(name=name.capitalize(), value=value)
-		return ''
+		return self.field(name, [Term(value) for value in self.strList(resp)])
 
 	def text(self, resp: Dict) -> str:
 		"""Get the value of the "text" field.
 		Doc: "text": string or list of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
+		@return: found text
 		@rtype: str
 		"""
-		return self.strList(resp.get('text', ''))
+		return ', '.join(self.strList(resp.get('text', '')))
 
 	def id(self, resp: Dict) -> str:
 		"""Get the value of the "id" field.
 		Doc: "id": string
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
+		@return: found identifier
 		@rtype: str
 		"""
 		return resp.get('id', '')
@@ -468,335 +512,264 @@ class ServiceParser(Parser):
 		Doc: "language": string
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
+		@return: found language code
 		@rtype: str
 		"""
 		return resp.get('language', '')
 
-	def pos(self, resp: Dict) -> str:
-		"""Analysis of the "Part Of Speech" object.
-		Doc: "pos": string or array of strings
-		@param resp: branch of the deserialized response from the server
-		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
-		"""
-		return self.strList(resp.get('pos'))
-
-	def gender(self, resp: Dict) -> str:
-		"""Analysis of the "gender" object.
-		Doc: "gender": string
-		@param resp: branch of the deserialized response from the server
-		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
-		"""
-		return self.strList(resp.get('gender'))
-
-	def number(self, resp: Dict) -> str:
-		"""Get the value of the "number" field.
-		Doc: "number": string
-		@param resp: branch of the deserialized response from the server
-		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
-		"""
-		return self.strList(resp.get('number'))
-
 	def definition(self, resp: Dict) -> str:
 		"""Get the value of the "definition" field.
 		Doc: "definition": string
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
+		@return: found definition
 		@rtype: str
 		"""
-		return resp.get('definition', '')
+		return ', '.join(self.strList(resp.get('definition')))
 
-	def subcategorization(self, resp: Dict) -> str:
+	def subcategorization(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "subcategorization" field.
 		Doc: "subcategorization": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("subcategorization"),
-			self.strList(resp.get('subcategorization')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("subcategorization"), resp.get('subcategorization'))
 
-	def case(self, resp: Dict) -> str:
+	def case(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "case" field.
 		Doc: "case": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("case"), self.strList(resp.get('case')))
+		return self.simple(_("case"), resp.get('case'))
 
-	def register(self, resp: Dict) -> str:
+	def register(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "register" field.
 		Doc: "register": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("register"), self.strList(resp.get('register')))
+		return self.simple(_("register"), resp.get('register'))
 
-	def geographical_usage(self, resp: Dict) -> str:
+	def geographical_usage(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "geographical_usage" field.
 		Doc: "geographical_usage": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("geographical usage"),
-			self.strList(resp.get('geographical_usage')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("geographical usage"), resp.get('geographical_usage'))
 
-	def mood(self, resp: Dict) -> str:
+	def mood(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "mood" field.
 		Doc: "mood": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("mood"), self.strList(resp.get('mood')))
+		return self.simple(_("mood"), resp.get('mood'))
 
-	def tense(self, resp: Dict) -> str:
+	def tense(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "tense" field.
 		Doc: "tense": string or Array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("tense"), self.strList(resp.get('tense')))
+		return self.simple(_("tense"), resp.get('tense'))
 
-	def homograph_number(self, resp: Dict) -> str:
+	def homograph_number(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "homograph_number" field.
 		Doc: "homograph_number": number
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("homograph number"),
-			self.strList(resp.get('homograph_number')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("homograph number"), resp.get('homograph_number'))
 
-	def alternative_scripts(self, resp: Dict) -> str:
+	def alternative_scripts(self, resp: Dict) -> List[Tuple[str, str]]:
 		"""Get the value of the "alternative_scripts" object.
 		Doc: "alternative_scripts": object
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: pairs of the script name and the text written in this script
+		@rtype: List[Tuple[str, str]]
 		"""
 		if isinstance(resp.get('alternative_scripts'), dict):
-			return '\n'.join(
-				(self.withPrefix(
-					"{name}: {value}",
-					key,
-					val
-				) for key, val in resp.get('alternative_scripts', {}) if key != '' and val != '')
-			)
-		return ''
-
-	def semantic_category(self, resp: Dict) -> str:
+			return [(key, str(val)) for key, val in resp['alternative_scripts'].items() if key != '' and val != '']
+		return []
+
+	def semantic_category(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "semantic_category" object.
 		Doc: "semantic_category": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("semantic category"),
-			self.strList(resp.get('semantic_category')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("semantic category"), resp.get('semantic_category'))
 
-	def semantic_subcategory(self, resp: Dict) -> str:
+	def semantic_subcategory(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "semantic_subcategory" object.
 		Doc: "semantic_subcategory": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("semantic subcategory"),
-			self.strList(resp.get('semantic_subcategory')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("semantic subcategory"), resp.get('semantic_subcategory'))
 
-	def range_of_application(self, resp: Dict) -> str:
+	def range_of_application(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "range_of_application" object.
 		Doc: "range_of_application": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: {value}</p>",
-			# Translators: Field name in a dictionary entry
-			_("range of application"),
-			self.strList(resp.get('range_of_application')))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("range of application"), resp.get('range_of_application'))
 
-	def sentiment(self, resp: Dict) -> str:
+	def sentiment(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "sentiment" object.
 		Doc: "sentiment": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("sentiment"), self.strList(resp.get('sentiment')))
+		return self.simple(_("sentiment"), resp.get('sentiment'))
 
-	def see(self, resp: Dict) -> str:
+	def see(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "see" object.
 		Doc: "see": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("see"), self.strList(resp.get('see')))
+		return self.simple(_("see"), resp.get('see'))
 
-	def see_also(self, resp: Dict) -> str:
+	def see_also(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "see_also" object.
 		Doc: "see_also": string or array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("see also"), self.strList(resp.get('see_also')))
+		return self.simple(_("see also"), resp.get('see_also'))
 
-	def synonyms(self, resp: Dict) -> str:
+	def synonyms(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "synonyms" object.
 		Doc: "synonyms": array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("synonyms"), self.strList(resp.get('synonyms')))
+		return self.simple(_("synonyms"), resp.get('synonyms'))
 
-	def antonyms(self, resp: Dict) -> str:
+	def antonyms(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "antonyms" object.
 		Doc: "antonyms": array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("antonyms"), self.strList(resp.get('antonyms')))
+		return self.simple(_("antonyms"), resp.get('antonyms'))
 
-	def collocate(self, resp: Dict) -> str:
+	def collocate(self, resp: Dict) -> Optional[Field]:
 		"""Analysis of the "collocate" object.
 		Doc: "collocate": array of strings
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("collocate"), self.strList(resp.get('collocate')))
+		return self.simple(_("collocate"), resp.get('collocate'))
 
-	def aspect(self, resp: Dict) -> str:
+	def aspect(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "aspect" field.
 		Doc: "aspect": string
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
 		# Translators: Field name in a dictionary entry
-		return self.withPrefix("<p><i>{name}</i>: {value}</p>", _("aspect"), self.strList(resp.get('aspect')))
+		return self.simple(_("aspect"), resp.get('aspect'))
 
-	def source(self, resp: Dict) -> str:
+	def source(self, resp: Dict) -> Optional[Field]:
 		"""Get the value of the "source" field.
 		Doc: "source": string
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: str
+		@return: the field of the entry or None if there is no data
+		@rtype: Optional[Field]
 		"""
-		return self.withPrefix(
-			"<p><i>{name}</i>: <b>{value}</b></p>",
-			# Translators: Field name in a dictionary entry
-			_("&Dictionary:").replace('&', '').replace(':', ''),
-			resp.get('source', ''))
+		# Translators: Field name in a dictionary entry
+		return self.simple(_("&Dictionary:").replace('&', '').replace(':', ''), resp.get('source'))
 
 	def error(self, resp: Dict) -> str:
 		"""Convert errors received when connecting to the dictionary service into a text string.
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
+		@return: error message or an empty string if there is no error
 		@rtype: str
 		"""
-		return self.withPrefix("<h1>{name}: {value}</h1>", "error", resp.get('error', ''))
+		return "Error: %s" % resp['error'] if resp.get('error') else ''
 
-	def filter(self, resp: Dict) -> List[str]:
-		"""Passe the branch of the deserialized response  through a set of analyzers.
+	def filter(self, resp: Dict) -> List[Field]:
+		"""Pass the branch of the deserialized response through the analyzers of the keys present in it.
 		@param resp: branch of the deserialized response from the server
 		@type resp: Dict
-		@return: found data in HTML format
-		@rtype: List[str]
+		@return: found fields of the entry in the order of the analyzers
+		@rtype: List[Field]
 		"""
-		return [
-			# self.pronunciation(resp),  # currently not used
-			self.subcategorization(resp),
-			self.case(resp),
-			self.mood(resp),
-			self.register(resp),
-			self.geographical_usage(resp),
-			self.tense(resp),
-			self.homograph_number(resp),
-			self.inflections(resp),
-			# self.alternative_scripts(resp),  # currently not used
-			self.collocate(resp),
-			self.semantic_category(resp),
-			self.semantic_subcategory(resp),
-			self.range_of_application(resp),
-			self.sentiment(resp),
-			self.synonyms(resp),
-			self.antonyms(resp),
-			self.aspect(resp),
-			self.senses(resp),
-			self.compositional_phrases(resp),
-			self.examples(resp),
-			self.see(resp),
-			self.see_also(resp),
-		]
-
-	def to_html(self) -> str:
-		"""Return the HTML representation of the deserialized response sent to the class from the server.
-		@return: found data in HTML format
-		@rtype: str
-		"""
-		if not self.html:
-			self.html = self.results().replace('\u02c8', '')
-		return self.html
+		table: Dict[str, Tuple[int, Analyzer]] = dispatch(type(self))
+		found: List[Tuple[int, Analyzer]] = [table[key] for key in resp if key in table]
+		found.sort()
+		fields: List[Optional[Field]] = [analyzer(self, resp) for _order, analyzer in found]
+		return [field for field in fields if field]
+
+
+# method of the parser that converts the branch of the response into the field of the entry
+Analyzer = Callable[[ServiceParser, Dict], Optional[Field]]
+
+
+@lru_cache(maxsize=None)
+def dispatch(parser: Type[ServiceParser]) -> Dict[str, Tuple[int, Analyzer]]:
+	"""Table of the analyzers by the keys of the response, which is built once for each parser class.
+	@param parser: class of the parser, its analyzers are named as the keys they process
+	@type parser: Type[ServiceParser]
+	@return: position in the output and the analyzer by the key of the response
+	@rtype: Dict[str, Tuple[int, Analyzer]]
+	"""
+	return {key: (order, getattr(parser, key)) for order, key in enumerate(parser.analyzers)}
@@ -9,7 +9,7 @@ from typing import Callable, Iterator, Optional
 import addonHandler
 import wx
 import config
-from gui import guiHelper
+from gui import guiHelper, nvdaControls
 from logHandler import log
 from .. import addonName
 from ..service import secrets
@@ -103,6 +103,24 @@ class ServicePanel(wx.Panel):
 			wx.CheckBox(self, label=_("Auto-s&wap languages"))
 		)
 		self.autoSwapChk.SetValue(config.conf[addonName][serviceName]['autoswap'])
+		self.speculativeChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("Look up both language dir&ections simultaneously when auto-swapping"))
+		)
+		self.speculativeChk.SetValue(config.conf[addonName][serviceName]['speculative'])
+		self.vocabularyChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("&Keep received entries in the personal offline dictionary"))
+		)
+		self.vocabularyChk.SetValue(config.conf[addonName][serviceName]['vocabulary'])
+		self.workersSpin = addonHelper.addLabeledControl(
+			# Translators: A setting in addon settings dialog.
+			_("&Number of simultaneous requests:"),
+			nvdaControls.SelectOnFocusSpinCtrl,
+			min=1,
+			max=8,
+			initial=config.conf[addonName][serviceName]['workers']
+		)
 
 		# Fields for input user credentials and link to registration
 		secret = secrets[serviceName]
@@ -178,6 +196,9 @@ class ServicePanel(wx.Panel):
 		config.conf[addonName][serviceName]['all'] = self.allChk.GetValue()
 		config.conf[addonName][serviceName]['copytoclip'] = self.copyToClipboardChk.GetValue()
 		config.conf[addonName][serviceName]['autoswap'] = self.autoSwapChk.GetValue()
+		config.conf[addonName][serviceName]['speculative'] = self.speculativeChk.GetValue()
+		config.conf[addonName][serviceName]['vocabulary'] = self.vocabularyChk.GetValue()
+		config.conf[addonName][serviceName]['workers'] = self.workersSpin.GetValue()
 		config.conf[addonName][serviceName]['username'] = secrets[serviceName].encode(
 			self.usernameInput.GetValue() or secrets[serviceName].username)
 		config.conf[addonName][serviceName]['password'] = secrets[serviceName].encode(
@@ -0,0 +1,234 @@
+# api.py
+# Provides access to the dictionaries stored on the local disk
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from __future__ import annotations
+from typing import Any, Optional, Iterable, Tuple, List, Dict
+import os.path
+import sqlite3
+from uuid import uuid4
+from threading import RLock
+import config
+from logHandler import log
+from .. import addonName
+from ..wordindex import WordIndex, openIndex
+
+serviceName: str = os.path.basename(os.path.dirname(__file__))
+stat: Dict[str, Any] = {}  # Object for store statistics
+
+
+class Store(object):
+	"""Local storage of the imported dictionaries.
+	The list of dictionaries and their language pairs is stored in the SQLite database,
+	and the articles of each dictionary are stored in a separate index file in HTML format.
+	"""
+
+	def __init__(self, path: str) -> None:
+		"""Initialization of the storage, the database file is opened on the first request.
+		@param path: full path to the database file, index files are stored in the folder of the same name
+		@type path: str
+		"""
+		self._path: str = path
+		self._dir: str = os.path.splitext(path)[0]
+		self._db: Optional[sqlite3.Connection] = None
+		self._lock = RLock()
+		self._indexes: Dict[int, WordIndex] = {}
+
+	@property
+	def path(self) -> str:
+		"""Full path to the database file.
+		@return: path to the file
+		@rtype: str
+		"""
+		return self._path
+
+	@property
+	def db(self) -> sqlite3.Connection:
+		"""Connection to the database, the database file and the table are created if necessary.
+		@return: connection to the SQLite database
+		@rtype: sqlite3.Connection
+		"""
+		if self._db is None:
+			self._db = sqlite3.connect(self._path, timeout=5, check_same_thread=False)
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS dictionaries ("
+				"id INTEGER PRIMARY KEY, "
+				"name TEXT NOT NULL, "
+				"source TEXT NOT NULL, "
+				"target TEXT NOT NULL, "
+				"size INTEGER NOT NULL, "
+				"file TEXT NOT NULL)")
+			self._db.commit()
+		return self._db
+
+	def dictionaries(self) -> List[Dict[str, Any]]:
+		"""List of all imported dictionaries.
+		@return: dictionaries descriptions in the order of their import
+		@rtype: List[Dict[str, Any]]
+		"""
+		with self._lock:
+			try:
+				rows = self.db.execute(
+					"SELECT id, name, source, target, size, file FROM dictionaries ORDER BY id").fetchall()
+			except sqlite3.Error as e:
+				log.error("Unable to read the list of offline dictionaries: %s", str(e))
+				return []
+		return [dict(zip(('id', 'name', 'source', 'target', 'size', 'file'), row)) for row in rows]
+
+	def pairs(self) -> List[str]:
+		"""Language pairs of all imported dictionaries.
+		@return: list of unique language pairs in the format "en-ru"
+		@rtype: List[str]
+		"""
+		pairs: List[str] = []
+		for dictionary in self.dictionaries():
+			pair: str = "%s-%s" % (dictionary['source'], dictionary['target'])
+			if pair not in pairs:
+				pairs.append(pair)
+		return pairs
+
+	def add(self, name: str, source: str, target: str, entries: Iterable[Tuple[str, str]]) -> int:
+		"""Import the dictionary into the storage.
+		The index file is written before the dictionary is registered,
+		so the lookups in other dictionaries are not blocked during the import.
+		@param name: dictionary name
+		@type name: str
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@param entries: sequence of headwords and corresponding articles in HTML format
+		@type entries: Iterable[Tuple[str, str]]
+		@return: number of imported articles
+		@rtype: int
+		"""
+		os.makedirs(self._dir, exist_ok=True)
+		file: str = "%s.qdx" % uuid4().hex
+		try:
+			size: int = WordIndex.write(os.path.join(self._dir, file), entries)
+			with self._lock:
+				self.db.execute(
+					"INSERT INTO dictionaries (name, source, target, size, file) VALUES (?, ?, ?, ?, ?)",
+					(name, source, target, size, file))
+				self.db.commit()
+		except Exception:
+			for path in (os.path.join(self._dir, file), os.path.join(self._dir, file) + '.tmp'):
+				if os.path.isfile(path):
+					os.remove(path)
+			raise
+		return size
+
+	def remove(self, id: int) -> None:
+		"""Delete the dictionary and its index file.
+		@param id: dictionary identifier
+		@type id: int
+		"""
+		with self._lock:
+			row = self.db.execute("SELECT file FROM dictionaries WHERE id = ?", (id,)).fetchone()
+			self.db.execute("DELETE FROM dictionaries WHERE id = ?", (id,))
+			self.db.commit()
+			index: Optional[WordIndex] = self._indexes.pop(id, None)
+			if index is not None:
+				index.close()
+		if row:
+			try:
+				os.remove(os.path.join(self._dir, row[0]))
+			except OSError as e:
+				log.error("Unable to delete the dictionary file: %s", str(e))
+
+	def index(self, dictionary: Dict[str, Any]) -> Optional[WordIndex]:
+		"""Index of the dictionary articles, opened on the first request.
+		@param dictionary: dictionary description
+		@type dictionary: Dict[str, Any]
+		@return: opened index or None if the index file is missing or damaged
+		@rtype: Optional[WordIndex]
+		"""
+		with self._lock:
+			index: Optional[WordIndex] = self._indexes.get(dictionary['id'])
+			if index is None:
+				index = openIndex(os.path.join(self._dir, dictionary['file']))
+				if index is None:
+					log.error("Unable to open the dictionary file: %s", dictionary['file'])
+					return None
+				self._indexes[dictionary['id']] = index
+		return index
+
+	def lookup(self, source: str, target: str, headword: str) -> List[Dict[str, str]]:
+		"""Find articles for the headword in all dictionaries of the language pair.
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@param headword: word or phrase to search
+		@type headword: str
+		@return: found articles with the headword and the name of the dictionary
+		@rtype: List[Dict[str, str]]
+		"""
+		found: List[Dict[str, str]] = []
+		for dictionary in self.dictionaries():
+			if dictionary['source'] != source or dictionary['target'] != target:
+				continue
+			index: Optional[WordIndex] = self.index(dictionary)
+			for word, article in index.lookup(headword) if index else []:
+				found.append({'dictionary': dictionary['name'], 'headword': word, 'article': article})
+		return found
+
+	def close(self) -> None:
+		"""Close the connection to the database and release the index files."""
+		with self._lock:
+			for index in self._indexes.values():
+				index.close()
+			self._indexes.clear()
+			if self._db is not None:
+				self._db.close()
+				self._db = None
+
+
+# An instance of the storage for use in the add-on
+store = Store(os.path.join(config.getUserDefaultConfigPath(), "%s-%s.sqlite" % (addonName, serviceName)))
+
+
+class Oapi(object):
+	"""Description of the interface to the offline dictionaries."""
+
+	def __init__(
+		self,
+		text: str = '',
+		langFrom: str = '',
+		langTo: str = ''
+	) -> None:
+		"""Input parameters for the dictionary lookup.
+		@param text: word or phrase to search in the dictionary
+		@type text: str
+		@param langFrom: source search language
+		@type langFrom: str
+		@param langTo: target search language
+		@type langTo: str
+		"""
+		self._text = text
+		self._langFrom = langFrom
+		self._langTo = langTo
+
+	def lookup(self) -> Dict:
+		"""Get the dictionary articles according to the specified parameters.
+		@return: found articles in the same form as the responses of the online services
+		@rtype: Dict
+		"""
+		try:
+			entries: List[Dict[str, str]] = store.lookup(self._langFrom, self._langTo, self._text)
+		except sqlite3.Error as e:
+			return {'error': "Database error: %s [%s]" % (str(e), store.path)}
+		except Exception as e:
+			return {'error': "Dictionary file error: %s" % str(e)}
+		stat['count'] = stat.get('count', 0) + 1
+		return {'def': entries}
+
+	def languages(self) -> List[str]:
+		"""List of language pairs available in the imported dictionaries.
+		@return: language pairs in the format "en-ru"
+		@rtype: List[str]
+		"""
+		return store.pairs()
@@ -0,0 +1,98 @@
+# dictionary.py
+# Service summary, configuration scheme and objects for executing translation requests
+# and processing the received responses
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Callable, Dict
+from html import escape
+import addonHandler
+from logHandler import log
+from ..service import Translator, Parser
+from ..shared import htmlTemplate
+from .api import Oapi
+from .languages import langs
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+
+# Translators: The name of the offline dictionary service
+serviceSummary = _("Offline Dictionaries")
+
+confspec: Dict[str, str] = {
+	"from": "string(default=%s)" % langs.defaultFrom.code,
+	"into": "string(default=%s)" % langs.defaultInto.code,
+	"autoswap": "boolean(default=false)",
+	"speculative": "boolean(default=false)",  # Look up both directions simultaneously when auto-swapping
+	"copytoclip": "boolean(default=false)",
+	"prefetch": "boolean(default=false)",  # Load entries for words around the caret in the background
+	"switchsynth": "boolean(default=false)"
+}
+
+
+class ServiceTranslator(Translator):
+	"""Provides interaction with the local dictionaries."""
+	# the local dictionaries respond faster than the cache, so their responses are not cached
+	cacheable: bool = False
+
+	def __init__(
+		self,
+		langFrom: str,
+		langTo: str,
+		text: str
+	) -> None:
+		"""Initialization of the source and target language, as well as word or phrase to search in the dictionary.
+		@param langFrom: source language
+		@type langFrom: str
+		@param langTo: target language
+		@type langTo: str
+		@param text: a word or phrase to look up in a dictionary
+		@type text: str
+		"""
+		super(ServiceTranslator, self).__init__(langFrom, langTo, text)
+
+	def run(self) -> None:
+		"""Query the local dictionaries and save the processed response.
+		Should run in a separate thread to avoid blocking.
+		"""
+		self._resp = Oapi(
+			text=self.text,
+			langFrom=self.langFrom,
+			langTo=self.langTo
+		).lookup()
+		if self._resp.get('error'):
+			self._error = True
+		parser: Parser = ServiceParser(self._resp)
+		html: str = parser.to_html()
+		self._html = htmlTemplate.format(body=html) if html else html
+		self._plaintext = parser.to_text()
+
+
+class ServiceParser(Parser):
+	"""Converts the found articles into a human-readable formats.
+	Must contain to_html() and to_text() methods.
+	"""
+
+	def to_html(self) -> str:
+		"""Convert the articles found in the local dictionaries to HTML format.
+		The articles are already stored in HTML format, so only the headwords and dictionary names are added.
+		@return: converted to HTML found articles
+		@rtype: str
+		"""
+		if not isinstance(self.resp, dict):  # incorrect response
+			return ''
+		if self.resp.get('error', ''):  # Error message
+			return '<h1>%s</h1>' % self.resp['error']
+		html: str = ''
+		for entry in self.resp.get('def', []):
+			html += '<h1>%s</h1>\n' % escape(entry['headword'])
+			html += '<p>%s</p>\n' % entry['article']
+			html += '<p><i>%s</i></p>\n' % escape(entry['dictionary'])
+		self.html = html
+		return self.html
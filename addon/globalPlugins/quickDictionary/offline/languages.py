@@ -0,0 +1,119 @@
+# languages.py
+# Description of the class for working with the languages of a specific service
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import List, Dict, Iterator
+from ..service import Language, Languages
+from .api import Oapi, store
+
+
+class ServiceLanguage(Language):
+	"""Language of the offline dictionaries, the codes are taken from the dictionary descriptions."""
+	pass
+
+
+class ServiceLanguages(Languages):
+	"""Represents a collection of language pairs of the imported dictionaries."""
+
+	def __init__(self, file: str = store.path) -> None:
+		"""Initialization of an object representing a collection of available language pairs.
+		Language pairs are taken from the local storage instead of the external json file.
+		@param file: database file containing the imported dictionaries
+		@type file: str
+		"""
+		super(ServiceLanguages, self).__init__(file)
+		self._Language = ServiceLanguage
+
+	def load(self) -> Dict[str, List[str]]:
+		"""Load the language pairs of the imported dictionaries.
+		@return: target language codes by the source language codes
+		@rtype: Dict[str, List[str]]
+		"""
+		pairs: Dict[str, List[str]] = {}
+		for pair in Oapi().languages():
+			source, target = pair.split('-', 1)
+			pairs.setdefault(source, [])
+			if target not in pairs[source]:
+				pairs[source].append(target)
+		return pairs
+
+	def update(self) -> bool:
+		"""Reload the list of language pairs after importing or removing the dictionaries.
+		This method should save the result of the operation in the logical field <self.updated>.
+		@return: the success status of the operation
+		@rtype: bool
+		"""
+		self._langs = self.load()
+		self._all = []
+		self.updated = True
+		return self.updated
+
+	def fromList(self) -> Iterator[ServiceLanguage]:
+		"""Sequence of available source languages.
+		@return: sequence of available source languages
+		@rtype: Iterator[ServiceLanguage]
+		"""
+		for lang in self._langs:
+			yield ServiceLanguage(lang)
+
+	def intoList(self, lang: str) -> Iterator[ServiceLanguage]:
+		"""Sequence of available target languages for a given source language.
+		@param lang: source language code
+		@type lang: str
+		@return: sequence of available target languages
+		@rtype: Iterator[ServiceLanguage]
+		"""
+		for target in self._langs.get(lang, []):
+			yield ServiceLanguage(target)
+
+	def isAvailable(self, source: str, target: str) -> bool:
+		"""Indicates whether the selected language pair is in the list of available languages.
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@return: whether a language pair is present in the list of available
+		@rtype: bool
+		"""
+		return target in self._langs.get(source, [])
+
+	@property
+	def defaultFrom(self) -> ServiceLanguage:
+		"""Default source language.
+		@return: English if available or there are no dictionaries, else - the first language in list
+		@rtype: ServiceLanguage
+		"""
+		codes: List[str] = [lang.code for lang in self.fromList()]
+		return ServiceLanguage('en' if 'en' in codes or not codes else codes[0])
+
+	@property
+	def defaultInto(self) -> ServiceLanguage:
+		"""Default target language.
+		@return: locale language, if it is available as the target for the default source,
+			otherwise the first one in the list
+		@rtype: ServiceLanguage
+		"""
+		codes: List[str] = [lang.code for lang in self.intoList(self.defaultFrom.code)]
+		return ServiceLanguage(self.locale.code if self.locale.code in codes or not codes else codes[0])
+
+	@property
+	def all(self) -> List:
+		"""Full list of all supported source and target languages.
+		@return: list of all supported languages
+		@rtype: List[ServiceLanguage]
+		"""
+		if not self._all:
+			codes: List[str] = []
+			for source, targets in self._langs.items():
+				for code in [source] + targets:
+					if code not in codes:
+						codes.append(code)
+			self._all = [ServiceLanguage(code) for code in codes]
+		return self._all
+
+
+# An instance of the Languages object for use in the add-on
+langs = ServiceLanguages()
@@ -0,0 +1,249 @@
+# settings.py
+# Contains a description of the settings panel of a specific service
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Callable, Iterator, Optional
+import re
+import addonHandler
+import gui
+import wx
+import config
+from threading import Thread
+from gui import guiHelper
+from tones import beep
+from logHandler import log
+from .. import addonName
+from .api import serviceName, store
+from .languages import ServiceLanguage, langs
+from .stardict import StarDict, StarDictError
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+
+class ServicePanel(wx.Panel):
+	"""Service settings panel object."""
+
+	def __init__(
+		self,
+		parent: Optional[wx.Window] = None,
+		id: int = wx.ID_ANY
+	) -> None:
+		"""Create a settings panel for a specific service.
+		Populate the service panel with settings controls.
+		@param parent:
+		@type parent: Optional[wx.Window]
+		@param id:
+		@type id: int
+		"""
+		super(ServicePanel, self).__init__(parent, id)
+		addonHelper = guiHelper.BoxSizerHelper(self, orientation=wx.VERTICAL)
+		self.SetSizer(addonHelper.sizer)
+		addonHelper.addItem(
+			# Translators: Help message for a dialog.
+			wx.StaticText(self, label=_("Select dictionary source and target language:"), style=wx.ALIGN_LEFT)
+		)
+		languageHelper = guiHelper.BoxSizerHelper(self, orientation=wx.HORIZONTAL)
+		self.fromChoice = languageHelper.addLabeledControl(
+			# Translators: A setting in addon settings dialog.
+			_("&Source language:"),
+			wx.Choice,
+			choices=[],
+			style=wx.CB_SORT
+		)
+		self.intoChoice = languageHelper.addLabeledControl(
+			# Translators: A setting in addon settings dialog.
+			_("&Target language:"),
+			wx.Choice,
+			choices=[],
+			style=wx.CB_SORT
+		)
+		addonHelper.addItem(languageHelper)
+		self.fromChoice.Bind(wx.EVT_CHOICE, self.onSelectFrom)
+		self.fillLanguages()
+
+		self.copyToClipboardChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("Copy dictionary response to clip&board"))
+		)
+		self.copyToClipboardChk.SetValue(config.conf[addonName][serviceName]['copytoclip'])
+		self.autoSwapChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("Auto-s&wap languages"))
+		)
+		self.autoSwapChk.SetValue(config.conf[addonName][serviceName]['autoswap'])
+		self.speculativeChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("Look up both language dir&ections simultaneously when auto-swapping"))
+		)
+		self.speculativeChk.SetValue(config.conf[addonName][serviceName]['speculative'])
+
+		self.dictsList = addonHelper.addLabeledControl(
+			# Translators: A setting in addon settings dialog.
+			_("Installed &dictionaries:"),
+			wx.ListBox,
+			choices=[]
+		)
+		buttonsHelper = guiHelper.ButtonHelper(wx.HORIZONTAL)
+		# Translators: Button label in addon settings dialog.
+		self.importButton = buttonsHelper.addButton(self, label=_("&Import StarDict dictionary..."))
+		self.importButton.Bind(wx.EVT_BUTTON, self.onImport)
+		# Translators: Button label in addon settings dialog.
+		self.removeButton = buttonsHelper.addButton(self, label=_("&Remove dictionary"))
+		self.removeButton.Bind(wx.EVT_BUTTON, self.onRemove)
+		addonHelper.addItem(buttonsHelper)
+		self.fillDictionaries()
+		addonHelper.sizer.Fit(self)
+
+	def widgetMaker(self, widget: wx.Choice, languages: Iterator[ServiceLanguage]) -> None:
+		"""Creating a widget based on the sequence of Language classes to display it in a wx.Choice object.
+		@param widget: widget based on a sequence of Language classes
+		@type widget: wx.Choice
+		@param languages: list of languages available in the dictionary
+		@type languages: Iterator[ServiceLanguage]
+		"""
+		# Translators: This displayed by default in the language selection choice list
+		widget.SetLabel(_("-- select language --"))
+		for lang in languages:
+			widget.Append(lang.name, lang)
+
+	def fillLanguages(self) -> None:
+		"""Fill in the lists of source and target languages of the imported dictionaries."""
+		self.fromChoice.Clear()
+		self.intoChoice.Clear()
+		self.widgetMaker(self.fromChoice, langs.fromList())
+		self.widgetMaker(self.intoChoice, langs.intoList(config.conf[addonName][serviceName]['from']))
+		langFrom: int = self.fromChoice.FindString(langs[config.conf[addonName][serviceName]['from']].name)
+		langTo: int = self.intoChoice.FindString(langs[config.conf[addonName][serviceName]['into']].name)
+		self.fromChoice.Select(langFrom if langFrom >= 0 else 0)
+		self.intoChoice.Select(langTo if langTo >= 0 else 0)
+
+	def fillDictionaries(self) -> None:
+		"""Fill in the list of the imported dictionaries."""
+		self.dictsList.Clear()
+		for dictionary in store.dictionaries():
+			self.dictsList.Append("{name} ({source} - {target}, {size})".format(
+				name=dictionary['name'],
+				source=langs[dictionary['source']].name,
+				target=langs[dictionary['target']].name,
+				size=dictionary['size']), dictionary['id'])
+		self.removeButton.Enable(self.dictsList.GetCount() > 0)
+
+	def onSelectFrom(self, event: wx.PyEvent) -> None:
+		"""Filling in the list of available destination languages when selecting the source language.
+		@param event: event indicating the selection of an item in the wx.Choice object
+		@type event: wx.PyEvent
+		"""
+		fromLang: str = self.fromChoice.GetClientData(self.fromChoice.GetSelection()).code
+		self.intoChoice.Clear()
+		self.widgetMaker(self.intoChoice, langs.intoList(fromLang))
+		intoLang: int = self.intoChoice.FindString(langs[config.conf[addonName][serviceName]['into']].name)
+		self.intoChoice.Select(intoLang if intoLang >= 0 else 0)
+
+	def onImport(self, event: wx.PyEvent) -> None:
+		"""Select the StarDict dictionary and its language pair, then import it in a separate thread.
+		@param event: event that occurs when a wx.Button is pressed
+		@type event: wx.PyEvent
+		"""
+		with wx.FileDialog(
+			self,
+			# Translators: The title of the dialog for selecting the dictionary file
+			message=_("Select the StarDict dictionary"),
+			# Translators: The type of files in the dialog for selecting the dictionary file
+			wildcard="%s (*.ifo)|*.ifo" % _("StarDict dictionaries"),
+			style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST
+		) as dialog:
+			if dialog.ShowModal() != wx.ID_OK:
+				return
+			path: str = dialog.GetPath()
+		try:
+			dictionary = StarDict(path)
+		except StarDictError as e:
+			# Translators: The title of the message box with the error of the dictionary import
+			gui.messageBox(message=str(e), caption=_("Import error"), style=wx.OK | wx.ICON_ERROR, parent=self)
+			return
+		with wx.TextEntryDialog(
+			self,
+			# Translators: The message in the dialog for entering the language pair of the imported dictionary
+			message=_("Enter the source and target language codes of the dictionary, for example: en-ru"),
+			caption=dictionary.name,
+			value='-'.join(dictionary.pair).strip('-')
+		) as dialog:
+			if dialog.ShowModal() != wx.ID_OK:
+				return
+			pair: str = dialog.GetValue().strip().lower()
+		if not re.match(r"^[a-z]{2,3}-[a-z]{2,3}$", pair):
+			gui.messageBox(
+				# Translators: The message about the incorrect language pair of the imported dictionary
+				message=_("Incorrect language pair: {pair}").format(pair=pair),
+				# Translators: The title of the message box with the error of the dictionary import
+				caption=_("Import error"),
+				style=wx.OK | wx.ICON_ERROR,
+				parent=self)
+			return
+		self.importButton.Disable()
+		Thread(target=self.importDictionary, args=(dictionary, *pair.split('-')), daemon=True).start()
+
+	def importDictionary(self, dictionary: StarDict, source: str, target: str) -> None:
+		"""Import the dictionary into the local storage, must be called in a separate thread.
+		@param dictionary: the dictionary selected by the user
+		@type dictionary: StarDict
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		"""
+		try:
+			size: int = store.add(dictionary.name, source, target, dictionary.entries())
+			# Translators: The message about the successful import of the dictionary
+			message: str = _("Imported {size} articles from the dictionary {name}").format(
+				size=size, name=dictionary.name)
+		except Exception as e:
+			log.error("Unable to import the dictionary %s: %s", dictionary.name, str(e))
+			message = str(e)
+		langs.update()
+		beep(500, 50)
+		wx.CallAfter(self.onImported, message)
+
+	def onImported(self, message: str) -> None:
+		"""Update the panel after the import of the dictionary is completed.
+		@param message: result of the import
+		@type message: str
+		"""
+		if not self:  # the panel has already been closed
+			return
+		self.importButton.Enable()
+		self.fillLanguages()
+		self.fillDictionaries()
+		# Translators: The title of the message box with the result of the dictionary import
+		gui.messageBox(message=message, caption=_("Import of the dictionary"), parent=self)
+
+	def onRemove(self, event: wx.PyEvent) -> None:
+		"""Remove the selected dictionary from the local storage.
+		@param event: event that occurs when a wx.Button is pressed
+		@type event: wx.PyEvent
+		"""
+		selection: int = self.dictsList.GetSelection()
+		if selection == wx.NOT_FOUND:
+			return
+		store.remove(self.dictsList.GetClientData(selection))
+		langs.update()
+		self.fillLanguages()
+		self.fillDictionaries()
+
+	def save(self) -> None:
+		"""Save the state of the service panel settings."""
+		if self.fromChoice.GetSelection() != wx.NOT_FOUND and self.intoChoice.GetSelection() != wx.NOT_FOUND:
+			config.conf[addonName][serviceName]['from'] = self.fromChoice.GetClientData(
+				self.fromChoice.GetSelection()).code
+			config.conf[addonName][serviceName]['into'] = self.intoChoice.GetClientData(
+				self.intoChoice.GetSelection()).code
+		config.conf[addonName][serviceName]['copytoclip'] = self.copyToClipboardChk.GetValue()
+		config.conf[addonName][serviceName]['autoswap'] = self.autoSwapChk.GetValue()
+		config.conf[addonName][serviceName]['speculative'] = self.speculativeChk.GetValue()
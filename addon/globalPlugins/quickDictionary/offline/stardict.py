@@ -0,0 +1,180 @@
+# stardict.py
+# Reading dictionaries in the StarDict format for import into the local storage
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Iterator, Tuple, List, Dict
+import os.path
+import re
+import gzip
+from io import BufferedIOBase
+import struct
+from html import escape
+
+
+class StarDictError(Exception):
+	"""Raised when the dictionary files are missing or damaged."""
+
+
+class StarDict(object):
+	"""StarDict dictionary, which consists of the files .ifo, .idx (or .idx.gz) and .dict (or .dict.dz).
+	Synonym files and resources are not used.
+	"""
+
+	# Types of the article fields that contain text or markup
+	textTypes: str = "mlgtxykwh"
+	# Types of the article fields that contain markup which is placed into the article without escaping
+	markupTypes: str = "ghx"
+
+	def __init__(self, ifo: str) -> None:
+		"""Read the description of the dictionary from the .ifo file.
+		@param ifo: full path to the .ifo file
+		@type ifo: str
+		"""
+		self._base: str = os.path.splitext(ifo)[0]
+		self.info: Dict[str, str] = {}
+		try:
+			with open(ifo, 'r', encoding='utf-8', errors='replace') as f:
+				lines: List[str] = f.read().splitlines()
+		except OSError as e:
+			raise StarDictError(str(e))
+		if not lines or not lines[0].startswith("StarDict's dict ifo file"):
+			raise StarDictError("Not a StarDict dictionary: %s" % ifo)
+		for line in lines[1:]:
+			key, sep, value = line.partition('=')
+			if sep:
+				self.info[key.strip()] = value.strip()
+
+	@property
+	def name(self) -> str:
+		"""Dictionary name.
+		@return: the name from the description or the file name
+		@rtype: str
+		"""
+		return self.info.get('bookname') or os.path.basename(self._base)
+
+	@property
+	def pair(self) -> Tuple[str, str]:
+		"""Language pair guessed from the dictionary name or file name, like "en-ru" or "eng_rus".
+		@return: source and target language codes or empty strings if they cannot be guessed
+		@rtype: Tuple[str, str]
+		"""
+		for text in (os.path.basename(self._base), self.name):
+			match = re.search(r"(?:^|[^a-zA-Z])([a-zA-Z]{2,3})[-_]([a-zA-Z]{2,3})(?:$|[^a-zA-Z])", text)
+			if match:
+				return match.group(1).lower(), match.group(2).lower()
+		return '', ''
+
+	def path(self, *extensions: str) -> str:
+		"""Find the dictionary file with one of the specified extensions.
+		@param extensions: possible file extensions in the order of preference
+		@type extensions: str
+		@return: full path to the existing file
+		@rtype: str
+		"""
+		for ext in extensions:
+			if os.path.isfile(self._base + ext):
+				return self._base + ext
+		raise StarDictError("File not found: %s%s" % (self._base, extensions[0]))
+
+	def open(self, *extensions: str) -> BufferedIOBase:
+		"""Open the dictionary file, compressed files are unpacked on the fly.
+		@param extensions: possible file extensions in the order of preference
+		@type extensions: str
+		@return: file object opened for reading
+		@rtype: BufferedIOBase
+		"""
+		path: str = self.path(*extensions)
+		if path.endswith(('.gz', '.dz')):
+			return gzip.open(path, 'rb')
+		return open(path, 'rb')
+
+	def index(self) -> List[Tuple[str, int, int]]:
+		"""Read the index of the dictionary.
+		@return: headwords with the offset and size of their articles in the .dict file
+		@rtype: List[Tuple[str, int, int]]
+		"""
+		offset: str = '>Q' if self.info.get('idxoffsetbits') == '64' else '>L'
+		record = struct.Struct(offset + 'L')
+		with self.open('.idx', '.idx.gz', '.idx.dz') as f:
+			data: bytes = f.read()
+		index: List[Tuple[str, int, int]] = []
+		pos: int = 0
+		while pos < len(data):
+			end: int = data.find(b'\0', pos)
+			if end < 0 or end + 1 + record.size > len(data):
+				raise StarDictError("Damaged index file: %s" % self._base)
+			headword: str = data[pos:end].decode('utf-8', errors='replace')
+			index.append((headword,) + record.unpack_from(data, end + 1))
+			pos = end + 1 + record.size
+		return index
+
+	def fields(self, data: bytes) -> Iterator[Tuple[str, bytes]]:
+		"""Split the article into fields of different types.
+		@param data: article data from the .dict file
+		@type data: bytes
+		@return: sequence of field types and their contents
+		@rtype: Iterator[Tuple[str, bytes]]
+		"""
+		types: str = self.info.get('sametypesequence', '')
+		pos: int = 0
+		i: int = 0
+		while pos < len(data):
+			if types:
+				if i >= len(types):
+					return
+				type: str = types[i]
+				last: bool = i == len(types) - 1
+			else:
+				type, pos, last = chr(data[pos]), pos + 1, False
+			i += 1
+			if last:
+				yield type, data[pos:]
+				return
+			if type.islower():
+				end: int = data.find(b'\0', pos)
+				end = len(data) if end < 0 else end
+				yield type, data[pos:end]
+				pos = end + 1
+			else:
+				size: int = struct.unpack_from('>L', data, pos)[0]
+				yield type, data[pos + 4:pos + 4 + size]
+				pos += 4 + size
+
+	def article(self, data: bytes) -> str:
+		"""Convert the article to HTML format, binary fields are skipped.
+		@param data: article data from the .dict file
+		@type data: bytes
+		@return: article in HTML format
+		@rtype: str
+		"""
+		parts: List[str] = []
+		for type, field in self.fields(data):
+			if type not in self.textTypes:
+				continue
+			text: str = field.decode('utf-8', errors='replace').strip()
+			if type not in self.markupTypes:
+				text = escape(text)
+			parts.append(text.replace('\r\n', '\n').replace('\n', '<br>\n'))
+		return '\n'.join(parts)
+
+	def entries(self) -> Iterator[Tuple[str, str]]:
+		"""Read all articles of the dictionary.
+		The articles are read in the order of their location in the file,
+		so compressed files are unpacked only once.
+		@return: sequence of headwords and corresponding articles in HTML format
+		@rtype: Iterator[Tuple[str, str]]
+		"""
+		index: List[Tuple[str, int, int]] = sorted(self.index(), key=lambda rec: rec[1])
+		with self.open('.dict', '.dict.dz') as f:
+			pos: int = 0
+			for headword, offset, size in index:
+				if offset != pos:
+					f.seek(offset)
+				data: bytes = f.read(size)
+				pos = offset + size
+				article: str = self.article(data)
+				if article:
+					yield headword, article
@@ -0,0 +1,161 @@
+# prefetch.py
+# Background loading of dictionary entries for words that the user is reading
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Optional, List, Dict, Tuple
+import re
+import config
+from threading import Thread, Condition
+from logHandler import log
+from . import addonName
+from .locator import services
+from .caching import cache
+from .shared import translateWithCaching, hashForCache, cacheKey, hasQuota, inflight, Generation
+
+
+class Prefetcher(object):
+	"""Loads dictionary entries for the words around the caret into the cache in a separate thread.
+	The text is passed by the global plugin after the caret has stopped for the delay,
+	words are requested one by one, and when another text is passed, the remaining words are discarded
+	and the requests in progress for the words that are not in the new text are cancelled.
+	The number of requests to each service is limited by the budget for the current session.
+	"""
+
+	def __init__(
+		self,
+		delay: float = 1.0,
+		limit: int = 20,
+		budget: int = 200,
+		reserve: int = 100,
+		minLength: int = 3
+	) -> None:
+		"""Prefetching parameters.
+		@param delay: time in seconds during which the caret must remain in place before its text is passed
+		@type delay: float
+		@param limit: maximum number of words taken from one text
+		@type limit: int
+		@param budget: maximum number of prefetch requests to each service per session
+		@type budget: int
+		@param reserve: number of remaining requests of the daily quota that is left for the user's lookups
+		@type reserve: int
+		@param minLength: minimum length of the word to be prefetched
+		@type minLength: int
+		"""
+		self.delay = delay
+		self.limit = limit
+		self.budget = budget
+		self.reserve = reserve
+		self.minLength = minLength
+		self._cond = Condition()
+		self._text: str = ''
+		self._words: List[str] = []
+		# generation of the words being prefetched, it is superseded by the next text
+		self._generation: Generation = Generation()
+		self._spent: Dict[str, int] = {}
+		self._thread: Optional[Thread] = None
+
+	@property
+	def enabled(self) -> bool:
+		"""Whether prefetching is enabled for the active service.
+		@return: value stored in the add-on configuration
+		@rtype: bool
+		"""
+		return config.conf[addonName][services[config.conf[addonName]['active']].name].get('prefetch', False)
+
+	def candidates(self, text: str) -> List[str]:
+		"""Split the text into unique words that are likely to be looked up.
+		@param text: text around the caret
+		@type text: str
+		@return: words in the order of their appearance in the text
+		@rtype: List[str]
+		"""
+		words: List[str] = []
+		for word in re.findall(r"[^\W\d_]+", text):
+			if len(word) >= self.minLength and word.lower() not in (w.lower() for w in words):
+				words.append(word)
+			if len(words) >= self.limit:
+				break
+		return words
+
+	def keys(self, words: List[str]) -> List[str]:
+		"""Keys of the requests of the words to the active service.
+		@param words: words to be looked up
+		@type words: List[str]
+		@return: keys of the records in the cache
+		@rtype: List[str]
+		"""
+		active: int = config.conf[addonName]['active']
+		options = config.conf[addonName][services[active].name]
+		hash: str = hashForCache(active)
+		return [cacheKey(options['from'], options['into'], word, hash) for word in words]
+
+	def schedule(self, text: str) -> None:
+		"""Replace the queue of words with the words of the new text.
+		@param text: text around the caret
+		@type text: str
+		"""
+		with self._cond:
+			if text == self._text:
+				return
+			self._text = text
+			self._words = self.candidates(text)
+			self._generation = self._generation.next(keep=self.keys(self._words))
+			self._cond.notify()
+		if self._thread is None:
+			self._thread = Thread(target=self._run, daemon=True)
+			self._thread.start()
+
+	def cancel(self) -> None:
+		"""Discard all words that have not been requested yet and cancel the requests in progress."""
+		with self._cond:
+			self._text = ''
+			self._words = []
+			self._generation = self._generation.next()
+
+	def _next(self) -> Tuple[str, Generation]:
+		"""Wait for the next word to be requested.
+		@return: word from the queue and the generation it belongs to
+		@rtype: Tuple[str, Generation]
+		"""
+		with self._cond:
+			while not self._words:
+				self._cond.wait()
+			return self._words.pop(0), self._generation
+
+	def _run(self) -> None:
+		"""Request the queued words one by one."""
+		while True:
+			word, generation = self._next()
+			try:
+				self.fetch(word, generation)
+			except Exception as e:
+				log.error("Unable to prefetch the dictionary entry: %s", str(e))
+
+	def fetch(self, word: str, generation: Optional[Generation] = None) -> None:
+		"""Request the dictionary entry for the word if it is not in the cache and the budget allows it.
+		@param word: word to be looked up
+		@type word: str
+		@param generation: generation of the prefetched words, the request is cancelled when it is superseded
+		@type generation: Optional[Generation]
+		"""
+		active: int = config.conf[addonName]['active']
+		service = services[active]
+		options = config.conf[addonName][service.name]
+		if not self.enabled or not service.translator.cacheable or self._spent.get(service.name, 0) >= self.budget:
+			return
+		if not hasQuota(service, self.reserve) or generation is not None and generation.cancelled:
+			return
+		hash: str = hashForCache(active)
+		key: str = cacheKey(options['from'], options['into'], word, hash)
+		if key in cache or key in inflight:
+			return
+		self._spent[service.name] = self._spent.get(service.name, 0) + 1
+		translateWithCaching(
+			options['from'], options['into'], word, hash, quiet=True, generation=generation, background=True)
+
+
+# An instance of the prefetcher for use in the add-on
+prefetcher = Prefetcher()
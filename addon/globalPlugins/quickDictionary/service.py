@@ -2,8 +2,8 @@
 """
 	Description of common components for:
 	* working with languages (class Languages);
-	* executing translation requests (class Translator);
-	* parsing of deserialized data (class Parser);
+	* executing translation requests on the event loop of the add-on (class Translator);
+	* parsing of deserialized data (classes Parser and EntryParser);
 	* credentials management for all connected services (class Secrets).
 	Relevant service classes must be inherited from Languages, Translator and Parser objects
 
@@ -14,7 +14,7 @@
 """
 
 from __future__ import annotations
-from typing import Callable, Union, List, Dict, Iterator
+from typing import Callable, Optional, Union, List, Dict, Iterator
 import addonHandler
 import os.path
 import json
@@ -23,11 +23,15 @@ import zlib
 import binascii
 import zipfile
 from abc import ABCMeta, abstractmethod
-from threading import Thread
+from html import unescape
+import asyncio
+from concurrent.futures import Future, wait
 from locale import getdefaultlocale
 from languageHandler import getLanguageDescription
 from logHandler import log
 from . import addonName
+from .eventloop import eventLoop
+from .entry import Entry, HtmlRenderer, TextRenderer, BrailleRenderer
 
 try:
 	addonHandler.initTranslation()
@@ -261,15 +265,37 @@ class Languages(metaclass=ABCMeta):
 		raise NotImplementedError("This property must be overridden in the child class!")
 
 
-class Translator(Thread):
-	"""Provides interaction with the online dictionary service."""
+# Template for displaying HTML content.
+htmlTemplate = ''.join([
+	"&nbsp;",
+	"<!DOCTYPE html>",
+	"<html>",
+	"<head>",
+	'<meta http-equiv="Content-Type" content="text/html; charset=utf-8">',
+	"<title></title>"
+	'<link rel="stylesheet" type="text/css" href="%s">' % os.path.join(os.path.dirname(__file__), 'style.css'),
+	"</head>",
+	"<body>{body}</body>",
+	"</html>"
+])
+
+
+class Translator(object):
+	"""Provides interaction with the online dictionary service.
+	The request is performed by the lookup() coroutine on the event loop of the add-on,
+	and its completion is available through a thread-safe future.
+	The start() and join() methods allow to use the object in the same way as a thread.
+	Services that build the structured entry store it in the _entry attribute,
+	each output format is rendered from it on the first access.
+	"""
+	# whether the prepared responses are stored in the persistent cache
+	cacheable: bool = True
 
 	def __init__(
 		self,
 		langFrom: str,
 		langTo: str,
-		text: str,
-		*args, **kwargs
+		text: str
 	) -> None:
 		"""Initialization of the source and target languages,
 		as well as the word or phrase to search in the remote dictionary.
@@ -280,13 +306,18 @@ class Translator(Thread):
 		@param text: a word or phrase to look up in a dictionary
 		@type text: str
 		"""
-		super().__init__(*args, **kwargs)
+		super().__init__()
+		self._future: Optional[Future] = None
+		# called with the plain text and the braille form of each part of the entry as soon as the part is received
+		self.onPart: Optional[Callable[[str, str], None]] = None
 		self._langFrom = langFrom
 		self._langTo = langTo
 		self._text = text
 		self._resp: Dict = {}
+		self._entry: Optional[Entry] = None
 		self._html: str = ''
 		self._plaintext: str = ''
+		self._braille: str = ''
 		self._error: bool = False
 
 	@property
@@ -324,9 +355,13 @@ class Translator(Thread):
 	@property
 	def html(self) -> str:
 		"""Response from the remote service in the HTML format.
+		The page is rendered from the structured entry only when the browseable window is requested.
 		@return: hypertext string
 		@rtype: str
 		"""
+		if not self._html and self._entry:
+			body: str = HtmlRenderer().render(self._entry)
+			self._html = htmlTemplate.format(body=body) if body else body
 		return self._html
 
 	@property
@@ -335,8 +370,31 @@ class Translator(Thread):
 		@return: plain text string
 		@rtype: str
 		"""
+		if not self._plaintext and self._entry:
+			self._plaintext = TextRenderer().render(self._entry)
 		return self._plaintext
 
+	@property
+	def braille(self) -> str:
+		"""Response from the remote service in the short form for the braille display.
+		@return: plain text string
+		@rtype: str
+		"""
+		if not self._braille and self._entry:
+			self._braille = BrailleRenderer().render(self._entry)
+		return self._braille or self.plaintext
+
+	@property
+	def empty(self) -> bool:
+		"""Whether the prepared response contains nothing to show.
+		Unlike the check of the plain text, it does not require rendering the structured entry.
+		@return: True if neither the entry nor the error message has been received
+		@rtype: bool
+		"""
+		if self._entry is not None:
+			return not self._entry
+		return not self._plaintext
+
 	@property
 	def error(self) -> bool:
 		"""Were there any errors in the remote service request?
@@ -345,17 +403,127 @@ class Translator(Thread):
 		"""
 		return self._error
 
-	def __hash__(self) -> int:
-		"""Make the class hashable with a constant hash value.
-		This is necessary for the caching performed by the decorator functools.lru_cache to work correctly.
-		@return: numeric value of the hash
-		@rtype: int, always 0
+	def toDict(self) -> Dict:
+		"""Convert the prepared response to a dict type for storing it in the cache.
+		The structured entry is stored in the compact form instead of the formats rendered from it.
+		@return: dict, which contains the response from the remote service in all formats
+		@rtype: Dict
 		"""
-		return 0
+		if self._entry is not None:
+			return {
+				"resp": self._resp,
+				"entry": self._entry.toDict(),
+				"error": self._error
+			}
+		return {
+			"resp": self._resp,
+			"html": self._html,
+			"plaintext": self._plaintext,
+			"braille": self._braille,
+			"error": self._error
+		}
 
-	def run(self) -> None:
+	def fromDict(self, rec: Dict) -> Translator:
+		"""Restore the previously prepared response without querying the remote service.
+		@param rec: dict object obtained using the toDict() method
+		@type rec: Dict
+		@return: updated object with the restored response
+		@rtype: Translator
+		"""
+		self._resp = rec.get('resp', {})
+		self._entry = Entry.fromDict(rec['entry']) if 'entry' in rec else None
+		self._html = rec.get('html', '')
+		self._plaintext = rec.get('plaintext', '')
+		self._braille = rec.get('braille', '')
+		self._error = rec.get('error', False)
+		return self
+
+	@property
+	def future(self) -> Optional[Future]:
+		"""Thread-safe future of the request, which is completed together with the request.
+		@return: future of the started request or None if the request has not been started
+		@rtype: Optional[concurrent.futures.Future]
+		"""
+		return self._future
+
+	def start(self) -> Future:
+		"""Start the request on the event loop of the add-on.
+		@return: thread-safe future of the request, its result is the current object
+		@rtype: concurrent.futures.Future
+		"""
+		if self._future is None:
+			self._future = eventLoop.submit(self._task())
+		return self._future
+
+	def join(self, timeout: Optional[float] = None) -> None:
+		"""Wait for the request to be completed, cancelled or for the timeout to expire.
+		@param timeout: maximum waiting time in seconds
+		@type timeout: Optional[float]
+		"""
+		if self._future is not None:
+			wait([self._future], timeout)
+
+	def cancel(self) -> bool:
+		"""Cancel the request, the connection used by the request is closed immediately.
+		@return: whether the request has been cancelled
+		@rtype: bool
+		"""
+		return self._future is not None and self._future.cancel()
+
+	def is_alive(self) -> bool:
+		"""Whether the request is in progress.
+		@return: True if the request has been started and not completed yet
+		@rtype: bool
+		"""
+		return self._future is not None and not self._future.done()
+
+	@property
+	def cancelled(self) -> bool:
+		"""Whether the request has been cancelled.
+		@return: True if the request has been cancelled
+		@rtype: bool
+		"""
+		return self._future is not None and self._future.cancelled()
+
+	def emit(self, text: str, braille: str = '') -> None:
+		"""Pass the received part of the entry to the listener, so that it can be announced before the whole entry.
+		@param text: part of the entry in plaintext format
+		@type text: str
+		@param braille: the short form of the part for the braille display, the same as the text if not specified
+		@type braille: str
+		"""
+		if self.onPart is None or not text:
+			return
+		try:
+			self.onPart(text, braille or text)
+		except Exception as e:
+			log.error("Unable to process the part of the entry: %s", str(e))
+
+	async def _task(self) -> Translator:
+		"""Perform the request, unexpected errors are stored in the response instead of being raised.
+		@return: current object with the processed response
+		@rtype: Translator
+		"""
+		try:
+			await self.lookup()
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			log.error("Unable to look up %s: %s", self.text, str(e))
+			self._resp = {'error': str(e)}
+			self._error = True
+		return self
+
+	async def lookup(self) -> None:
 		"""Query the remote dictionary and save the processed response.
-		Should run in a separate thread to avoid blocking.
+		Services that support the event loop override this coroutine.
+		By default the synchronous run() method is called in the executor of the event loop.
+		"""
+		await asyncio.get_event_loop().run_in_executor(None, self.run)
+
+	def run(self) -> None:
+		"""Query the dictionary synchronously and save the processed response.
+		Must be overridden in the child class that does not override the lookup() coroutine.
 		"""
 		raise NotImplementedError("This method must be overridden in the child class!")
 
@@ -387,14 +555,88 @@ class Parser(metaclass=ABCMeta):
 		@return: deserialized response in plaintext format
 		@rtype: str
 		"""
+		return self.htmlToText(self.html or self.to_html())
+
+	@staticmethod
+	def htmlToText(html: str) -> str:
+		"""Convert a fragment of the dictionary response from HTML format to plain text.
+		@param html: dictionary response or its part in HTML format
+		@type html: str
+		@return: the same content in plaintext format
+		@rtype: str
+		"""
 		li: str = u"\u2022 "  # marker character code
 		h1: str = "- "
-		text: str = self.html or self.to_html()
-		text = text.replace('<li>', li).replace('<h1>', h1)
+		text: str = html.replace('<li>', li).replace('<h1>', h1)
 		text = re.sub(r'\<[^>]*\>', '', text)
+		text = unescape(text)
 		text = '\r\n'.join((s for s in text.split('\n') if s))
 		return text
 
+	def to_braille(self) -> str:
+		"""Return the dictionary response in the form suitable for the braille display.
+		@return: deserialized response in plaintext format
+		@rtype: str
+		"""
+		return self.to_text()
+
+
+class EntryParser(Parser):
+	"""Parser of the services which responses are converted to the structured entry model.
+	The child class must override the parse() method, the entry is built only once
+	and each output format is rendered directly from it.
+	"""
+
+	def __init__(self, response: Dict) -> None:
+		"""Input deserialized data for further analysis and conversion to other formats.
+		@param response: deserialized response from the online dictionary
+		@type response: Dict
+		"""
+		super(EntryParser, self).__init__(response)
+		self._entry: Optional[Entry] = None
+
+	@abstractmethod
+	def parse(self) -> Entry:
+		"""Build the structured entry from the deserialized response.
+		This method must be overridden in the child class.
+		@return: dictionary entry independent of the output format
+		@rtype: Entry
+		"""
+		raise NotImplementedError("This method must be overridden in the child class!")
+
+	@property
+	def entry(self) -> Entry:
+		"""Structured entry, it is built on the first access.
+		@return: dictionary entry independent of the output format
+		@rtype: Entry
+		"""
+		if self._entry is None:
+			self._entry = self.parse()
+		return self._entry
+
+	def to_html(self) -> str:
+		"""Return the HTML representation of the dictionary entry.
+		@return: found data in HTML format
+		@rtype: str
+		"""
+		if not self.html:
+			self.html = HtmlRenderer().render(self.entry)
+		return self.html
+
+	def to_text(self) -> str:
+		"""Return the dictionary entry as plain text for the speech synthesizer.
+		@return: found data in plaintext format
+		@rtype: str
+		"""
+		return TextRenderer().render(self.entry)
+
+	def to_braille(self) -> str:
+		"""Return the short form of the dictionary entry for the braille display.
+		@return: found data in plaintext format
+		@rtype: str
+		"""
+		return BrailleRenderer().render(self.entry)
+
 
 class Secret(object):
 	"""An object that stores credentials for the selected service."""
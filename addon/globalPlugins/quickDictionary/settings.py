@@ -113,6 +113,11 @@ class ServicePanel(wx.Panel):
 		sizer.Add(self._servContainer)
 		sizer.Fit(self)
 
+		# Translators: A setting in addon settings dialog.
+		self._prefetchChk = wx.CheckBox(self, label=_("Pre&fetch dictionary entries for words around the caret"))
+		sizer.Add(self._prefetchChk)
+		self._prefetchChk.SetValue(config.conf[addonName][services[self._active].name]['prefetch'])
+
 		# Translators: A setting in addon settings dialog.
 		self._switchSynthChk = wx.CheckBox(self, label=_("Switch between &voice synthesizers for selected languages"))  # noqa E501
 		sizer.Add(self._switchSynthChk)
@@ -228,6 +233,7 @@ class ServicePanel(wx.Panel):
 	def save(self) -> None:
 		"""Save the state of the panel settings."""
 		self._servPanel.save()
+		config.conf[addonName][services[self._active].name]['prefetch'] = self._prefetchChk.GetValue()
 		config.conf[addonName][services[self._active].name]['switchsynth'] = self._switchSynthChk.GetValue()
 		if self._switchSynthChk.GetValue():
 			for slot, profile in profiles:
@@ -5,8 +5,8 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Any, Callable, List, Dict
-import os.path
+from __future__ import annotations
+from typing import Any, Callable, Iterable, List, Dict, Optional, Tuple
 import re
 import addonHandler
 import api
@@ -16,16 +16,22 @@ import config
 import versionInfo
 import speech
 from speech.commands import LangChangeCommand, CallbackCommand
-from textInfos import POSITION_SELECTION
+from textInfos import POSITION_SELECTION, POSITION_CARET, UNIT_PARAGRAPH
 from time import sleep
 from tones import beep
-from functools import lru_cache, wraps
-from threading import Thread
+from functools import wraps, partial
+from contextlib import nullcontext
+import asyncio
+from threading import Thread, Event, Lock
+from concurrent.futures import Future
 from logHandler import log
 from . import addonName
 from .locator import services
 from .synthesizers import profiles
-from .service import Translator
+from .service import Translator, htmlTemplate  # noqa F401 - the page template is used by the services
+from .caching import cache
+from .eventloop import eventLoop
+from .vocabulary import vocabulary, refresher
 
 try:
 	addonHandler.initTranslation()
@@ -34,61 +40,409 @@ except addonHandler.AddonError:
 _: Callable[[str], str]
 
 
-@lru_cache(maxsize=64)
-def translateWithCaching(langFrom: str, langInto: str, text: str, hashForCache: int) -> Translator:
+class Beeper(object):
+	"""Sound signals that are output periodically while waiting for a long operation to complete.
+	Signals are produced by a coroutine on the event loop of the add-on,
+	and are stopped immediately when leaving the context, without waiting for the next interval.
+	"""
+
+	def __init__(self, interval: float = 1.0, hz: int = 500, length: int = 100) -> None:
+		"""Parameters of the sound signals.
+		@param interval: time between signals in seconds
+		@type interval: float
+		@param hz: pitch of the signal
+		@type hz: int
+		@param length: duration of the signal in milliseconds
+		@type length: int
+		"""
+		self._interval = interval
+		self._hz = hz
+		self._length = length
+		self._future: Optional[Future] = None
+
+	async def _run(self) -> None:
+		"""Output the signal at each interval until the waiting is stopped."""
+		while True:
+			await asyncio.sleep(self._interval)
+			beep(self._hz, self._length)
+
+	def __enter__(self) -> Beeper:
+		"""Start output of the sound signals.
+		@return: current object
+		@rtype: Beeper
+		"""
+		self._future = eventLoop.submit(self._run())
+		return self
+
+	def __exit__(self, *args) -> None:
+		"""Stop output of the sound signals."""
+		if self._future is not None:
+			self._future.cancel()
+
+
+class SingleFlight(object):
+	"""Coalescing of identical requests that are performed at the same time.
+	The first caller performs the request, and the others wait for its completion and receive the same result.
+	"""
+
+	def __init__(self) -> None:
+		"""Initialization of the empty list of requests in progress."""
+		self._lock = Lock()
+		self._calls: Dict[str, Future] = {}
+		self._waiters: Dict[str, int] = {}
+
+	def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+		"""Perform the request or join the identical request that is already in progress.
+		@param key: key identifying the request
+		@type key: str
+		@param func: function performing the request
+		@type func: Callable[[], Any]
+		@return: result of the request and a sign that it was shared with another caller
+		@rtype: Tuple[Any, bool]
+		"""
+		with self._lock:
+			future: Optional[Future] = self._calls.get(key)
+			if future is None:
+				future = self._calls[key] = Future()
+				leader: bool = True
+			else:
+				leader = False
+		if not leader:
+			with self._lock:
+				self._waiters[key] = self._waiters.get(key, 0) + 1
+			try:
+				return future.result(), True
+			finally:
+				with self._lock:
+					self._waiters[key] -= 1
+					if not self._waiters[key]:
+						del self._waiters[key]
+		try:
+			result: Any = func()
+		except BaseException as e:
+			future.set_exception(e)
+			raise
+		else:
+			future.set_result(result)
+		finally:
+			with self._lock:
+				del self._calls[key]
+		return result, False
+
+	def shared(self, key: str) -> bool:
+		"""Check whether other callers are waiting for the result of the request.
+		@param key: key identifying the request
+		@type key: str
+		@return: True if the request has at least one waiting caller besides the one who performs it
+		@rtype: bool
+		"""
+		with self._lock:
+			return self._waiters.get(key, 0) > 0
+
+	def __contains__(self, key: str) -> bool:
+		"""Check whether the request is in progress.
+		@param key: key identifying the request
+		@type key: str
+		@return: True if the request is in progress
+		@rtype: bool
+		"""
+		with self._lock:
+			return key in self._calls
+
+
+# Requests to the online services that are in progress, identified by the keys of the persistent cache
+inflight = SingleFlight()
+
+
+class Generation(object):
+	"""Generation of the user's lookups or of the words prefetched around the caret.
+	Each new lookup starts the next generation and supersedes the previous one:
+	the requests of the previous generation are cancelled, unless other callers are waiting for them,
+	and the result of the superseded lookup must not be announced.
+	"""
+
+	def __init__(self, number: int = 0) -> None:
+		"""Initialization of the generation.
+		@param number: sequence number of the generation
+		@type number: int
+		"""
+		self.number = number
+		self._lock = Lock()
+		self._cancelled: bool = False
+		self._requests: List[Tuple[str, Translator]] = []
+
+	@property
+	def cancelled(self) -> bool:
+		"""Whether the generation has been superseded by a newer one.
+		@return: True if the lookups of this generation are obsolete
+		@rtype: bool
+		"""
+		return self._cancelled
+
+	def track(self, key: str, translator: Translator) -> None:
+		"""Register the started request so that it can be cancelled together with the generation.
+		@param key: key of the request in the persistent cache
+		@type key: str
+		@param translator: object which performs the request
+		@type translator: Translator
+		"""
+		with self._lock:
+			if not self._cancelled:
+				self._requests.append((key, translator))
+				return
+		if not inflight.shared(key):
+			translator.cancel()
+
+	def cancel(self, keep: Iterable[str] = ()) -> None:
+		"""Cancel the requests of the generation that nobody else is waiting for.
+		@param keep: keys of the requests that are not cancelled, because the next lookup will join them
+		@type keep: Iterable[str]
+		"""
+		with self._lock:
+			self._cancelled = True
+			requests, self._requests = self._requests, []
+		keep = set(keep)
+		for key, translator in requests:
+			if key not in keep and not inflight.shared(key):
+				translator.cancel()
+
+	def next(self, keep: Iterable[str] = ()) -> Generation:
+		"""Supersede the current generation.
+		@param keep: keys of the requests of the next lookup, identical requests in progress are not cancelled
+		@type keep: Iterable[str]
+		@return: the next generation of the lookups
+		@rtype: Generation
+		"""
+		self.cancel(keep)
+		return Generation(self.number + 1)
+
+
+# Service options which do not affect the content of the dictionary entry
+volatileOptions = (
+	'from', 'into', 'autoswap', 'copytoclip', 'switchsynth', 'username', 'password',
+	'mirror', 'race', 'workers', 'speculative', 'prefetch', 'vocabulary')
+
+
+def cacheKey(langFrom: str, langInto: str, text: str, hashForCache: str) -> str:
+	"""Key of the dictionary entry in the persistent cache for the active service.
+	@param langFrom: source language
+	@type langFrom: str
+	@param langInto: target language
+	@type langInto: str
+	@param text: word or phrase to translate, whitespace is normalized
+	@type text: str
+	@param hashForCache: hash of all parameters that must be considered when caching
+	@type hashForCache: str
+	@return: key of the record in the cache
+	@rtype: str
+	"""
+	service = services[config.conf[addonName]['active']]
+	return cache.key(service.name, langFrom, langInto, ' '.join(text.split()), hashForCache)
+
+
+def translateWithCaching(
+	langFrom: str,
+	langInto: str,
+	text: str,
+	hashForCache: str,
+	quiet: bool = False,
+	generation: Optional[Generation] = None,
+	onPart: Optional[Callable[[str, str], None]] = None,
+	background: bool = False
+) -> Translator:
 	"""Call the request procedure to the remote server on a separate thread.
 	Wait for the request to complete and return a prepared response.
-	All function values are cached to reduce the number of requests to the server.
+	Successful responses are stored in the persistent cache to reduce the number of requests to the server,
+	responses without a dictionary entry are stored for a short time, failed requests are not stored at all.
+	If the request fails, the outdated entry is returned while it is still present in the cache.
+	When the personal dictionary is enabled, it is consulted before the request to the remote server,
+	and its stale entries are returned immediately and updated in the background.
+	Only the entries looked up by the user are stored in the personal dictionary.
+	Translators that are not cacheable, such as local dictionaries, are queried directly.
+	Concurrent calls for the same entry share one request to the remote server.
+	If that request has been cancelled by a superseded lookup, it is performed again.
 	@param langFrom: source language
 	@type langFrom: str
 	@param langInto: target language
 	@type langInto: str
 	@param text: word or phrase to translate
 	@type text: str
-	* this parameter is not used in the function, but is required for to properly caching
 	@param hashForCache: hash of all parameters that must be considered when caching
-	@type hashForCache: int
+	@type hashForCache: str
+	@param quiet: do not output sound signals while waiting for the response
+	@type quiet: bool
+	@param generation: generation of the lookup, its requests are cancelled when it is superseded
+	@type generation: Optional[Generation]
+	@param onPart: called with the text and the braille of each part of the entry received from the remote server
+		before the whole entry, parts are not passed for entries taken from the cache or received by another caller
+	@type onPart: Optional[Callable[[str, str], None]]
+	@param background: the lookup is not requested by the user, such as prefetching or batch lookup,
+		its entries are not stored in the personal dictionary
+	@type background: bool
+	@return: object containing the prepared response from the remote dictionary
+	@rtype: Translator
+	"""
+	key: str = cacheKey(langFrom, langInto, text, hashForCache)
+	service = services[config.conf[addonName]['active']]
+	translator = service.translator(langFrom, langInto, text)
+	if not translator.cacheable:
+		translator.start()
+		translator.join()
+		return translator
+	enabled: bool = config.conf[addonName][service.name].get('vocabulary', False)
+	keep: bool = enabled and not background
+	rec = cache.get(key)
+	if rec is not None:
+		translator.fromDict(rec)
+		# the entry received by the prefetching or batch lookup is stored when the user looks it up
+		if keep and not translator.empty and vocabulary.get(
+				service.name, langFrom, langInto, text, hashForCache) is None:
+			vocabulary.put(service.name, langFrom, langInto, text, hashForCache, rec)
+		return translator
+	stored = vocabulary.get(service.name, langFrom, langInto, text, hashForCache) if enabled else None
+	if stored is not None:
+		rec, stale = stored
+		if stale:
+			refresher.schedule(key, partial(refreshEntry, key, service, langFrom, langInto, text, hashForCache))
+		cache.put(key, rec)
+		return translator.fromDict(rec)
+	# identical lookups started while this one is in progress share its request and receive the same result
+	with nullcontext() if quiet else Beeper():
+		for attempt in range(2):
+			translator.onPart = onPart
+			translator = inflight.do(key, partial(
+				requestEntry, key, translator, generation))[0]
+			if not translator.cancelled or generation is not None and generation.cancelled:
+				break
+			translator = service.translator(langFrom, langInto, text)
+	# the request may be shared with the background lookup, so the entry is stored by the user's caller
+	if keep and not translator.cancelled and not translator.error and not translator.empty:
+		vocabulary.put(service.name, langFrom, langInto, text, hashForCache, translator.toDict())
+	return translator
+
+
+def requestEntry(
+	key: str,
+	translator: Translator,
+	generation: Optional[Generation] = None
+) -> Translator:
+	"""Request the dictionary entry from the remote server and store the result.
+	@param key: key of the record in the cache
+	@type key: str
+	@param translator: object which performs the request
+	@type translator: Translator
+	@param generation: generation of the lookup which performs the request
+	@type generation: Optional[Generation]
 	@return: object containing the prepared response from the remote dictionary
 	@rtype: Translator
 	"""
-	translator = services[config.conf[addonName]['active']].translator(langFrom, langInto, text)
 	translator.start()
-	i = 0
-	while translator.is_alive():
-		sleep(0.1)
-		if i == 10:
-			beep(500, 100)
-			i = 0
-		i += 1
+	if generation is not None:
+		generation.track(key, translator)
 	translator.join()
+	if translator.cancelled:
+		return translator
+	if translator.error:
+		# the failed request does not affect other records, and an outdated entry is better than an error message
+		rec = cache.get(key, expired=True)
+		if rec is not None and (rec.get('plaintext') or rec.get('entry')):
+			translator.fromDict(rec)
+	elif not translator.empty:
+		cache.put(key, translator.toDict())
+	else:
+		# the absence of the dictionary entry is stored for a short time only
+		cache.put(key, translator.toDict(), ttl=cache.negativeTtl)
 	return translator
 
 
-def hashForCache(active: int) -> int:
-	"""Hash sum of the values of all service parameters that must be taken into account when caching requests."""
-	hashes: int = active
-	for opt, value in config.conf[addonName][services[active].name].items():
-		hashes += hash(value)
-	return hashes
+def refreshEntry(key: str, service: Any, langFrom: str, langInto: str, text: str, hashForCache: str) -> None:
+	"""Request the stale entry of the personal dictionary again and update it together with the cache.
+	Called in the background, so the request is skipped if the service quota is running out.
+	@param key: key of the record in the cache
+	@type key: str
+	@param service: the service that provided the entry
+	@type service: DictionaryService
+	@param langFrom: source language
+	@type langFrom: str
+	@param langInto: target language
+	@type langInto: str
+	@param text: word or phrase to translate
+	@type text: str
+	@param hashForCache: hash of all parameters that must be considered when caching
+	@type hashForCache: str
+	"""
+	if not hasQuota(service):
+		return
+	translator = service.translator(langFrom, langInto, text)
+	translator.start()
+	translator.join()
+	if not translator.error and not translator.empty:
+		cache.put(key, translator.toDict())
+		vocabulary.put(service.name, langFrom, langInto, text, hashForCache, translator.toDict())
+
+
+def hasQuota(service: Any, reserve: int = 100) -> bool:
+	"""Indicates whether background requests to the service are allowed.
+	They are not allowed when the daily quota is nearly exhausted, one of the service endpoints is unavailable,
+	or the request rate limiter has no spare tokens left for the user's lookups.
+	@param service: dictionary service
+	@type service: DictionaryService
+	@param reserve: number of remaining requests of the daily quota that is left for the user's lookups
+	@type reserve: int
+	@return: whether the request can be performed
+	@rtype: bool
+	"""
+	remain = service.stat.get('remain')
+	if remain is not None and int(remain) <= reserve:
+		return False
+	if not all(circuit.available for circuit in service.stat.get('endpoints', {}).values()):
+		return False
+	return all(rateLimiter.spare for rateLimiter in service.stat.get('limits', {}).values())
+
+
+def waitForQuota(
+	service: Any,
+	reserve: int = 100,
+	timeout: float = 60.0,
+	cancelled: Optional[Event] = None
+) -> bool:
+	"""Wait until the background request to the service does not compete with the user's lookups.
+	Unlike hasQuota, a temporary lack of tokens in the rate limiter only delays the request.
+	@param service: dictionary service
+	@type service: DictionaryService
+	@param reserve: number of remaining requests of the daily quota that is left for the user's lookups
+	@type reserve: int
+	@param timeout: maximum waiting time in seconds
+	@type timeout: float
+	@param cancelled: event that interrupts the waiting
+	@type cancelled: Optional[Event]
+	@return: whether the request can be performed
+	@rtype: bool
+	"""
+	for rateLimiter in list(service.stat.get('limits', {}).values()):
+		if not rateLimiter.admit(timeout, cancelled):
+			return False
+	return hasQuota(service, reserve)
+
+
+def hashForCache(active: int) -> str:
+	"""Hash sum of the values of all service parameters that must be taken into account when caching requests.
+	The value is stable between NVDA sessions, so it can be used as a part of the persistent cache key.
+	"""
+	options = config.conf[addonName][services[active].name]
+	return cache.key(sorted((opt, str(value)) for opt, value in options.items() if opt not in volatileOptions))
 
 
 def waitingFor(target: Callable, args: List[Any] = []) -> None:
 	"""Waiting for the function to complete, beeps are output while waiting.
+	The function is called in the current thread, so it must not be the main thread of NVDA.
 	@param target: function that will be started and user will hear sounds during its execution
 	@type target: Callable
 	@param args: list of arguments to be passed to the function
 	@type args: List[Any]
 	"""
-	load = Thread(target=target, args=args)
-	load.start()
-	i = 0
-	while load.is_alive():
-		sleep(0.1)
-		if i == 10:
-			beep(500, 100)
-			i = 0
-		i += 1
-	load.join()
+	with Beeper():
+		target(*args)
 
 
 def getSelectedText() -> str:
@@ -120,6 +474,28 @@ def getSelectedText() -> str:
 	return info.text
 
 
+def getTextAroundCaret(obj: Any = None) -> str:
+	"""Retrieve the selected text or, if nothing is selected, the paragraph at the caret.
+	Must be called in the main thread.
+	@param obj: object containing the text, by default - the focus object
+	@type obj: Any
+	@return: text of the selection or paragraph, or an empty string
+	@rtype: str
+	"""
+	obj = obj or api.getFocusObject()
+	treeInterceptor = getattr(obj, 'treeInterceptor', None)
+	if hasattr(treeInterceptor, 'TextInfo') and not getattr(treeInterceptor, 'passThrough', True):
+		obj = treeInterceptor
+	try:
+		info = obj.makeTextInfo(POSITION_SELECTION)
+		if info.isCollapsed:
+			info = obj.makeTextInfo(POSITION_CARET)
+			info.expand(UNIT_PARAGRAPH)
+		return info.text or ''
+	except (RuntimeError, NotImplementedError, LookupError, AttributeError):
+		return ''
+
+
 def clearText(text: str) -> str:
 	"""Retrieve only text information from a string, containing only letters and whitespace.
 	@param text: incoming text string to be cleared of unnecessary characters
@@ -145,21 +521,6 @@ def finally_(func: Callable, final: Callable) -> Callable:
 	return wrap(final)
 
 
-# Template for displaying HTML content.
-htmlTemplate = ''.join([
-	"&nbsp;",
-	"<!DOCTYPE html>",
-	"<html>",
-	"<head>",
-	'<meta http-equiv="Content-Type" content="text/html; charset=utf-8">',
-	"<title></title>"
-	'<link rel="stylesheet" type="text/css" href="%s">' % os.path.join(os.path.dirname(__file__), 'style.css'),
-	"</head>",
-	"<body>{body}</body>",
-	"</html>"
-])
-
-
 def restoreSynthIfSpeechBeenCanceled() -> None:
 	"""Restore the previous voice synthesizer if speech is canceled or finished.
 	Must be run in a separate thread which will control the main process.
@@ -173,24 +534,46 @@ def restoreSynthIfSpeechBeenCanceled() -> None:
 		profiles.rememberCurrent(previous)
 
 
-def messageWithLangDetection(msg: Dict[str, str]) -> None:
+def messageWithLangDetection(
+	msg: Dict[str, str],
+	first: bool = True,
+	last: bool = True,
+	onStart: Optional[Callable[[], None]] = None
+) -> None:
 	"""Pronounce text in a given language if enabled the setting for auto-switching languages of the synthesizer.
 	After the speech, switche to the previous synthesizer, if the corresponding option is enabled.
+	The short form of the text is shown on the braille display, if it is specified.
+	The entry announced in parts is passed in several calls, the synthesizer is switched before the first part
+	and restored after the last one, which may be passed without the text only to finish the announcement.
 	@param msg: language code and text to be spoken in the specified language
-	@type msg: Dict[str, str] -> {'lang': str, 'text': str}
+	@type msg: Dict[str, str] -> {'lang': str, 'text': str, 'braille': str (optional)}
+	@param first: the message is the first part of the entry
+	@type first: bool
+	@param last: the message is the last part of the entry
+	@type last: bool
+	@param onStart: called when the synthesizer starts speaking the text
+	@type onStart: Optional[Callable[[], None]]
 	"""
 	switchSynth = config.conf[addonName][services[config.conf[addonName]['active']].name]['switchsynth']
 	profile = next(filter(lambda x: x.lang == msg['lang'], (p for s, p in profiles)), None)
-	if switchSynth and profile:
+	if not switchSynth:
+		profile = None
+	switch: bool = profile is not None
+	if profile is not None and first:
 		profiles.rememberCurrent()
 		profile.set()
 	speechSequence = []
-	if config.conf['speech']['autoLanguageSwitching']:
+	if config.conf['speech']['autoLanguageSwitching'] and msg['text']:
 		speechSequence.append(LangChangeCommand(msg['lang']))
-	if switchSynth and profile:
+	if switch and first:
 		speechSequence.append(CallbackCommand(callback=Thread(target=restoreSynthIfSpeechBeenCanceled).start))
-	speechSequence.append(msg['text'])
-	if switchSynth and profile:
+	if onStart is not None and msg['text']:
+		speechSequence.append(CallbackCommand(callback=onStart))
+	if msg['text']:
+		speechSequence.append(msg['text'])
+	if switch and last:
 		speechSequence.append(CallbackCommand(callback=speech.cancelSpeech))
-	speech.speak(speechSequence)
-	braille.handler.message(msg['text'])
+	if speechSequence:
+		speech.speak(speechSequence)
+	if msg['text']:
+		braille.handler.message(msg.get('braille') or msg['text'])
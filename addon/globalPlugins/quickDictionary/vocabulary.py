@@ -0,0 +1,210 @@
+# vocabulary.py
+# Personal offline dictionary of the entries received from the online services
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from __future__ import annotations
+from typing import Any, Optional, Callable, Tuple, Set, Dict
+import os.path
+import json
+import zlib
+import sqlite3
+from time import time
+from queue import Queue
+from threading import Thread, RLock
+import config
+from logHandler import log
+from . import addonName
+from .wordindex import normalize
+
+
+class Vocabulary(object):
+	"""Persistent storage of the dictionary entries looked up by the user in the online services.
+	Unlike the cache, the entries are never evicted, so the looked up words remain available without network.
+	Entries are indexed by the service, language pair and normalized headword,
+	and are written in a separate thread so as not to delay the announcement of the response.
+	"""
+
+	def __init__(self, path: str, refreshAfter: int = 30 * 24 * 3600) -> None:
+		"""Initialization of the storage parameters, the database file is opened on the first request.
+		@param path: full path to the database file
+		@type path: str
+		@param refreshAfter: age of the entry in seconds after which it is considered stale
+		@type refreshAfter: int
+		"""
+		self._path: str = path
+		self.refreshAfter: int = refreshAfter
+		self._db: Optional[sqlite3.Connection] = None
+		self._lock = RLock()
+		self._queue: Queue = Queue()
+		self._writer: Optional[Thread] = None
+
+	@property
+	def db(self) -> sqlite3.Connection:
+		"""Connection to the database, the database file and the table are created if necessary.
+		@return: connection to the SQLite database
+		@rtype: sqlite3.Connection
+		"""
+		if self._db is None:
+			self._db = sqlite3.connect(self._path, timeout=5, check_same_thread=False)
+			self._db.execute(
+				"CREATE TABLE IF NOT EXISTS articles ("
+				"service TEXT NOT NULL, "
+				"source TEXT NOT NULL, "
+				"target TEXT NOT NULL, "
+				"headword TEXT NOT NULL, "
+				"variant TEXT NOT NULL, "
+				"data BLOB NOT NULL, "
+				"updated REAL NOT NULL, "
+				"PRIMARY KEY (service, source, target, headword, variant))")
+			self._db.commit()
+		return self._db
+
+	def get(
+		self, service: str, source: str, target: str, text: str, variant: str
+	) -> Optional[Tuple[Dict, bool]]:
+		"""Retrieve the stored dictionary entry.
+		@param service: service name
+		@type service: str
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@param text: word or phrase
+		@type text: str
+		@param variant: hash of the service options that affect the content of the entry
+		@type variant: str
+		@return: the entry and the sign that it is stale, or None if the entry is missing
+		@rtype: Optional[Tuple[Dict, bool]]
+		"""
+		with self._lock:
+			try:
+				row = self.db.execute(
+					"SELECT data, updated FROM articles "
+					"WHERE service = ? AND source = ? AND target = ? AND headword = ? AND variant = ?",
+					(service, source, target, normalize(text), variant)).fetchone()
+			except sqlite3.Error as e:
+				log.error("Unable to read the personal dictionary: %s", str(e))
+				return None
+		if row is None:
+			return None
+		try:
+			return json.loads(zlib.decompress(row[0]).decode('utf-8')), time() - row[1] > self.refreshAfter
+		except (zlib.error, ValueError) as e:
+			log.error("Damaged record in the personal dictionary: %s", str(e))
+			return None
+
+	def put(self, service: str, source: str, target: str, text: str, variant: str, value: Dict) -> None:
+		"""Queue the dictionary entry for writing in a separate thread.
+		@param service: service name
+		@type service: str
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@param text: word or phrase
+		@type text: str
+		@param variant: hash of the service options that affect the content of the entry
+		@type variant: str
+		@param value: the entry in the format returned by Translator.toDict()
+		@type value: Dict
+		"""
+		self._queue.put((service, source, target, normalize(text), variant, value, time()))
+		with self._lock:
+			if self._writer is None:
+				self._writer = Thread(target=self._write, daemon=True)
+				self._writer.start()
+
+	def _write(self) -> None:
+		"""Write the queued entries to the database until the stop signal is received."""
+		while True:
+			record = self._queue.get()
+			try:
+				if record is None:
+					return
+				*key, value, updated = record
+				data: bytes = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+				with self._lock:
+					self.db.execute(
+						"INSERT OR REPLACE INTO articles "
+						"(service, source, target, headword, variant, data, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+						(*key, data, updated))
+					self.db.commit()
+			except Exception as e:
+				log.error("Unable to write to the personal dictionary: %s", str(e))
+			finally:
+				self._queue.task_done()
+
+	def flush(self) -> None:
+		"""Wait until all queued entries are written."""
+		self._queue.join()
+
+	def __len__(self) -> int:
+		"""Number of the stored entries.
+		@return: number of entries
+		@rtype: int
+		"""
+		with self._lock:
+			return self.db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+	def close(self) -> None:
+		"""Write the queued entries and close the connection to the database."""
+		with self._lock:
+			writer: Optional[Thread] = self._writer
+			self._writer = None
+		if writer is not None:
+			self._queue.put(None)
+			writer.join(timeout=5)
+		with self._lock:
+			if self._db is not None:
+				self._db.close()
+				self._db = None
+
+
+class Refresher(object):
+	"""Performs the tasks of updating stale entries one by one in a separate thread.
+	A task with the same key is not queued again until it is completed.
+	"""
+
+	def __init__(self) -> None:
+		"""Initialization of the task queue."""
+		self._queue: Queue = Queue()
+		self._pending: Set[Any] = set()
+		self._lock = RLock()
+		self._thread: Optional[Thread] = None
+
+	def schedule(self, key: Any, task: Callable[[], None]) -> None:
+		"""Queue the task if the task with the same key is not already queued.
+		@param key: unique identifier of the task
+		@type key: Any
+		@param task: function that updates the entry
+		@type task: Callable[[], None]
+		"""
+		with self._lock:
+			if key in self._pending:
+				return
+			self._pending.add(key)
+			if self._thread is None:
+				self._thread = Thread(target=self._run, daemon=True)
+				self._thread.start()
+		self._queue.put((key, task))
+
+	def _run(self) -> None:
+		"""Perform the queued tasks."""
+		while True:
+			key, task = self._queue.get()
+			try:
+				task()
+			except Exception as e:
+				log.error("Unable to refresh the dictionary entry: %s", str(e))
+			finally:
+				with self._lock:
+					self._pending.discard(key)
+				self._queue.task_done()
+
+
+# Instances for use in the add-on
+vocabulary = Vocabulary(os.path.join(config.getUserDefaultConfigPath(), "%s-vocabulary.sqlite" % addonName))
+refresher = Refresher()
@@ -6,16 +6,104 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Any, Dict
+from typing import Any, Optional, List, Dict
 import os.path
 import ssl
-from urllib.request import Request, urlopen
-from urllib.parse import quote as urlencode
+import asyncio
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import quote as urlencode, urlsplit
 from json import loads
+import config
+from .. import addonName
+from ..connections import pool, asyncPool, breaker, Response, CircuitOpenError
+from ..eventloop import eventLoop
+from ..caching import Cache
 
 ssl._create_default_https_context = ssl._create_unverified_context
 serviceName: str = os.path.basename(os.path.dirname(__file__))
 stat: Dict[str, Any] = {}  # Object for store statistics
+# Parsed pages and localized language names, so the pages are not downloaded again for other source languages
+sectionsCache = Cache(
+	os.path.join(config.getUserDefaultConfigPath(), "%s-%s.sqlite" % (addonName, serviceName)),
+	maxsize=10000,
+	maxbytes=64 * 1024 * 1024)
+
+
+class SectionParser(HTMLParser):
+	"""Incremental parser that splits the HTML extract of the page into the language sections.
+	Each second-level heading starts a new section, the content before the first heading is skipped.
+	The extract can be passed to the feed() method in parts, the sections are completed by the close() method.
+	"""
+	# elements after which a line break is inserted to separate the lines of the plain text
+	blocks = ('p', 'li', 'dd', 'dt', 'ol', 'ul', 'dl', 'h3', 'h4', 'h5', 'h6', 'div', 'tr', 'table')
+
+	def __init__(self) -> None:
+		"""Initialization of the parser state."""
+		super(SectionParser, self).__init__(convert_charrefs=True)
+		self.sections: Dict[str, str] = {}
+		self._name: Optional[str] = None
+		self._heading: Optional[List[str]] = None
+		self._parts: List[str] = []
+
+	def handle_starttag(self, tag: str, attrs: List) -> None:
+		"""Start a new section or keep the tag in the current one.
+		@param tag: name of the tag
+		@type tag: str
+		@param attrs: attributes of the tag
+		@type attrs: List[Tuple[str, str]]
+		"""
+		if tag == 'h2':
+			self._complete()
+			self._heading = []
+		elif self._heading is None and self._name is not None:
+			self._parts.append(self.get_starttag_text() or '')
+
+	def handle_startendtag(self, tag: str, attrs: List) -> None:
+		"""Keep the empty element in the current section.
+		@param tag: name of the tag
+		@type tag: str
+		@param attrs: attributes of the tag
+		@type attrs: List[Tuple[str, str]]
+		"""
+		if self._heading is None and self._name is not None:
+			self._parts.append(self.get_starttag_text() or '')
+
+	def handle_endtag(self, tag: str) -> None:
+		"""Complete the heading of the section or keep the tag in the current section.
+		@param tag: name of the tag
+		@type tag: str
+		"""
+		if self._heading is not None:
+			if tag == 'h2':
+				self._name = ' '.join(''.join(self._heading).split())
+				self._heading = None
+		elif self._name is not None:
+			self._parts.append('</%s>' % tag)
+			if tag in self.blocks:
+				self._parts.append('\n')
+
+	def handle_data(self, data: str) -> None:
+		"""Add the text to the heading or to the current section.
+		@param data: text between the tags
+		@type data: str
+		"""
+		if self._heading is not None:
+			self._heading.append(data)
+		elif self._name is not None:
+			self._parts.append(escape(data, quote=False))
+
+	def _complete(self) -> None:
+		"""Save the content of the current section."""
+		if self._name:
+			self.sections[self._name] = ''.join(self._parts).strip()
+		self._name = None
+		self._parts = []
+
+	def close(self) -> None:
+		"""Process the rest of the data and complete the last section."""
+		super(SectionParser, self).close()
+		self._complete()
 
 
 class Wapi(object):
@@ -95,16 +183,46 @@ class Wapi(object):
 		"""
 		response, resp = {}, None
 		url: str = f"{self.url}?{query}".format(lang=self.uiLang)
-		rq = Request(url, method='GET', headers=self._headers)
 		try:
-			resp = urlopen(rq, timeout=8)
+			resp = pool.request(url, headers=self._headers, circuit=breaker(stat, urlsplit(url).hostname or url))
+		except CircuitOpenError as e:
+			response['error'] = str(e)
+			return response
 		except Exception as e:
 			response['error'] = "HTTP error: %s [%s]" % (str(e), self.url)
-		self.resp = resp
-		if getattr(resp, "getcode")() != 200:
-			response['error'] = "Incorrect response code %d from the server %s" % (
-				getattr(resp, "getcode")(),
-				self.url)
+			return response
+		return self.decode(resp)
+
+	async def aget(self, query: str) -> Dict:
+		"""Request to the Wiktionary online dictionary performed by the event loop.
+		@param query: generated query URL without API URL
+		@type query: str
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		url: str = f"{self.url}?{query}".format(lang=self.uiLang)
+		try:
+			resp: Response = await asyncPool.request(
+				url, headers=self._headers, circuit=breaker(stat, urlsplit(url).hostname or url))
+		except CircuitOpenError as e:
+			return {'error': str(e)}
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			return {'error': "HTTP error: %s [%s]" % (str(e) or type(e).__name__, self.url)}
+		return self.decode(resp)
+
+	def decode(self, resp: Response) -> Dict:
+		"""Deserialize the response of the server.
+		@param resp: response from the server
+		@type resp: Response
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		response: Dict = {}
+		if resp.getcode() != 200:
+			response['error'] = "Incorrect response code %d from the server %s" % (resp.getcode(), self.url)
+			return response
 		if resp:
 			stat['count'] = stat.get('count', 0) + 1
 			try:
@@ -122,12 +240,80 @@ class Wapi(object):
 		response: Dict = self.get(query)
 		return response.get('query', {}) or response
 
+	def page(self, response: Dict) -> Dict:
+		"""Split the page received from the server into the language sections.
+		@param response: deserialized response containing the page extract
+		@type response: Dict
+		@return: page title and the content of its sections by their names
+		@rtype: Dict
+		"""
+		page: Dict = next(iter(response.get('query', {}).get('pages', {}).values()), {})
+		parser = SectionParser()
+		if 'missing' not in page:
+			parser.feed(page.get('extract') or '')
+		parser.close()
+		return {'title': page.get('title', self.text), 'sections': parser.sections}
+
+	def section(self, sections: Dict[str, str], language: str) -> str:
+		"""Select the section of the source language.
+		@param sections: content of the sections by their names
+		@type sections: Dict[str, str]
+		@param language: name of the source language in the language of the Wiktionary edition
+		@type language: str
+		@return: content of the section or an empty string if the page has no such section
+		@rtype: str
+		"""
+		name: str = language.casefold()
+		for title, content in sections.items():
+			if title.casefold() == name:
+				return content
+		for title, content in sections.items():
+			if title.casefold().startswith(name):
+				return content
+		return ''
+
 	def lookup(self) -> Dict:
-		query: str = "action=query&format=json&prop=extracts&uselang={lang}&titles={text}".format(
-			lang=self.langTo,
-			text=urlencode(self.text)
-		)
-		# prop=extracts
-		return self.get(query)
-
-# from globalPlugins.quickDictionary.wiktionary.api import Wapi
+		"""Get the section of the page that describes the word in the source language.
+		Must not be called from the event loop thread, coroutines should use alookup() instead.
+		@return: page title, name of the source language and the content of its section, or an error
+		@rtype: Dict
+		"""
+		return eventLoop.run(self.alookup())
+
+	async def alookup(self) -> Dict:
+		"""Get the section of the page that describes the word in the source language using the event loop.
+		Parsed pages and the localized names of the languages are cached,
+		so only the missing data is requested from the server.
+		If there is no page with the specified title, the title in lower case is tried.
+		@return: page title, name of the source language and the content of its section, or an error
+		@rtype: Dict
+		"""
+		nameKey: str = sectionsCache.key('language', self.uiLang, self.langFrom)
+		language: Optional[str] = (sectionsCache.get(nameKey) or {}).get('name')
+		page: Dict = {}
+		for title in dict.fromkeys([self.text, self.text.lower()]):
+			pageKey: str = sectionsCache.key('page', self.uiLang, title)
+			page = sectionsCache.get(pageKey) or {}
+			if not page or language is None:
+				query: str = "action=query&format=json&redirects=1"
+				if language is None:
+					query += "&meta=languageinfo&liprop=name&licode={code}&uselang={lang}".format(
+						code=self.langFrom, lang=self.uiLang)
+				if not page:
+					query += "&prop=extracts&titles={text}".format(text=urlencode(title))
+				response: Dict = await self.aget(query)
+				if response.get('error'):
+					return response
+				if language is None:
+					info: Dict = response.get('query', {}).get('languageinfo', {}).get(self.langFrom, {})
+					language = info.get('name') or self.langFrom
+					sectionsCache.put(nameKey, {'name': language}, ttl=365 * 24 * 3600)
+				if not page:
+					page = self.page(response)
+					sectionsCache.put(pageKey, page, ttl=None if page['sections'] else sectionsCache.negativeTtl)
+			if page['sections']:
+				break
+		section: str = self.section(page.get('sections', {}), language or self.langFrom)
+		if not section:
+			return {}
+		return {'title': page['title'], 'language': language, 'section': section}
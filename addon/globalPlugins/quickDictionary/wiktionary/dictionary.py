@@ -0,0 +1,95 @@
+# dictionary.py
+# Service summary, configuration scheme and objects for executing translation requests
+# and processing the received responses
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import Callable, Dict
+from html import escape
+import addonHandler
+from logHandler import log
+from ..service import Translator, Parser
+from ..shared import htmlTemplate
+from .api import Wapi
+from .languages import langs
+
+try:
+	addonHandler.initTranslation()
+except addonHandler.AddonError:
+	log.warning("Unable to init translations. This may be because the addon is running from NVDA scratchpad.")
+_: Callable[[str], str]
+
+
+# Translators: The name of the online dictionary service
+serviceSummary = _("Wiktionary")
+
+confspec: Dict[str, str] = {
+	"from": "string(default=%s)" % langs.defaultFrom.code,
+	"into": "string(default=%s)" % langs.defaultInto.code,
+	"autoswap": "boolean(default=false)",
+	"speculative": "boolean(default=false)",  # Look up both directions simultaneously when auto-swapping
+	"copytoclip": "boolean(default=false)",
+	"prefetch": "boolean(default=false)",  # Load entries for words around the caret in the background
+	"vocabulary": "boolean(default=true)",  # Keep received entries in the personal offline dictionary
+	"switchsynth": "boolean(default=false)"
+}
+
+
+class ServiceTranslator(Translator):
+	"""Provides interaction with the online dictionary service."""
+
+	def __init__(
+		self,
+		langFrom: str,
+		langTo: str,
+		text: str
+	) -> None:
+		"""Initialization of the source and target language, as well as word or phrase to search in the dictionary.
+		@param langFrom: source language
+		@type langFrom: str
+		@param langTo: target language
+		@type langTo: str
+		@param text: a word or phrase to look up in a dictionary
+		@type text: str
+		"""
+		super(ServiceTranslator, self).__init__(langFrom, langTo, text)
+
+	async def lookup(self) -> None:
+		"""Query the remote dictionary and save the processed response.
+		Runs as a coroutine on the event loop of the add-on.
+		"""
+		self._resp = await Wapi(
+			text=self.text,
+			langFrom=self.langFrom,
+			langTo=self.langTo
+		).alookup()
+		if self._resp.get('error'):
+			self._error = True
+		parser: Parser = ServiceParser(self._resp)
+		html: str = parser.to_html()
+		self._html = htmlTemplate.format(body=html) if html else html
+		self._plaintext = parser.to_text()
+
+
+class ServiceParser(Parser):
+	"""Converts the response from the server into a human-readable formats.
+	Must contain to_html() and to_text() methods.
+	"""
+
+	def to_html(self) -> str:
+		"""Convert the section of the Wiktionary page to HTML format.
+		The section is already in HTML format, so only the title of the page is added.
+		@return: converted to HTML deserialized response from server
+		@rtype: str
+		"""
+		if not isinstance(self.resp, dict):  # incorrect response
+			return ''
+		if self.resp.get('error', ''):  # Error message
+			return '<h1>%s</h1>' % self.resp['error']
+		if not self.resp.get('section'):
+			return ''
+		self.html = '<h1>%s (%s)</h1>\n%s\n' % (
+			escape(self.resp['title']), escape(self.resp['language']), self.resp['section'])
+		return self.html
@@ -0,0 +1,112 @@
+# languages.py
+# Description of the class for working with the languages of a specific service
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+from typing import List, Dict, Iterator
+import os.path
+import re
+from ..service import Language, Languages
+from .api import Wapi
+
+
+class ServiceLanguage(Language):
+	"""Overriding a class due to a non-compliance of the some language codes with the ISO standard."""
+	pass
+
+
+class ServiceLanguages(Languages):
+	"""Represents a collection of languages available in the dictionary service.
+	The source language is the language of the word on the page,
+	and the target language is the language of the Wiktionary edition in which the word is described.
+	"""
+
+	def __init__(self, file: str = "%s.json" % os.path.splitext(os.path.abspath(__file__))[0]) -> None:
+		"""Initialization of an object representing a collection of available language pairs.
+		Inherited methods from the parent class: load, save, __getitem__ and locale property
+		Must be implemented: fromList, intoList, update, isAvailable and properties defaultFrom, defaultInto, all
+		@param file: external file containing a list of available source and target languages
+		@type file: str
+		"""
+		super(ServiceLanguages, self).__init__(file)
+		self._Language = ServiceLanguage
+
+	def update(self) -> bool:
+		"""Get a list of available source languages from a remote server and save them in an external file.
+		This method should save the result of the operation in the logical field <self.updated>.
+		@return: the success status of the operation
+		@rtype: bool
+		"""
+		self.updated = False
+		langs: Dict = Wapi(langTo='en').languages()
+		sources: List[str] = sorted({
+			lang['code'] for lang in langs.get('languages', []) if re.match(r"^[a-z]{2,3}$", lang.get('code', ''))})
+		if len(sources) > 50:
+			self.updated = self.save({'editions': self._langs.get('editions', []), 'sources': sources})
+			self._langs = self.load()
+			self._all = []
+		return self.updated
+
+	def fromList(self) -> Iterator[ServiceLanguage]:
+		"""Sequence of available source languages.
+		@return: sequence of available source languages
+		@rtype: Iterator[ServiceLanguage]
+		"""
+		for lang in self._langs.get('sources', []):
+			yield ServiceLanguage(lang)
+
+	def intoList(self, lang: str = '') -> Iterator[ServiceLanguage]:
+		"""Sequence of available target languages, which are the same for all source languages.
+		@param lang: source language code
+		@type lang: str
+		@return: sequence of available target languages
+		@rtype: Iterator[ServiceLanguage]
+		"""
+		for edition in self._langs.get('editions', []):
+			yield ServiceLanguage(edition)
+
+	def isAvailable(self, source: str, target: str) -> bool:
+		"""Indicates whether the selected language pair is in the list of available languages.
+		@param source: source language code
+		@type source: str
+		@param target: target language code
+		@type target: str
+		@return: whether a language pair is present in the list of available
+		@rtype: bool
+		"""
+		return source in self._langs.get('sources', []) and target in self._langs.get('editions', [])
+
+	@property
+	def defaultFrom(self) -> ServiceLanguage:
+		"""Default source language.
+		@return: English if available, else - the first language in list of source languages
+		@rtype: ServiceLanguage
+		"""
+		sources: List[str] = self._langs.get('sources', [])
+		return ServiceLanguage('en' if 'en' in sources or not sources else sources[0])
+
+	@property
+	def defaultInto(self) -> ServiceLanguage:
+		"""Default target language.
+		@return: locale language, if there is the Wiktionary edition in this language, otherwise English
+		@rtype: ServiceLanguage
+		"""
+		return ServiceLanguage(self.locale.code if self.locale.code in self._langs.get('editions', []) else 'en')
+
+	@property
+	def all(self) -> List:
+		"""Full list of all supported source and target languages.
+		@return: list of all supported languages
+		@rtype: List[ServiceLanguage]
+		"""
+		if not self._all:
+			codes: List[str] = list(self._langs.get('sources', []))
+			codes.extend(code for code in self._langs.get('editions', []) if code not in codes)
+			self._all = [ServiceLanguage(code) for code in codes]
+		return self._all
+
+
+# An instance of the Languages object for use in the add-on
+langs = ServiceLanguages()
@@ -0,0 +1,205 @@
+# wordindex.py
+# Compact read-only index of dictionary articles for the local dictionary sources
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+"""File format, all numbers are little-endian:
+	* header - signature, version, flags, number of articles and offsets of the following sections;
+	* articles - the headword and article of each entry separated by a zero byte,
+		each article is compressed separately if the corresponding flag is set;
+	* keys - normalized headwords encoded in UTF-8, sorted in the byte order;
+	* key table - offsets of the keys relative to the beginning of the keys section, plus the end offset;
+	* article table - offset and size of the article for each key.
+The file is read through mmap, so opening does not depend on the size of the dictionary,
+and only the pages touched by the binary search and the found articles are loaded into memory.
+"""
+
+from __future__ import annotations
+from typing import Optional, Iterable, Iterator, Tuple, List
+import os
+import mmap
+import zlib
+import struct
+import bisect
+
+HEADER = struct.Struct('<4sHHIQQQQ')
+KEY = struct.Struct('<Q')
+ARTICLE = struct.Struct('<QI')
+SIGNATURE: bytes = b'QDIX'
+VERSION: int = 1
+COMPRESSED: int = 1  # flag indicating that articles are compressed
+
+
+class WordIndexError(Exception):
+	"""Raised when the index file is damaged or has an unsupported format."""
+
+
+def normalize(headword: str) -> str:
+	"""Normalized form of the headword used for the search.
+	@param headword: word or phrase
+	@type headword: str
+	@return: headword without extra whitespace in the case-insensitive form
+	@rtype: str
+	"""
+	return ' '.join(headword.split()).casefold()
+
+
+class WordIndex(object):
+	"""Read-only access to the articles stored in the index file.
+	The object is safe to use from several threads, because the file is only read.
+	"""
+
+	def __init__(self, path: str) -> None:
+		"""Open the index file and check its header.
+		@param path: full path to the index file
+		@type path: str
+		"""
+		self._path: str = path
+		with open(path, 'rb') as f:
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			signature, version, self._flags, self._count, self._articles, self._keys, self._keyTable, \
+				self._articleTable = HEADER.unpack_from(self._map, 0)
+		except struct.error:
+			self.close()
+			raise WordIndexError("Damaged index file: %s" % path)
+		if signature != SIGNATURE or version != VERSION:
+			self.close()
+			raise WordIndexError("Unsupported index file format: %s" % path)
+
+	@property
+	def path(self) -> str:
+		"""Full path to the index file.
+		@return: path to the file
+		@rtype: str
+		"""
+		return self._path
+
+	def __len__(self) -> int:
+		"""Number of the articles in the index.
+		@return: number of articles
+		@rtype: int
+		"""
+		return self._count
+
+	def __getitem__(self, i: int) -> bytes:
+		"""Normalized headword at the specified position, used for the binary search.
+		@param i: position in the sorted list of keys
+		@type i: int
+		@return: the key encoded in UTF-8
+		@rtype: bytes
+		"""
+		if not 0 <= i < self._count:
+			raise IndexError(i)
+		start, = KEY.unpack_from(self._map, self._keyTable + i * KEY.size)
+		end, = KEY.unpack_from(self._map, self._keyTable + (i + 1) * KEY.size)
+		return self._map[self._keys + start:self._keys + end]
+
+	def article(self, i: int) -> Tuple[str, str]:
+		"""Read the article at the specified position.
+		@param i: position in the sorted list of keys
+		@type i: int
+		@return: the original headword and the article
+		@rtype: Tuple[str, str]
+		"""
+		offset, size = ARTICLE.unpack_from(self._map, self._articleTable + i * ARTICLE.size)
+		data: bytes = self._map[self._articles + offset:self._articles + offset + size]
+		if self._flags & COMPRESSED:
+			data = zlib.decompress(data)
+		headword, _sep, article = data.decode('utf-8').partition('\0')
+		return headword, article
+
+	def lookup(self, headword: str) -> List[Tuple[str, str]]:
+		"""Find all articles for the headword.
+		@param headword: word or phrase to search
+		@type headword: str
+		@return: the original headwords and articles in the order of their addition
+		@rtype: List[Tuple[str, str]]
+		"""
+		key: bytes = normalize(headword).encode('utf-8')
+		i: int = bisect.bisect_left(self, key)
+		found: List[Tuple[str, str]] = []
+		while i < self._count and self[i] == key:
+			found.append(self.article(i))
+			i += 1
+		return found
+
+	def keys(self, prefix: str = '') -> Iterator[str]:
+		"""Sequence of the normalized headwords starting with the specified prefix.
+		@param prefix: beginning of the headword
+		@type prefix: str
+		@return: sorted normalized headwords
+		@rtype: Iterator[str]
+		"""
+		key: bytes = normalize(prefix).encode('utf-8')
+		for i in range(bisect.bisect_left(self, key), self._count):
+			current: bytes = self[i]
+			if not current.startswith(key):
+				break
+			yield current.decode('utf-8')
+
+	def close(self) -> None:
+		"""Release the mapped file."""
+		self._map.close()
+
+	@staticmethod
+	def write(path: str, entries: Iterable[Tuple[str, str]], compress: bool = True) -> int:
+		"""Create the index file from the sequence of articles.
+		The articles are written as they arrive, and only the keys are kept in memory for sorting.
+		The file is written under a temporary name and replaces the previous version only when it is complete.
+		@param path: full path to the index file
+		@type path: str
+		@param entries: sequence of headwords and corresponding articles
+		@type entries: Iterable[Tuple[str, str]]
+		@param compress: whether to compress each article separately
+		@type compress: bool
+		@return: number of written articles
+		@rtype: int
+		"""
+		temp: str = path + '.tmp'
+		keys: List[Tuple[bytes, int, int]] = []
+		with open(temp, 'wb') as f:
+			f.write(b'\0' * HEADER.size)
+			offset: int = 0
+			for headword, article in entries:
+				data: bytes = ('%s\0%s' % (headword, article)).encode('utf-8')
+				if compress:
+					data = zlib.compress(data)
+				f.write(data)
+				keys.append((normalize(headword).encode('utf-8'), offset, len(data)))
+				offset += len(data)
+			# the order of addition is kept for the same keys
+			keys.sort(key=lambda rec: rec[0])
+			keysOffset: int = HEADER.size + offset
+			position: int = 0
+			keyTable: List[int] = []
+			for key, _offset, _size in keys:
+				keyTable.append(position)
+				f.write(key)
+				position += len(key)
+			keyTable.append(position)
+			keyTableOffset: int = keysOffset + position
+			f.write(b''.join(KEY.pack(value) for value in keyTable))
+			articleTableOffset: int = keyTableOffset + len(keyTable) * KEY.size
+			f.write(b''.join(ARTICLE.pack(offset, size) for _key, offset, size in keys))
+			f.seek(0)
+			f.write(HEADER.pack(
+				SIGNATURE, VERSION, COMPRESSED if compress else 0, len(keys),
+				HEADER.size, keysOffset, keyTableOffset, articleTableOffset))
+		os.replace(temp, path)
+		return len(keys)
+
+
+def openIndex(path: str) -> Optional[WordIndex]:
+	"""Open the index file, errors are not raised.
+	@param path: full path to the index file
+	@type path: str
+	@return: opened index or None if the file is missing or damaged
+	@rtype: Optional[WordIndex]
+	"""
+	try:
+		return WordIndex(path)
+	except (OSError, ValueError, WordIndexError):
+		return None
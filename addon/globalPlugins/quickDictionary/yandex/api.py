@@ -5,19 +5,24 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Any, Dict
+from __future__ import annotations
+from typing import Any, List, Dict, Optional, Set
 import os.path
 import ssl
-from urllib.request import Request, urlopen
-from urllib.parse import quote as urlencode
+import asyncio
+from threading import Thread, Event
+from queue import Queue, Empty
+from urllib.parse import quote as urlencode, urlsplit
 from json import loads
 import config
 from .. import addonName
 from ..service import secrets
+from ..connections import pool, asyncPool, breaker, Response, CircuitBreaker, CircuitOpenError
 
 ssl._create_default_https_context = ssl._create_unverified_context
 serviceName: str = os.path.basename(os.path.dirname(__file__))
 stat: Dict[str, Any] = {}  # Object for store statistics
+raceDelay: float = 0.5  # Delay in seconds before querying the next server
 
 
 class Yapi(object):
@@ -113,50 +118,209 @@ class Yapi(object):
 		"""
 		return secrets[serviceName].decode(config.conf[addonName][serviceName]['password'])
 
+	@property
+	def race(self) -> bool:
+		"""Indicate whether to query the alternate server if the preferred one does not respond quickly.
+		@return: whether both servers are queried simultaneously
+		@rtype: bool
+		"""
+		return config.conf[addonName][serviceName]['race']
+
+	@property
+	def servers(self) -> List[str]:
+		"""Servers in the order of preference, excluding servers whose circuit breakers are open.
+		If all servers are unavailable, they are all returned to get the corresponding error messages.
+		@return: list of servers URLs
+		@rtype: List[str]
+		"""
+		servers: List[str] = [self.directUrl, self.mirrorUrl]
+		if self.mirror:
+			servers.reverse()
+		return [server for server in servers if self.circuit(server).available] or servers
+
+	def circuit(self, server: str) -> CircuitBreaker:
+		"""Circuit breaker of the specified server.
+		@param server: URL of the server
+		@type server: str
+		@return: circuit breaker stored in the service statistics
+		@rtype: CircuitBreaker
+		"""
+		return breaker(stat, urlsplit(server).hostname or server)
+
+	def fetch(self, server: str, query: str) -> Dict:
+		"""Request to the specified server of the Yandex online dictionary.
+		The result of the request is taken into account in the circuit breaker of the server.
+		@param server: URL of the server
+		@type server: str
+		@param query: generated query URL not including domain name
+		@type query: str
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		try:
+			resp = pool.request(server + query, headers=self._headers, circuit=self.circuit(server))
+		except CircuitOpenError as e:
+			return {'error': str(e)}
+		except Exception as e:
+			return {'error': "HTTP error: %s [%s]" % (str(e), server)}
+		return self.decode(resp, server)
+
+	async def afetch(self, server: str, query: str) -> Dict:
+		"""Request to the specified server of the Yandex online dictionary performed by the event loop.
+		@param server: URL of the server
+		@type server: str
+		@param query: generated query URL not including domain name
+		@type query: str
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		try:
+			resp = await asyncPool.request(server + query, headers=self._headers, circuit=self.circuit(server))
+		except CircuitOpenError as e:
+			return {'error': str(e)}
+		except asyncio.CancelledError:
+			raise
+		except Exception as e:
+			return {'error': "HTTP error: %s [%s]" % (str(e) or type(e).__name__, server)}
+		return self.decode(resp, server)
+
+	def decode(self, resp: Response, server: str) -> Dict:
+		"""Deserialize the response of the server.
+		@param resp: response from the server
+		@type resp: Response
+		@param server: URL of the server
+		@type server: str
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		if resp.getcode() != 200:
+			return {'error': "Incorrect response code %d from the server %s" % (resp.getcode(), server)}
+		stat['count'] = stat.get('count', 0) + 1
+		try:
+			response: Dict = loads(resp.read().decode(encoding='utf-8', errors='ignore'))
+		except Exception as e:
+			return {'error': "JSON error: %s [%s]" % (str(e), server)}
+		return response
+
 	def get(self, query: str) -> Dict:
 		"""Request to the Yandex online dictionary using transmitted query.
+		If racing is enabled, the next server is queried when the previous one has not responded
+		within a short delay, and the first successful response is returned.
+		The response of the slower server is ignored, and its connection remains in the pool for the next requests.
 		@param query: generated query URL not including domain name
 		@type query: str
 		@return: deserialized response from the online dictionary
 		@rtype: Dict
 		"""
-		response, resp = {}, None
-		servers = [self.directUrl, self.mirrorUrl]
-		if self.mirror:
-			servers.reverse()
-		for server in servers:
-			url = server + query
-			rq = Request(url, method='GET', headers=self._headers)
-			try:
-				resp = urlopen(rq, timeout=8)
-			except Exception as e:
-				response['error'] = "HTTP error: %s [%s]" % (str(e), server)
-				continue
-			if resp.getcode() != 200:
-				response['error'] = "Incorrect response code %d from the server %s" % (resp.getcode(), server)
-				continue
-			break
-		if resp:
-			stat['count'] = stat.get('count', 0) + 1
-			try:
-				response = loads(resp.read().decode(encoding='utf-8', errors='ignore'))
-			except Exception as e:
-				response['error'] = "JSON error: %s [%s]" % (str(e), server)
-		return response
+		response: Dict = {}
+		servers: List[str] = self.servers
+		if not self.race or len(servers) == 1:
+			for server in servers:
+				response = self.fetch(server, query)
+				if not response.get('error'):
+					break
+			return response
+		results: Queue = Queue()
+		finished = Event()
 
-	def lookup(self) -> Dict:
-		"""Get a dictionary article according to the specified parameters.
+		def race(server: str) -> None:
+			"""Query the server and pass its response if the race is not finished yet.
+			@param server: server name
+			@type server: str
+			"""
+			response: Dict = self.fetch(server, query)
+			if not finished.is_set():
+				results.put(response)
+
+		pending: int = 0
+		try:
+			for i, server in enumerate(servers):
+				Thread(target=race, args=(server,), daemon=True).start()
+				pending += 1
+				if i == len(servers) - 1:
+					break
+				try:
+					response = results.get(timeout=raceDelay)
+				except Empty:
+					continue
+				pending -= 1
+				if not response.get('error'):
+					return response
+			while pending > 0:
+				response = results.get()
+				pending -= 1
+				if not response.get('error'):
+					break
+			return response
+		finally:
+			# the threads cannot be interrupted, but the responses of the slower servers are dropped
+			finished.set()
+
+	async def aget(self, query: str) -> Dict:
+		"""Request to the Yandex online dictionary performed by the event loop.
+		Servers are raced in the same way as in the get() method,
+		but the requests to the slower servers are cancelled as soon as the race is over,
+		including when the lookup itself is cancelled.
+		@param query: generated query URL not including domain name
+		@type query: str
 		@return: deserialized response from the online dictionary
 		@rtype: Dict
 		"""
+		response: Dict = {}
+		servers: List[str] = self.servers
+		if not self.race or len(servers) == 1:
+			for server in servers:
+				response = await self.afetch(server, query)
+				if not response.get('error'):
+					break
+			return response
+		pending: Set[asyncio.Future] = set()
+		try:
+			for i, server in enumerate(servers):
+				pending.add(asyncio.ensure_future(self.afetch(server, query)))
+				timeout: Optional[float] = raceDelay if i < len(servers) - 1 else None
+				while pending:
+					done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+					if not done:
+						break
+					for task in done:
+						response = task.result()
+						if not response.get('error'):
+							return response
+					if timeout is not None:
+						break
+			return response
+		finally:
+			for task in pending:
+				task.cancel()
+
+	@property
+	def lookupQuery(self) -> str:
+		"""Query of the dictionary article according to the specified parameters.
+		@return: generated query URL not including domain name
+		@rtype: str
+		"""
 		urlTemplate: str = "/api/v1/dicservice.json/lookup?{key}lang={lang}&text={text}{ui}"
 		lang: str = "{lang1}-{lang2}".format(lang1=self.langFrom, lang2=self.langTo)
-		query: str = urlTemplate.format(
+		return urlTemplate.format(
 			lang=lang,
 			text=urlencode(self.text),
 			key='key=%s&' % self.token,
 			ui='&ui=%s' % self.uiLang or '')
-		return self.get(query)
+
+	def lookup(self) -> Dict:
+		"""Get a dictionary article according to the specified parameters.
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		return self.get(self.lookupQuery)
+
+	async def alookup(self) -> Dict:
+		"""Get a dictionary article according to the specified parameters using the event loop.
+		@return: deserialized response from the online dictionary
+		@rtype: Dict
+		"""
+		return await self.aget(self.lookupQuery)
 
 	def languages(self) -> Dict:
 		"""Request for list of all languages available in the online dictionary.
@@ -6,11 +6,13 @@
 # See the file COPYING for more details.
 # Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
 
-from typing import Callable, List, Dict
+from typing import Callable, Optional, List, Dict, FrozenSet, Tuple
+from functools import lru_cache
 import addonHandler
+from languageHandler import getLanguage
 from logHandler import log
-from ..service import Translator, Parser, secrets
-from ..shared import htmlTemplate
+from ..service import Translator, EntryParser, secrets
+from ..entry import Entry, Headword, Sense, Field, Term
 from .api import serviceName, Yapi
 from .languages import langs
 
@@ -28,10 +30,14 @@ confspec = {
 	"from": "string(default=%s)" % langs.defaultFrom.code,
 	"into": "string(default=%s)" % langs.defaultInto.code,
 	"autoswap": "boolean(default=false)",
+	"speculative": "boolean(default=false)",  # Look up both directions simultaneously when auto-swapping
 	"copytoclip": "boolean(default=false)",
+	"prefetch": "boolean(default=false)",  # Load entries for words around the caret in the background
+	"vocabulary": "boolean(default=true)",  # Keep received entries in the personal offline dictionary
 	"username": 'string(default="")',
 	"password": "string(default=%s)" % secrets[serviceName]._password,
 	"mirror": "boolean(default=false)",
+	"race": "boolean(default=true)",
 	"switchsynth": "boolean(default=false)"
 }
 
@@ -43,8 +49,7 @@ class ServiceTranslator(Translator):
 		self,
 		langFrom: str,
 		langTo: str,
-		text: str,
-		*args, **kwargs
+		text: str
 	) -> None:
 		"""Initialization of the source and target language, as well as word or phrase to search in the dictionary.
 		@param langFrom: source language
@@ -54,7 +59,7 @@ class ServiceTranslator(Translator):
 		@param text: a word or phrase to look up in a dictionary
 		@type text: str
 		"""
-		super(ServiceTranslator, self).__init__(langFrom, langTo, text, *args, **kwargs)
+		super(ServiceTranslator, self).__init__(langFrom, langTo, text)
 
 	@property
 	def uiLang(self) -> str:
@@ -64,109 +69,130 @@ class ServiceTranslator(Translator):
 		"""
 		return self._langTo or langs.locale.code
 
-	def run(self) -> None:
+	async def lookup(self) -> None:
 		"""Query the remote dictionary and save the processed response.
-		Should run in a separate thread to avoid blocking.
+		Runs as a coroutine on the event loop of the add-on.
 		"""
-		self._resp = Yapi(
+		self._resp = await Yapi(
 			text=self.text,
 			langFrom=self.langFrom,
 			langTo=self.langTo,
 			uiLang=self.uiLang
-		).lookup()
+		).alookup()
 		if self._resp.get('error'):
 			self._error = True
-		parser: Parser = ServiceParser(self._resp)
-		html: str = parser.to_html()
-		self._html = htmlTemplate.format(body=html) if html else html
-		self._plaintext = parser.to_text()
+		# the formats are rendered from the entry only when they are requested
+		self._entry = ServiceParser(self._resp).entry
 
 
-class ServiceParser(Parser):
-	"""Converts the response from the server into a human-readable formats.
-	Must contain to_html() and to_text() methods.
+# fields of the response node, which are shown in parentheses next to the word
+attrKeys: Tuple[str, ...] = ("pos", "asp", "num", "gen")
+# the same fields for checking quickly whether the node has any of them
+attrKeySet: FrozenSet[str] = frozenset(attrKeys)
+
+
+@lru_cache(maxsize=None)
+def labels(language: str) -> Dict[str, str]:
+	"""Translated names of the fields of the dictionary entry.
+	The table is built once for each language of the NVDA interface and shared by all parsers.
+	@param language: language of the NVDA interface
+	@type language: str
+	@return: names of the fields by the keys of the response, empty for self-explanatory attributes
+	@rtype: Dict[str, str]
+	"""
+	return {
+		'pos': '',
+		'asp': '',
+		# Translators: Field name in a dictionary entry
+		'num': _("number"),
+		# Translators: Field name in a dictionary entry
+		'gen': _("gender"),
+		# Translators: Field name in a dictionary entry
+		'mean': _("mean").capitalize(),
+		# Translators: Field name in a dictionary entry
+		'syn': _("synonyms").capitalize(),
+		# Translators: Field name in a dictionary entry
+		'ex': _("examples").capitalize()
+	}
+
+
+@lru_cache(maxsize=256)
+def attributes(
+	language: str,
+	pos: Optional[str],
+	asp: Optional[str],
+	num: Optional[str],
+	gen: Optional[str]
+) -> Tuple[Tuple[str, str], ...]:
+	"""Attributes of the response node, the nodes with the same attributes share a single tuple.
+	There are only a few parts of speech, aspects, numbers and genders, so their combinations are reused
+	by all responses instead of being collected from each node.
+	@param language: language of the NVDA interface
+	@type language: str
+	@param pos: part of speech or None if the node does not contain it
+	@type pos: Optional[str]
+	@param asp: aspect or None if the node does not contain it
+	@type asp: Optional[str]
+	@param num: number or None if the node does not contain it
+	@type num: Optional[str]
+	@param gen: gender or None if the node does not contain it
+	@type gen: Optional[str]
+	@return: pairs of the field name and value, the name is empty for self-explanatory values
+	@rtype: Tuple[Tuple[str, str], ...]
 	"""
+	label: Dict[str, str] = labels(language)
+	return tuple([
+		(label[key], value) for key, value in zip(attrKeys, (pos, asp, num, gen)) if value is not None])
 
-	def attrs(self, resp: Dict[str, str]) -> str:
-		"""Convert to string a sequence of attributes from fields:
-		part of speech, number and gender.
+
+class ServiceParser(EntryParser):
+	"""Converts the response from the server into the structured dictionary entry.
+	The response is passed through once, the nodes are converted in place without creating nested parsers.
+	"""
+
+	def attrs(self, resp: Dict[str, str], language: str) -> Tuple[Tuple[str, str], ...]:
+		"""Collect a sequence of attributes from fields:
+		part of speech, aspect, number and gender.
 		@param resp: part of the response from server converted to dict format
 		@type resp: Dict[str, str]
+		@param language: language of the NVDA interface
+		@type language: str
+		@return: pairs of the field name and value, the name is empty for self-explanatory values
+		@rtype: Tuple[Tuple[str, str], ...]
 		"""
-		attrs: List[str] = []
-		for key in ["pos", "asp", "num", "gen"]:
-			if key in resp:
-				field: str = {
-					# Translators: Field name in a dictionary entry
-					'num': "<i>%s</i>: " % _("number"),
-					# Translators: Field name in a dictionary entry
-					'gen': "<i>%s</i>: " % _("gender")
-				}.get(key, '') + resp[key]
-				attrs.append(field)
-		if attrs:
-			return " (%s)" % ', '.join(attrs)
-		return ''
-
-	def to_html(self) -> str:  # noqa C901
-		"""Convert data received from a remote dictionary to HTML format.
-		@return: converted to HTML deserialized response from server
-		@rtype: str
+		return attributes(language, resp.get('pos'), resp.get('asp'), resp.get('num'), resp.get('gen'))
+
+	def parse(self) -> Entry:
+		"""Convert data received from a remote dictionary to the structured entry.
+		@return: dictionary entry independent of the output format
+		@rtype: Entry
 		"""
 		if not isinstance(self.resp, dict):  # incorrect response
-			return ''
+			return Entry()
 		if self.resp.get('error', ''):  # Error message
-			return '<h1>%s</h1>' % self.resp['error']
-		html: str = ''
-		for key in ['def', 'tr', 'mean', 'syn', 'ex']:
-			if key in self.resp:
-				html += {
-					# Translators: Field name in a dictionary entry
-					'mean': "<p><i>%s</i>: " % _("mean").capitalize(),
-					# Translators: Field name in a dictionary entry
-					'syn': "<p><i>%s</i>:\n" % _("synonyms").capitalize(),
-					# Translators: Field name in a dictionary entry
-					'ex': "<p><i>%s</i>:\n" % _("examples").capitalize()
-				}.get(key, '')
-				if key == 'def':
-					if not self.resp['def']:
-						return ''
-					for elem in self.resp['def']:
-						html += '<h1>' + elem['text'] + self.attrs(elem) + '</h1>\n'
-						html += ServiceParser(elem).to_html()
-						html += '\n'
-				if key == 'tr':
-					html += '<ul>\n'
-					for elem in self.resp['tr']:
-						html += '<li><b>' + elem['text'] + '</b>' + self.attrs(elem) + '\n'
-						html += ServiceParser(elem).to_html()
-						html += '</li>\n'
-					html += '</ul>\n'
-				if key == 'mean':
-					means = []
-					for elem in self.resp['mean']:
-						means.append(elem['text'] + self.attrs(elem))
-					html += ', '.join(means) + '</p>\n'
-					del(means)
-					html += ServiceParser(elem).to_html()
-				if key == 'syn':
-					syns = []
-					for elem in self.resp['syn']:
-						syns.append(elem['text'] + self.attrs(elem))
-					html += ', '.join(syns) + '</p>\n'
-					del(syns)
-					html += ServiceParser(elem).to_html()
-				if key == 'ex':
-					exs: List[str] = []
-					for elem in self.resp['ex']:
-						tmp = elem['text'] + self.attrs(elem)
-						if 'tr' in elem:
-							trs: List[str] = []
-							for extr in elem['tr']:
-								trs.append(extr['text'] + self.attrs(extr))
-							tmp += ' - ' + ', '.join(trs)
-							del(trs)
-						exs.append(tmp)
-					html += ',\n'.join(exs) + '</p>'
-					del(exs)
-		self.html = html
-		return self.html
+			return Entry(error=self.resp['error'])
+		language: str = getLanguage()
+		label: Dict[str, str] = labels(language)
+		# most of the nodes have no attributes, they are recognized without calling the method
+		plain: Callable[[Dict], bool] = attrKeySet.isdisjoint
+		attrs: Callable[[Dict, str], Tuple[Tuple[str, str], ...]] = self.attrs
+		headwords: List[Headword] = []
+		for elem in self.resp.get('def', []):
+			senses: List[Sense] = []
+			for tr in elem.get('tr', []):
+				fields: List[Field] = []
+				if tr.get('mean'):
+					fields.append(Field(label['mean'], [
+						Term(node['text'], () if plain(node) else attrs(node, language)) for node in tr['mean']]))
+				if tr.get('syn'):
+					fields.append(Field(label['syn'], [
+						Term(node['text'], () if plain(node) else attrs(node, language)) for node in tr['syn']]))
+				if tr.get('ex'):
+					fields.append(Field(label['ex'], [
+						Term(ex['text'], () if plain(ex) else attrs(ex, language), [
+							Term(extr['text'], () if plain(extr) else attrs(extr, language)) for extr in ex['tr']
+						] if 'tr' in ex else ())
+						for ex in tr['ex']], '; '))
+				senses.append(Sense(None, '', [('', [Term(tr['text'], attrs(tr, language))])], fields))
+			headwords.append(Headword(Term(elem['text'], attrs(elem, language)), [], senses))
+		return Entry(headwords)
@@ -80,11 +80,26 @@ class ServicePanel(wx.Panel):
 			wx.CheckBox(self, label=_("Auto-s&wap languages"))
 		)
 		self.autoSwapChk.SetValue(config.conf[addonName][serviceName]['autoswap'])
+		self.speculativeChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("Look up both language dir&ections simultaneously when auto-swapping"))
+		)
+		self.speculativeChk.SetValue(config.conf[addonName][serviceName]['speculative'])
+		self.vocabularyChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("&Keep received entries in the personal offline dictionary"))
+		)
+		self.vocabularyChk.SetValue(config.conf[addonName][serviceName]['vocabulary'])
 		self.useMirrorChk = addonHelper.addItem(
 			# Translators: A setting in addon settings dialog.
 			wx.CheckBox(self, label=_("Use &alternative server"))
 		)
 		self.useMirrorChk.SetValue(config.conf[addonName][serviceName]['mirror'])
+		self.raceChk = addonHelper.addItem(
+			# Translators: A setting in addon settings dialog.
+			wx.CheckBox(self, label=_("&Query another server if the first one does not respond quickly"))
+		)
+		self.raceChk.SetValue(config.conf[addonName][serviceName]['race'])
 
 		# Field for input access token and link to registration
 		secret = secrets[serviceName]
@@ -180,6 +195,9 @@ class ServicePanel(wx.Panel):
 		config.conf[addonName][serviceName]['into'] = intoLang
 		config.conf[addonName][serviceName]['copytoclip'] = self.copyToClipboardChk.GetValue()
 		config.conf[addonName][serviceName]['autoswap'] = self.autoSwapChk.GetValue()
+		config.conf[addonName][serviceName]['speculative'] = self.speculativeChk.GetValue()
+		config.conf[addonName][serviceName]['vocabulary'] = self.vocabularyChk.GetValue()
 		config.conf[addonName][serviceName]['mirror'] = self.useMirrorChk.GetValue()
+		config.conf[addonName][serviceName]['race'] = self.raceChk.GetValue()
 		config.conf[addonName][serviceName]['password'] = secrets[serviceName].encode(
 			self.tokenInput.GetValue() or secrets[serviceName].password)
@@ -0,0 +1,118 @@
+# shim.py
+# Headless stand-ins for the NVDA modules, which allow to import the parsers of the add-on outside of NVDA
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+"""Importing this module installs the stand-ins and registers the add-on package as "quickDictionary".
+The package is registered without executing its __init__.py, so the global plugin is not created.
+The functional stand-ins are provided for addonHandler, config, logHandler, languageHandler and versionInfo,
+the rest of the NVDA modules are replaced with mock objects, which are not used by the parsers.
+The options of the services can be changed for the duration of a measurement with options().
+"""
+
+from typing import Any, Dict, Iterator
+import sys
+import os.path
+import types
+import gettext
+import logging
+import tempfile
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+addonName: str = "quickDictionary"
+addonPath: str = os.path.join(
+	os.path.dirname(os.path.abspath(__file__)), "..", "addon", "globalPlugins", addonName)
+# the caches and the personal dictionary of the add-on are created in this directory
+configPath: str = tempfile.mkdtemp(prefix="%s-benchmarks-" % addonName)
+
+
+class AddonError(Exception):
+	"""Error raised by the functions of the add-on handler."""
+
+
+class Section(dict):
+	"""Configuration section, the missing subsections are created on the first access."""
+
+	def __missing__(self, key: str) -> Any:
+		"""Create the missing subsection.
+		@param key: name of the subsection
+		@type key: str
+		@return: new empty subsection
+		@rtype: Section
+		"""
+		self[key] = Section()
+		return self[key]
+
+
+def module(name: str, **attrs: Any) -> types.ModuleType:
+	"""Create the module with the given attributes and register it in sys.modules.
+	@param name: full name of the module
+	@type name: str
+	@return: registered module
+	@rtype: types.ModuleType
+	"""
+	mod = types.ModuleType(name)
+	mod.__dict__.update(attrs)
+	sys.modules[name] = mod
+	return mod
+
+
+def initTranslation() -> None:
+	"""Install the function for translating the messages, the messages are not translated."""
+	translations.install()
+
+
+@contextmanager
+def options(service: str, **values: Any) -> Iterator[Section]:
+	"""Temporarily change the options of the service, the previous values are restored on exit.
+	@param service: name of the service section in the configuration of the add-on
+	@type service: str
+	@return: the configuration section of the service
+	@rtype: Section
+	"""
+	section: Section = conf[addonName][service]
+	previous: Dict[str, Any] = {key: section[key] for key in values if key in section}
+	section.update(values)
+	try:
+		yield section
+	finally:
+		for key in values:
+			section.pop(key, None)
+		section.update(previous)
+
+
+# the parsers read only these options, the rest of the options are created empty on the first access
+conf: Section = Section({
+	addonName: Section({
+		'active': 0,
+		'lexicala': Section({'all': False, 'workers': 4}),
+	}),
+	'speech': Section({'autoLanguageSwitching': False}),
+})
+# the messages of the add-on are not translated in the benchmarks
+translations: gettext.NullTranslations = gettext.NullTranslations()
+languageNames: Dict[str, str] = {
+	'de': "German", 'en': "English", 'fr': "French", 'ru': "Russian", 'uk': "Ukrainian"}
+
+module("addonHandler", AddonError=AddonError, initTranslation=initTranslation)
+module("config", conf=conf, getUserDefaultConfigPath=lambda: configPath, isAppX=False)
+module("logHandler", log=logging.getLogger("nvda"))
+module(
+	"languageHandler",
+	getLanguage=lambda: "en",
+	getLanguageDescription=lambda code: languageNames.get(code))
+module("versionInfo", version_year=2023)
+for name in [
+	'api', 'braille', 'controlTypes', 'core', 'eventHandler', 'globalPluginHandler', 'globalVars', 'gui',
+	'gui.guiHelper', 'gui.nvdaControls', 'inputCore', 'queueHandler', 'scriptHandler', 'speech',
+	'speech.commands', 'synthDriverHandler', 'textInfos', 'tones', 'ui', 'wx', 'wx.adv',
+]:
+	sys.modules.setdefault(name, MagicMock(name=name))
+initTranslation()
+
+# the package of the add-on without its global plugin
+package = module(
+	addonName, __path__=[os.path.normpath(addonPath)], addonName=addonName, addonSummary="Quick Dictionary")
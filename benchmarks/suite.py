@@ -0,0 +1,239 @@
+# suite.py
+# Benchmarks of the parsers of the online services on the corpus of recorded responses
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+"""Usage: python benchmarks/suite.py [--repeat 15] [--threshold 0.25] [--save] [-k yandex]
+Each response of the corpus is converted into every output format of its service,
+the throughput and the peak of the memory allocated while preparing one entry are reported.
+The results are compared with the baseline and the suite fails if any of them is worse than the threshold,
+the conversions that look slower are measured again before reporting, so a short load of the machine
+is not reported as a regression.
+The baseline is updated with --save, the timings are compared relative to the calibration workload
+measured together with them, so the baseline prepared on another machine remains usable.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import copy
+import glob
+import json
+import os.path
+import sys
+import timeit
+import tracemalloc
+import shim  # noqa: F401 - must be imported before the modules of the add-on
+from quickDictionary.yandex.dictionary import ServiceParser as YandexParser
+from quickDictionary.lexicala.dictionary import ServiceParser as LexicalaParser
+from quickDictionary.wiktionary.dictionary import ServiceParser as WiktionaryParser
+
+benchmarksPath: str = os.path.dirname(os.path.abspath(__file__))
+corpusPath: str = os.path.join(benchmarksPath, "corpus")
+baselinePath: str = os.path.join(benchmarksPath, "baseline.json")
+# the changes of the allocated memory smaller than this number of bytes are not considered regressions
+memorySlack: int = 1024
+# the slowdowns smaller than this number of seconds are not considered regressions
+timeSlack: float = 2e-6
+# minimum duration of one measurement in seconds, the conversion is repeated to fill it
+sampleTime: float = 0.01
+
+
+class Case(object):
+	"""Recorded response of the online service and the conversions measured on it."""
+
+	def __init__(self, path: str) -> None:
+		"""Load the response from the corpus.
+		The pathological responses are stored in the compact form and contain the number of repetitions
+		of their main list (homographs or senses), which is expanded on loading.
+		@param path: path to the JSON file of the corpus
+		@type path: str
+		"""
+		with open(path, encoding="utf-8") as f:
+			rec: Dict[str, Any] = json.load(f)
+		self.name: str = os.path.splitext(os.path.basename(path))[0]
+		self.service: str = rec['service']
+		self.size: str = rec['size']
+		self.description: str = rec.get('description', '')
+		self.options: Dict[str, Any] = rec.get('options', {})
+		self.target: str = rec.get('target', '')
+		self.response: Dict = rec['response']
+		self.entries: List[Dict] = rec.get('entries', [])
+		self.scale(rec.get('scale', 1))
+
+	def scale(self, times: int) -> None:
+		"""Repeat the main list of the response.
+		@param times: number of repetitions
+		@type times: int
+		"""
+		if times <= 1:
+			return
+		if self.service == "yandex":
+			self.response['def'] = self.response['def'] * times
+		elif self.service == "lexicala":
+			self.entries = copy.deepcopy(self.entries)
+			for entry in self.entries:
+				entry['senses'] = entry['senses'] * times
+		elif self.service == "wiktionary":
+			self.response['section'] = self.response['section'] * times
+
+	@property
+	def operations(self) -> Dict[str, Callable[[], Any]]:
+		"""Measured conversions of the response, each of them starts with the new parser.
+		The HTML of Wiktionary is the received section with the added title, so it is not measured.
+		@return: conversion functions by their names
+		@rtype: Dict[str, Callable[[], Any]]
+		"""
+		resp: Dict = self.response
+		if self.service == "yandex":
+			return {
+				'parse': lambda: YandexParser(resp).entry,
+				'text': lambda: YandexParser(resp).to_text(),
+				'braille': lambda: YandexParser(resp).to_braille(),
+				'html': lambda: YandexParser(resp).to_html(),
+			}
+		if self.service == "lexicala":
+			target, entries = self.target, self.entries
+			return {
+				'parse': lambda: LexicalaParser(resp, target, entries=entries).entry,
+				'text': lambda: LexicalaParser(resp, target, entries=entries).to_text(),
+				'braille': lambda: LexicalaParser(resp, target, entries=entries).to_braille(),
+				'html': lambda: LexicalaParser(resp, target, entries=entries).to_html(),
+			}
+		if self.service == "wiktionary":
+			return {
+				'text': lambda: WiktionaryParser(resp).to_text(),
+			}
+		raise ValueError("Unknown service: %s" % self.service)
+
+
+def cases(pattern: str = '') -> List[Case]:
+	"""All responses of the corpus.
+	@param pattern: only the cases which names contain this substring are loaded
+	@type pattern: str
+	@return: the loaded cases sorted by name
+	@rtype: List[Case]
+	"""
+	return [Case(path) for path in sorted(glob.glob(os.path.join(corpusPath, "*.json"))) if pattern in path]
+
+
+# words with the attributes, which are joined into the line by the calibration workload
+calibrationItems: List[Dict[str, str]] = [{'text': "word%d" % i, 'pos': "noun"} for i in range(100)]
+
+
+def calibrate() -> str:
+	"""Fixed workload similar to the work of the parsers, which is measured together with every conversion.
+	The ratio of the conversion time to the time of this workload does not depend on the speed of the machine
+	and its current load, so it is compared with the baseline instead of the time itself.
+	@return: the line of the words with their attributes
+	@rtype: str
+	"""
+	out: List[str] = []
+	for item in calibrationItems:
+		if 'pos' in item:
+			out.append(item['text'] + " (%s)" % item['pos'])
+	return ', '.join(out)
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+	"""Measure the time and the memory of one conversion.
+	The measurements of the conversion alternate with the measurements of the calibration workload.
+	@param func: measured conversion
+	@type func: Callable[[], Any]
+	@param repeat: number of measurements
+	@type repeat: int
+	@return: the best time of the conversion and of the calibration workload in seconds
+	and the peak of the memory allocated during the conversion in bytes
+	@rtype: Dict[str, float]
+	"""
+	timers: List[timeit.Timer] = [timeit.Timer(func), timeit.Timer(calibrate)]
+	numbers: List[int] = [max(1, int(sampleTime / max(timer.timeit(number=1), 1e-7))) for timer in timers]
+	best: List[float] = [float('inf'), float('inf')]
+	for _i in range(repeat):
+		for i, timer in enumerate(timers):
+			best[i] = min(best[i], timer.timeit(number=numbers[i]) / numbers[i])
+	tracemalloc.start()
+	try:
+		before: int = tracemalloc.get_traced_memory()[0]
+		func()
+		memory: int = tracemalloc.get_traced_memory()[1] - before
+	finally:
+		tracemalloc.stop()
+	return {'time': best[0], 'calibration': best[1], 'memory': memory}
+
+
+def compare(result: Dict[str, float], base: Optional[Dict[str, float]], threshold: float) -> Tuple[str, bool]:
+	"""Compare the measurement with the baseline.
+	@param result: the measurement returned by measure()
+	@type result: Dict[str, float]
+	@param base: the same measurement in the baseline or None if it is absent
+	@type base: Optional[Dict[str, float]]
+	@param threshold: allowed relative deterioration
+	@type threshold: float
+	@return: the description of the changes and whether it is a regression
+	@rtype: Tuple[str, bool]
+	"""
+	if not base:
+		return "new", False
+	# the time of the baseline converted to the speed of the machine during this measurement
+	expected: float = base['time'] * result['calibration'] / base['calibration']
+	time: float = result['time'] / expected - 1
+	memory: float = result['memory'] / base['memory'] - 1 if base['memory'] else 0.0
+	regression: bool = (time > threshold and result['time'] - expected > timeSlack) or (
+		memory > threshold and result['memory'] - base['memory'] > memorySlack)
+	change: str = "time %+.0f%%, memory %+.0f%%" % (time * 100, memory * 100)
+	return change + (" REGRESSION" if regression else ''), regression
+
+
+def main() -> int:
+	"""Run the suite and compare the results with the baseline.
+	@return: exit code, 1 if there are regressions
+	@rtype: int
+	"""
+	parser = argparse.ArgumentParser(description="Parser benchmarks on the corpus of recorded responses")
+	parser.add_argument("--repeat", type=int, default=15, help="number of measurements of each conversion")
+	parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative deterioration")
+	parser.add_argument("--baseline", default=baselinePath, help="path to the baseline file")
+	parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+	parser.add_argument("-k", dest="pattern", default='', help="run only the cases containing the substring")
+	args = parser.parse_args()
+	baseline: Dict[str, Dict[str, float]] = {}
+	if os.path.isfile(args.baseline):
+		with open(args.baseline, encoding="utf-8") as f:
+			baseline = json.load(f)
+	results: Dict[str, Dict[str, float]] = {}
+	regressions: List[str] = []
+	print("%-34s %12s %12s %12s  %s" % ("case", "entries/s", "us/entry", "peak KiB", "baseline"))
+	for case in cases(args.pattern):
+		with shim.options(case.service, **case.options):
+			for operation, func in case.operations.items():
+				func()  # the translated labels and the dispatch tables are prepared on the first call
+				name: str = "%s/%s" % (case.name, operation)
+				result: Dict[str, float] = measure(func, args.repeat)
+				change, regression = compare(result, baseline.get(name), args.threshold)
+				for _attempt in range(2):
+					if not regression or args.save:
+						break
+					# the deterioration may be caused by the load of the machine, so it is confirmed once again
+					result = min(result, measure(func, args.repeat), key=lambda r: r['time'] / r['calibration'])
+					change, regression = compare(result, baseline.get(name), args.threshold)
+				results[name] = result
+				if regression:
+					regressions.append(name)
+				print("%-34s %12.0f %12.1f %12.1f  %s" % (
+					name, 1 / result['time'], result['time'] * 1e6, result['memory'] / 1024, change))
+	if args.save:
+		with open(args.baseline, "w", encoding="utf-8", newline="\n") as f:
+			json.dump(results, f, indent="\t", sort_keys=True)
+			f.write("\n")
+		print("The baseline is saved to %s" % args.baseline)
+		return 0
+	if regressions:
+		print("Regressions beyond %.0f%%: %s" % (args.threshold * 100, ', '.join(regressions)))
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,158 @@
+# yandex_parser.py
+# Comparison of the Yandex parser with its previous recursive implementation on large responses
+# A part of the NVDA Quick Dictionary add-on
+# This file is covered by the GNU General Public License.
+# See the file COPYING for more details.
+# Copyright (C) 2020-2023 Olexandr Gryshchenko <grisov.nvaccess@mailnull.com>
+
+"""Usage: python benchmarks/yandex_parser.py [--defs 40] [--translations 8] [--repeat 20]
+The previous implementation built the HTML with string concatenation, created a nested parser for every node
+and produced the spoken text by stripping the tags from the HTML.
+"""
+
+from typing import Callable, List, Dict
+import argparse
+import re
+import timeit
+from html import unescape
+import shim  # noqa: F401 - must be imported before the modules of the add-on
+from quickDictionary.yandex.dictionary import ServiceParser
+
+_: Callable[[str], str] = shim.translations.gettext
+
+
+class LegacyParser(object):
+	"""The recursive implementation of the Yandex parser used as the baseline."""
+
+	def __init__(self, response: Dict) -> None:
+		self.resp: Dict = response
+		self.html: str = ''
+
+	def attrs(self, resp: Dict[str, str]) -> str:
+		attrs: List[str] = []
+		for key in ["pos", "asp", "num", "gen"]:
+			if key in resp:
+				field: str = {
+					'num': "<i>%s</i>: " % _("number"),
+					'gen': "<i>%s</i>: " % _("gender")
+				}.get(key, '') + resp[key]
+				attrs.append(field)
+		if attrs:
+			return " (%s)" % ', '.join(attrs)
+		return ''
+
+	def to_html(self) -> str:  # noqa C901
+		if not isinstance(self.resp, dict):
+			return ''
+		if self.resp.get('error', ''):
+			return '<h1>%s</h1>' % self.resp['error']
+		html: str = ''
+		for key in ['def', 'tr', 'mean', 'syn', 'ex']:
+			if key in self.resp:
+				html += {
+					'mean': "<p><i>%s</i>: " % _("mean").capitalize(),
+					'syn': "<p><i>%s</i>:\n" % _("synonyms").capitalize(),
+					'ex': "<p><i>%s</i>:\n" % _("examples").capitalize()
+				}.get(key, '')
+				if key == 'def':
+					if not self.resp['def']:
+						return ''
+					for elem in self.resp['def']:
+						html += '<h1>' + elem['text'] + self.attrs(elem) + '</h1>\n'
+						html += LegacyParser(elem).to_html()
+						html += '\n'
+				if key == 'tr':
+					html += '<ul>\n'
+					for elem in self.resp['tr']:
+						html += '<li><b>' + elem['text'] + '</b>' + self.attrs(elem) + '\n'
+						html += LegacyParser(elem).to_html()
+						html += '</li>\n'
+					html += '</ul>\n'
+				if key == 'mean':
+					means = []
+					for elem in self.resp['mean']:
+						means.append(elem['text'] + self.attrs(elem))
+					html += ', '.join(means) + '</p>\n'
+					html += LegacyParser(elem).to_html()
+				if key == 'syn':
+					syns = []
+					for elem in self.resp['syn']:
+						syns.append(elem['text'] + self.attrs(elem))
+					html += ', '.join(syns) + '</p>\n'
+					html += LegacyParser(elem).to_html()
+				if key == 'ex':
+					exs: List[str] = []
+					for elem in self.resp['ex']:
+						tmp = elem['text'] + self.attrs(elem)
+						if 'tr' in elem:
+							trs: List[str] = []
+							for extr in elem['tr']:
+								trs.append(extr['text'] + self.attrs(extr))
+							tmp += ' - ' + ', '.join(trs)
+						exs.append(tmp)
+					html += ',\n'.join(exs) + '</p>'
+		self.html = html
+		return self.html
+
+	def to_text(self) -> str:
+		text: str = (self.html or self.to_html()).replace('<li>', "• ").replace('<h1>', "- ")
+		text = unescape(re.sub(r'\<[^>]*\>', '', text))
+		return '\r\n'.join((s for s in text.split('\n') if s))
+
+
+def response(defs: int, translations: int) -> Dict:
+	"""Build the large response with many homographs, each of them has many translations.
+	@param defs: number of homographs
+	@type defs: int
+	@param translations: number of translations of each homograph
+	@type translations: int
+	@return: deserialized response in the format of the Yandex dictionary
+	@rtype: Dict
+	"""
+	return {'head': {}, 'def': [{
+		'text': "word", 'pos': "noun", 'ts': "wɜːd",
+		'tr': [{
+			'text': "translation%d%d" % (d, t), 'pos': "noun", 'gen': "ж", 'fr': 10,
+			'syn': [{'text': "synonym%d" % s, 'pos': "noun", 'gen': "м", 'fr': 5} for s in range(4)],
+			'mean': [{'text': "meaning%d" % m} for m in range(3)],
+			'ex': [
+				{'text': "example %d of the usage" % e, 'tr': [{'text': "translated example %d" % e}]}
+				for e in range(3)],
+		} for t in range(translations)]} for d in range(defs)]}
+
+
+def measure(name: str, func: Callable[[], str], repeat: int) -> float:
+	"""Measure the best time of the function call and print it.
+	@param name: title of the measurement
+	@type name: str
+	@param func: measured function
+	@type func: Callable[[], str]
+	@param repeat: number of calls
+	@type repeat: int
+	@return: the best time in milliseconds
+	@rtype: float
+	"""
+	best: float = min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+	print("%-40s %8.2f ms" % (name, best))
+	return best
+
+
+def main() -> None:
+	"""Compare the previous and the current implementation of the parser."""
+	parser = argparse.ArgumentParser(description="Yandex parser benchmark")
+	parser.add_argument("--defs", type=int, default=40, help="number of homographs in the response")
+	parser.add_argument("--translations", type=int, default=8, help="number of translations of each homograph")
+	parser.add_argument("--repeat", type=int, default=20, help="number of measurements")
+	args = parser.parse_args()
+	resp: Dict = response(args.defs, args.translations)
+	print("Response: %d homographs, %d translations each" % (args.defs, args.translations))
+	legacyText: float = measure(
+		"recursive parser, spoken text", lambda: LegacyParser(resp).to_text(), args.repeat)
+	text: float = measure("entry model, spoken text", lambda: ServiceParser(resp).to_text(), args.repeat)
+	legacyHtml: float = measure("recursive parser, HTML", lambda: LegacyParser(resp).to_html(), args.repeat)
+	html: float = measure("entry model, HTML", lambda: ServiceParser(resp).to_html(), args.repeat)
+	print("Speedup: spoken text %.1fx, HTML %.1fx" % (legacyText / text, legacyHtml / html))
+
+
+if __name__ == '__main__':
+	main()